@@ -0,0 +1,205 @@
+import argparse
+import codecs
+import io
+import mmap
+import os
+import struct
+
+# Binary maze files: a header, then the tiles two bits each, then the entity
+# table (including the player): the cell index (row * #columns + column) of
+# each entity as a 32 bit integer, then each entity's character. Each row of
+# tiles takes a stride of (#columns + 3) // 4 bytes, and bits 2k and 2k + 1 of
+# byte j of a row hold the tile in column k * stride + j (columns past the end
+# are floor). Each pair of bits of a row's bytes therefore decodes to a quarter
+# of the row, in order.
+BINARY_MAGIC = b'SKBM'
+BINARY_VERSION = 2
+BINARY_EXTENSION = '.skb'
+# Binary maze files at least this many bytes are read through a memory map
+MAP_THRESHOLD = 1 << 16
+# magic, version, strength, moves remaining, #rows, #columns, #entities
+BINARY_HEADER = struct.Struct('<4sH2xiiIII')
+# Bytes of the entity table per entity
+BINARY_ENTITY_SIZE = 5
+# The floor, wall, goal and filled goal characters of the text format, in
+# order of their two bit codes
+BINARY_TILES = (' ', 'W', 'G', 'X')
+# For each pair of bits, a codecs.charmap_decode table mapping every possible
+# byte to the tile in those bits
+_QUARTER_TABLES = tuple(
+    ''.join(BINARY_TILES[(byte >> shift) & 3] for byte in range(256))
+    for shift in (0, 2, 4, 6)
+)
+
+
+def read_maze_file(maze_file: str) -> tuple[list[list[str]], list[int, int]]:
+    """ Reads a text or binary maze file into a simple representation of the
+        maze and the player's starting strength and moves remaining. The
+        format is told from the first bytes of the file.
+
+    Parameters:
+        maze_file: The path to the maze file.
+    """
+    with open(maze_file, 'rb') as file:
+        if file.peek(len(BINARY_MAGIC)).startswith(BINARY_MAGIC):
+            return _read_binary(file, maze_file)
+        text = io.TextIOWrapper(file)
+        lines = text.readlines()
+        text.detach()
+
+    maze = [list(line.strip()) for line in lines[1:]]
+    player_stats = [int(item) for item in lines[0].strip().split(' ')]
+    return maze, player_stats
+
+
+def read_binary_file(maze_file: str) -> tuple[list[list[str]], list[int, int]]:
+    """ Reads a binary maze file (see write_binary_file) through a memory map,
+        into the same format as read_maze_file.
+
+    Parameters:
+        maze_file: The path to the binary maze file.
+    """
+    with open(maze_file, 'rb') as file:
+        return _read_binary(file, maze_file)
+
+
+def _read_binary(
+    file,
+    maze_file: str
+) -> tuple[list[list[str]], list[int, int]]:
+    """ Maps an open binary maze file into memory and decodes it. Small files
+        are read instead, as mapping them costs more than it saves.
+    """
+    if os.fstat(file.fileno()).st_size < MAP_THRESHOLD:
+        with memoryview(file.read()) as view:
+            return _decode(view, maze_file)
+    with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data, \
+            memoryview(data) as view:
+        return _decode(view, maze_file)
+
+
+def _decode(
+    view: memoryview,
+    maze_file: str
+) -> tuple[list[list[str]], list[int, int]]:
+    """ Decodes the contents of a binary maze file, checking that the header
+        matches them.
+    """
+    if len(view) < BINARY_HEADER.size:
+        raise ValueError(f'{maze_file} is too short to be a binary maze file')
+    magic, version, strength, moves, rows, cols, count = \
+        BINARY_HEADER.unpack_from(view)
+    if magic != BINARY_MAGIC or version != BINARY_VERSION:
+        raise ValueError(f'{maze_file} is not a version {BINARY_VERSION} '
+                         f'binary maze file')
+    if rows == 0 or cols == 0:
+        raise ValueError(f'{maze_file} has an empty {rows}x{cols} maze')
+    stride = (cols + 3) // 4
+    tiles_end = BINARY_HEADER.size + rows * stride
+    size = tiles_end + count * BINARY_ENTITY_SIZE
+    if len(view) != size:
+        raise ValueError(f'{maze_file} is {len(view)} bytes, but a {rows}x'
+                         f'{cols} maze with {count} entities takes {size}')
+
+    # Decode each quarter of every row at once, straight from the map
+    with view[BINARY_HEADER.size:tiles_end] as packed:
+        quarters = [codecs.charmap_decode(packed, 'strict', table)[0]
+                    for table in _QUARTER_TABLES]
+    first, second, third, fourth = quarters
+    maze = [list((first[start:start + stride] + second[start:start + stride]
+                  + third[start:start + stride]
+                  + fourth[start:start + stride])[:cols])
+            for start in range(0, rows * stride, stride)]
+
+    indices = struct.unpack_from(f'<{count}I', view, tiles_end)
+    with view[tiles_end + 4 * count:] as chars:
+        chars = str(chars, 'ascii')
+    if indices and max(indices) >= rows * cols:
+        raise ValueError(f'{maze_file} has an entity outside its maze')
+    for index, char in zip(indices, chars):
+        row, col = divmod(index, cols)
+        maze[row][col] = char
+
+    return maze, [strength, moves]
+
+
+def write_binary_file(
+    maze_file: str,
+    maze: list[list[str]],
+    player_stats: list[int, int]
+) -> None:
+    """ Writes a maze in the format returned by read_maze_file to a binary
+        maze file.
+
+    Parameters:
+        maze_file: The path to write to.
+        maze: A simple representation of the maze, as returned by
+              read_maze_file.
+        player_stats: The player's starting strength and moves remaining.
+    """
+    rows, cols = len(maze), len(maze[0]) if maze else 0
+    if rows == 0 or cols == 0:
+        raise ValueError('a binary maze must have at least one tile')
+    if any(len(row) != cols for row in maze):
+        raise ValueError('every row of a binary maze must be the same length')
+
+    stride = (cols + 3) // 4
+    floor = BINARY_TILES.index(' ')
+    tiles = bytearray()
+    indices = []
+    chars = []
+    for i, row in enumerate(maze):
+        codes = []
+        for j, char in enumerate(row):
+            if char in BINARY_TILES:
+                codes.append(BINARY_TILES.index(char))
+            else:
+                codes.append(floor)
+                indices.append(i * cols + j)
+                chars.append(char)
+        codes += [floor] * (4 * stride - cols)
+        tiles += bytes(codes[j] | codes[stride + j] << 2
+                       | codes[2 * stride + j] << 4
+                       | codes[3 * stride + j] << 6 for j in range(stride))
+
+    strength, moves = player_stats
+    with open(maze_file, 'wb') as file:
+        file.write(BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, strength,
+                                      moves, rows, cols, len(indices)))
+        file.write(tiles)
+        file.write(struct.pack(f'<{len(indices)}I', *indices))
+        file.write(''.join(chars).encode('ascii'))
+
+
+def convert_to_binary(text_file: str, binary_file: str) -> None:
+    """ Converts a text maze file to the binary maze format.
+
+    Parameters:
+        text_file: The path of the text maze file to read.
+        binary_file: The path of the binary maze file to write.
+    """
+    maze, player_stats = read_maze_file(text_file)
+    write_binary_file(binary_file, maze, player_stats)
+
+
+def main() -> None:
+    """ Converts text maze files to binary ones from the command line. """
+    parser = argparse.ArgumentParser(
+        description='Convert text maze files to the binary maze format.')
+    parser.add_argument('mazes', nargs='+', help='text maze files')
+    parser.add_argument('--output-dir',
+                        help='where to write the binary files (default: next '
+                             'to each text file)')
+    args = parser.parse_args()
+
+    for text_file in args.mazes:
+        binary_file = os.path.splitext(text_file)[0] + BINARY_EXTENSION
+        if args.output_dir:
+            binary_file = os.path.join(args.output_dir,
+                                       os.path.basename(binary_file))
+        convert_to_binary(text_file, binary_file)
+        print(f'{text_file} -> {binary_file}')
+
+
+if __name__ == "__main__":
+    main()
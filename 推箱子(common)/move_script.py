@@ -0,0 +1,18 @@
+# The prompt before each move in the console game's transcripts
+PROMPT = 'Enter move:'
+
+
+def split_script(text: str) -> list[str]:
+    """ Returns the entries of a move script, exactly as they were typed. A
+        script is either a plain string of moves (e.g. 'ddssu'), where each
+        character other than whitespace is an entry, or a transcript in the
+        format of the console game_examples, where each entry is the line
+        entered after an 'Enter move:' prompt (which may be an invalid move).
+
+    Parameters:
+        text: The contents of the script.
+    """
+    if PROMPT in text:
+        return [line.split(PROMPT, 1)[1].strip()
+                for line in text.splitlines() if PROMPT in line]
+    return [entry for entry in text if not entry.isspace()]
@@ -1,8 +1,32 @@
+import argparse
+import contextlib
+import io
+import os
+from types import MappingProxyType
+from typing import Mapping
+
 from a2_support import *
+from move_script import split_script
+
+# Potion effects, shared by every potion of a type and read-only
+NO_EFFECT = MappingProxyType({})
+STRENGTH_EFFECT = MappingProxyType({'strength': 2})
+MOVE_EFFECT = MappingProxyType({'moves': 5})
+FANCY_EFFECT = MappingProxyType({'strength': 2, 'moves': 2})
+
+
+# Prompt printed before each move, and what apply_move reports about one
+PROMPT = 'Enter move: '
+QUIT = 'q'
+UNDO = 'u'
+INVALID = 'invalid'
+GAME_OVER = 'over'
 
 
 # Write your classes here
 class Tile():
+    __slots__ = ()
+
     def __init__(self):
         pass
 
@@ -23,6 +47,7 @@ class Tile():
         return self.get_type()
 
 class Floor(Tile):
+    __slots__ = ()
 
     def is_blocking(self) -> bool:
         return False
@@ -33,6 +58,8 @@ class Floor(Tile):
 
 
 class Wall(Tile):
+    __slots__ = ()
+
     def is_blocking(self) -> bool:
         return True
 
@@ -40,8 +67,14 @@ class Wall(Tile):
         return WALL
 
 
+# Floors and walls have no state, so every square shares one of these
+FLOOR_TILE = Floor()
+WALL_TILE = Wall()
+
 
 class Goal(Tile):
+    __slots__ = ('filled',)
+
     def __init__(self):
 
         self.filled = False
@@ -68,6 +101,8 @@ class Goal(Tile):
         self.filled = False
 
 class Entity:
+    __slots__ = ()
+
     def __init__(self):
         pass
 
@@ -87,6 +122,8 @@ class Entity:
         return self.get_type()
 
 class Crate(Entity):
+    __slots__ = ('strength',)
+
     def __init__(self, strength: int):
         super().__init__()
         self.strength = strength
@@ -110,6 +147,8 @@ class Crate(Entity):
         return str(self.strength)
 
 class Potion(Entity):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
 
@@ -119,43 +158,51 @@ class Potion(Entity):
     def is_movable(self) -> bool:
         return False
 
-    def effect(self) -> dict[str, int]:
-        return {}
+    def effect(self) -> Mapping[str, int]:
+        return NO_EFFECT
 
 
 
 
 class StrengthPotion(Potion):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
 
     def get_type(self) -> str:
         return 'S'
 
-    def effect(self) -> dict[str, int]:
-        return {'strength': 2}
+    def effect(self) -> Mapping[str, int]:
+        return STRENGTH_EFFECT
 
 class MovePotion(Potion):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
 
     def get_type(self) -> str:
         return 'M'
 
-    def effect(self) -> dict[str, int]:
-        return {'moves': 5}
+    def effect(self) -> Mapping[str, int]:
+        return MOVE_EFFECT
 
 class FancyPotion(Potion):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
 
     def get_type(self) -> str:
         return 'F'
 
-    def effect(self) -> dict[str, int]:
-        return {'strength': 2, 'moves': 2}
+    def effect(self) -> Mapping[str, int]:
+        return FANCY_EFFECT
 
 class Player(Entity):
+    __slots__ = ('strength', 'moves_remaining')
+
     def __init__(self, start_strength: int, moves_remaining: int):
         super().__init__()
         self.strength = start_strength
@@ -176,7 +223,7 @@ class Player(Entity):
     def add_moves_remaining(self, amount: int) -> None:
         self.moves_remaining += amount
 
-    def apply_effect(self, potion_effect: dict[str, int]) -> None:
+    def apply_effect(self, potion_effect: Mapping[str, int]) -> None:
         if 'strength' in potion_effect:
             self.add_strength(potion_effect['strength'])
         if 'moves' in potion_effect:
@@ -200,26 +247,26 @@ def convert_maze(game: list[list[str]]) -> tuple[Grid, Entities, Potion]:
                     cell=int(cell)
                     crate=Crate(cell)
                     entities[(row_index, col_index)] = crate  # You may adjust the strength as needed
-                    grid_row.append(Floor())
+                    grid_row.append(FLOOR_TILE)
 
                 except:
                     if cell == 'P':
                         player_position = (row_index, col_index)
-                        grid_row.append(Floor())
+                        grid_row.append(FLOOR_TILE)
 
                     elif cell == 'S':
                         strengthPotion=StrengthPotion()
                         entities[(row_index, col_index)] = strengthPotion
-                        grid_row.append(Floor())
+                        grid_row.append(FLOOR_TILE)
 
                     elif cell == 'M':
                         movePotion=MovePotion()
-                        grid_row.append(Floor())
+                        grid_row.append(FLOOR_TILE)
                         entities[(row_index, col_index)] = movePotion
 
                     elif cell == 'F':
                         fancyPotion=FancyPotion()
-                        grid_row.append(Floor())
+                        grid_row.append(FLOOR_TILE)
                         entities[(row_index, col_index)] = fancyPotion
 
                     elif cell == 'G':
@@ -227,10 +274,10 @@ def convert_maze(game: list[list[str]]) -> tuple[Grid, Entities, Potion]:
                         grid_row.append(gobal)
 
                     elif cell == 'W':
-                        grid_row.append(Wall())
+                        grid_row.append(WALL_TILE)
 
                     else:
-                        grid_row.append(Floor())
+                        grid_row.append(FLOOR_TILE)
 
 
             grid.append(grid_row)
@@ -306,7 +353,7 @@ class SokobanModel:
     def move_player(self, new_position: Position) -> None:
 
         if not isinstance(self.maze[self.player_position[0]][self.player_position[1]],Goal):
-            self.maze[self.player_position[0]][self.player_position[1]] = Floor()
+            self.maze[self.player_position[0]][self.player_position[1]] = FLOOR_TILE
 
 
         self.player_position = new_position
@@ -398,41 +445,89 @@ class SokobanModel:
 
 
 class Sokoban:
-    def __init__(self, maze_file: str) -> None:
+    def __init__(self, maze_file: str, view: SokobanView = None) -> None:
         self.model = SokobanModel(maze_file)
-        self.view = SokobanView()
+        self.view = view if view is not None else SokobanView()
 
     def display(self) -> None:
-
-
-        self.view.display_game(self.model.get_maze(),self.model.get_entities(),
-                               self.model.get_player_position())
-
-        self.view.display_stats(self.model.get_player_moves_remaining(),
+        self.view.display_frame(self.model.get_maze(),
+                                self.model.get_entities(),
+                                self.model.get_player_position(),
+                                self.model.get_player_moves_remaining(),
                                 self.model.get_player_strength())
 
     def play_game(self) -> None:
         while True:
             self.display()
-            move = input("Enter move: ").strip()
+            move = input(PROMPT).strip()
 
-            if move == 'q':
+            result = self.apply_move(move)
+            if result == INVALID:
+                self.view.display_message('Invalid move\n')
+            elif result is not None:
                 break
-            elif move == 'u':
 
-                self.model.undo()
+        self.show_result()
 
-            elif self.model.attempt_move(move):
-                if self.model.has_won():
-                    break
-                elif self.model.has_lost():
-                    break
-                else:
-                    continue
+    def apply_move(self, move: str) -> str | None:
+        """ Applies one move entered at the prompt, as play_game does.
+
+        Returns QUIT, GAME_OVER (the game was won or lost), INVALID, or None if
+        the game goes on.
+        """
+        if move == QUIT:
+            return QUIT
+        elif move == UNDO:
+            self.model.undo()
+        elif self.model.attempt_move(move):
+            if self.model.has_won() or self.model.has_lost():
+                return GAME_OVER
+        else:
+            return INVALID
+        return None
+
+    def replay(self, moves: list[str], checkpoints=()) -> dict[int, str]:
+        """ Applies moves in bulk, as if each was entered at the prompt, but
+            without displaying anything after each one.
+
+        Parameters:
+            moves: The moves, one entry per line entered (see split_script).
+            checkpoints: Numbers of moves after which to capture the output.
+                         0 is the board before the first move.
+
+        Returns:
+            The output play_game would print after each checkpoint (up to the
+            next prompt), keyed by move number. The output after the last move
+            replayed (or when the game ended) is always included.
+        """
+        checkpoints = set(checkpoints)
+        outputs = {}
+        if 0 in checkpoints:
+            outputs[0] = self._capture(None)
+        number = 0
+        for number, move in enumerate(moves, start=1):
+            result = self.apply_move(move.strip())
+            finished = result in (QUIT, GAME_OVER)
+            if finished or number in checkpoints or number == len(moves):
+                outputs[number] = self._capture(result)
+            if finished:
+                break
+        if number not in outputs:
+            outputs[number] = self._capture(None)
+        return outputs
+
+    def _capture(self, result: str | None) -> str:
+        """ Returns what play_game prints after a move with the given result.
+        """
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            if result in (QUIT, GAME_OVER):
+                self.show_result()
             else:
-                print('Invalid move\n')
-
-        self.show_result()
+                if result == INVALID:
+                    self.view.display_message('Invalid move\n')
+                self.display()
+        return output.getvalue()
 
     def show_result(self)->None:
 
@@ -446,12 +541,96 @@ class Sokoban:
 
 
 
-def main():
-    maze_file = 'maze_files/maze3.txt'
-    game = Sokoban(maze_file)
-    game.play_game()
+def split_transcript(text: str) -> list[str]:
+    """ Returns the output of a transcript between its prompts: the board
+        before the first move, then the output after each move.
+    """
+    prompt = PROMPT.strip()
+    segments = [[]]
+    for line in text.splitlines():
+        if prompt in line:
+            segments.append([])
+        else:
+            segments[-1].append(line)
+    return ['\n'.join(lines) for lines in segments]
+
+
+def _normalise(output: str) -> list[str]:
+    """ Returns the lines of output without trailing spaces or blank lines
+        around them, for comparing with a transcript.
+    """
+    return [line.rstrip() for line in output.strip().splitlines()]
+
+
+def transcript_maze(transcript_file: str) -> str:
+    """ Returns the maze file a game_examples transcript was played on, which
+        its name starts with (e.g. maze1_simple_win_example.txt is maze1).
+    """
+    name = os.path.basename(transcript_file).split('_')[0]
+    root = os.path.dirname(os.path.dirname(os.path.abspath(transcript_file)))
+    return os.path.join(root, 'maze_files', name + '.txt')
+
+
+def check_transcript(
+    maze_file: str,
+    transcript_file: str,
+    checkpoints=()
+) -> list[int]:
+    """ Replays the moves of a transcript and compares the output after the
+        last move, and after each checkpoint, with the transcript.
+
+    Returns:
+        The move numbers at which the output differs.
+    """
+    with open(transcript_file, 'r') as file:
+        text = file.read()
+    moves = split_script(text)
+    expected = split_transcript(text)
+    outputs = Sokoban(maze_file).replay(moves, checkpoints)
+    return [number for number, output in sorted(outputs.items())
+            if number >= len(expected)
+            or _normalise(output) != _normalise(expected[number])]
 
 
+def main():
+    parser = argparse.ArgumentParser(description='Play Sokoban in the console.')
+    parser.add_argument('maze', nargs='?', default='maze_files/maze3.txt')
+    parser.add_argument('--replay', metavar='MOVES',
+                        help='apply a move string or transcript file in bulk '
+                             'and print only the final state')
+    parser.add_argument('--check', nargs='+', metavar='TRANSCRIPT',
+                        help='check transcripts against the game (the maze is '
+                             'taken from each file name)')
+    parser.add_argument('--ansi', action='store_true',
+                        help='when playing, redraw the board in place rather '
+                             'than printing it after every move')
+    parser.add_argument('--checkpoint', type=int, action='append', default=[],
+                        help='also print (or check) the output after this '
+                             'many moves')
+    args = parser.parse_args()
+
+    if args.check:
+        failed = 0
+        for transcript_file in args.check:
+            wrong = check_transcript(transcript_maze(transcript_file),
+                                     transcript_file, args.checkpoint)
+            failed += bool(wrong)
+            print(f'{transcript_file}: ' + (f'differs after moves {wrong}'
+                                            if wrong else 'ok'))
+        raise SystemExit(1 if failed else 0)
+
+    if args.replay is None:
+        Sokoban(args.maze, AnsiSokobanView() if args.ansi else None).play_game()
+        return
+    game = Sokoban(args.maze)
+    if os.path.isfile(args.replay):
+        with open(args.replay, 'r') as file:
+            moves = split_script(file.read())
+    else:
+        moves = split_script(args.replay)
+    for number, output in sorted(game.replay(moves, args.checkpoint).items()):
+        print(f'--- after {number} moves ---')
+        print(output, end='')
 
 
 if __name__ == '__main__':
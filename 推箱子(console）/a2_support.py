@@ -1,3 +1,12 @@
+import os
+import sys
+
+# The maze file formats and move scripts are shared by both versions of the
+# game
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, '推箱子(common)'))
+from binary_maze import read_maze_file
+
 Grid = list[list['Tile']]
 Entities = dict[tuple[int, int], 'Entity']
 Position = tuple[int, int]
@@ -30,7 +39,8 @@ DIRECTION_DELTAS = {
 
 
 def read_file(maze_file: str) -> tuple[list[list[str]], list[int, int]]:
-    """ A helper function to read maze files into a basic format.
+    """ A helper function to read maze files into a basic format. The file may
+        be a text maze file or a binary one (see write_binary_file).
 
     Parameters:
         maze_file: The path to the maze file (e.g. 'maze_files/maze1.txt')
@@ -41,20 +51,13 @@ def read_file(maze_file: str) -> tuple[list[list[str]], list[int, int]]:
             2) A list containing the starting values for the player's strength
                and moves remaining respectively.
     """
-    with open(maze_file, 'r') as file:
-        lines = file.readlines()
-
-        maze = [list(line.strip()) for line in lines[1:]]
-        player_stats = [int(item) for item in lines[0].strip().split(' ')]
-        # # print(lines)
-        # print(maze)
-        # print(player_stats)
-
-    return maze, player_stats
+    return read_maze_file(maze_file)
 
 
 class SokobanView:
-    """ A simple text-based view for Fancy Sokoban. """
+    """ A simple text-based view for Fancy Sokoban. Each call builds its
+        output in one string and writes it to stdout in a single call.
+    """
     def display_game(
         self,
         maze: Grid,
@@ -68,14 +71,8 @@ class SokobanView:
             entities: A dictionary mapping positions to entities
             player_position: The current position of the player.
         """
-        for i, row in enumerate(maze):
-            for j, tile in enumerate(row):
-                if (i, j) == player_position:
-                    print(PLAYER, end='')
-                else:
-                    print(entities.get((i, j), tile), end='')
-            print()
-        print()
+        sys.stdout.write('\n'.join(self._render_game(
+            maze, entities, player_position)) + '\n\n')
 
     def display_stats(self, moves_remaining: int, strength: int) -> None:
         """ Display the current stats of the player.
@@ -84,4 +81,133 @@ class SokobanView:
             moves_remaining: The number of moves the player has remaining.
             strength: The current strength of the player.
         """
-        print(f'Moves remaining: {moves_remaining}, strength: {strength}\n')
+        sys.stdout.write(self._render_stats(moves_remaining, strength) +
+                         '\n\n')
+
+    def display_frame(
+        self,
+        maze: Grid,
+        entities: Entities,
+        player_position: Position,
+        moves_remaining: int,
+        strength: int
+    ) -> None:
+        """ Display the state of the game and the player's stats together, as
+            display_game then display_stats would, in a single write.
+
+        Parameters:
+            maze: The current maze.
+            entities: A dictionary mapping positions to entities
+            player_position: The current position of the player.
+            moves_remaining: The number of moves the player has remaining.
+            strength: The current strength of the player.
+        """
+        lines = self._render_game(maze, entities, player_position)
+        lines += ['', self._render_stats(moves_remaining, strength), '', '']
+        sys.stdout.write('\n'.join(lines))
+
+    def display_message(self, message: str) -> None:
+        """ Display a message to the player, e.g. that their move was invalid.
+
+        Parameters:
+            message: The message, which may span several lines.
+        """
+        sys.stdout.write(message + '\n')
+
+    def _render_game(
+        self,
+        maze: Grid,
+        entities: Entities,
+        player_position: Position
+    ) -> list[str]:
+        """ Returns the rows of the maze as lines of text, with the entities
+            and the player drawn over their tiles.
+        """
+        rows = [[str(tile) for tile in row] for row in maze]
+        for (i, j), entity in entities.items():
+            rows[i][j] = str(entity)
+        i, j = player_position
+        rows[i][j] = PLAYER
+        return [''.join(row) for row in rows]
+
+    def _render_stats(self, moves_remaining: int, strength: int) -> str:
+        """ Returns the line of text showing the player's stats. """
+        return f'Moves remaining: {moves_remaining}, strength: {strength}'
+
+
+class AnsiSokobanView(SokobanView):
+    """ A text-based view which redraws each frame in place using ANSI escape
+        codes, rewriting only the lines which changed since the last frame.
+        Messages are shown beneath the next frame, and anything written below
+        the frame (such as the prompt and the player's input) is cleared when
+        it is redrawn.
+
+        The whole frame should fit on the terminal, which must understand ANSI
+        cursor movement.
+    """
+    def __init__(self) -> None:
+        """ Constructor for AnsiSokobanView. """
+        self._lines = None
+        self._messages = []
+
+    def display_frame(
+        self,
+        maze: Grid,
+        entities: Entities,
+        player_position: Position,
+        moves_remaining: int,
+        strength: int
+    ) -> None:
+        """ Redraw the state of the game and the player's stats in place, along
+            with any messages displayed since the last frame.
+
+        Parameters:
+            maze: The current maze.
+            entities: A dictionary mapping positions to entities
+            player_position: The current position of the player.
+            moves_remaining: The number of moves the player has remaining.
+            strength: The current strength of the player.
+        """
+        lines = self._render_game(maze, entities, player_position)
+        lines += ['', self._render_stats(moves_remaining, strength), '']
+        lines += self._messages
+        self._messages = []
+
+        if self._lines is None:
+            # Clear the screen and draw the first frame from the top left
+            parts = ['\x1b[H\x1b[2J', '\n'.join(lines), '\n']
+        else:
+            parts = [f'\x1b[{row};1H{line}\x1b[K'
+                     for row, line in enumerate(lines, start=1)
+                     if row > len(self._lines) or self._lines[row - 1] != line]
+            # Leave the cursor under the frame, clearing the last prompt
+            parts.append(f'\x1b[{len(lines) + 1};1H\x1b[J')
+        self._lines = lines
+        sys.stdout.write(''.join(parts))
+        sys.stdout.flush()
+
+    def display_game(
+        self,
+        maze: Grid,
+        entities: Entities,
+        player_position: Position
+    ) -> None:
+        """ Display the current state of the game, below anything drawn in
+            place, which is then drawn from scratch next time.
+
+        Parameters:
+            maze: The current maze.
+            entities: A dictionary mapping positions to entities
+            player_position: The current position of the player.
+        """
+        self._lines = None
+        super().display_game(maze, entities, player_position)
+
+    def display_message(self, message: str) -> None:
+        """ Display a message beneath the next frame.
+
+        Parameters:
+            message: The message, which may span several lines.
+        """
+        self._messages.extend(message.split('\n'))
+
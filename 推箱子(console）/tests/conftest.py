@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The game's modules import each other by name, as when run from its folder
+CONSOLE_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, CONSOLE_DIRECTORY)
+# The GUI game has an a2_support of its own
+sys.modules.pop('a2_support', None)
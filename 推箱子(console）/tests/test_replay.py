@@ -0,0 +1,51 @@
+import glob
+import os
+
+import pytest
+
+from a2 import (GAME_OVER, INVALID, QUIT, Sokoban, check_transcript,
+                split_transcript, transcript_maze)
+from move_script import split_script
+
+CONSOLE_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TRANSCRIPTS = sorted(glob.glob(os.path.join(CONSOLE_DIRECTORY,
+                                            'game_examples', '*.txt')))
+
+
+def maze_path(name: str) -> str:
+    return os.path.join(CONSOLE_DIRECTORY, 'maze_files', name)
+
+
+@pytest.mark.parametrize('transcript_file', TRANSCRIPTS,
+                         ids=os.path.basename)
+def test_transcripts_replay_exactly(transcript_file):
+    with open(transcript_file) as file:
+        checkpoints = range(len(split_script(file.read())) + 1)
+    maze_file = transcript_maze(transcript_file)
+    assert check_transcript(maze_file, transcript_file, checkpoints) == []
+
+
+def test_split_script_keeps_every_entry():
+    assert split_script('dd s\na\n') == ['d', 'd', 's', 'a']
+    transcript = 'board\nEnter move: x\nInvalid move\n\nEnter move: q\n'
+    assert split_script(transcript) == ['x', 'q']
+    assert split_transcript(transcript) == ['board', 'Invalid move\n', '']
+
+
+def test_apply_move_reports_each_outcome():
+    game = Sokoban(maze_path('maze1.txt'))
+    assert game.apply_move('x') == INVALID
+    assert game.apply_move('s') is None
+    assert game.apply_move('q') == QUIT
+    game = Sokoban(maze_path('maze1.txt'))
+    for move in 'sdsasdddsd':
+        game.apply_move(move)
+    assert game.apply_move('w') == GAME_OVER
+
+
+def test_replay_captures_only_checkpoints():
+    outputs = Sokoban(maze_path('maze1.txt')).replay(list('sdsasdddsdw'),
+                                                     checkpoints=[0, 2])
+    assert sorted(outputs) == [0, 2, 11]
+    assert outputs[11].endswith('You won!\n')
+    assert 'Moves remaining: 10' in outputs[2]
@@ -1,3 +1,12 @@
+import os
+import sys
+
+# The maze file formats and move scripts are shared by both versions of the
+# game
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             os.pardir, os.pardir, '推箱子(common)'))
+from binary_maze import read_maze_file
+
 Grid = list[list['Tile']]
 Entities = dict[tuple[int, int], 'Entity']
 Position = tuple[int, int]
@@ -30,7 +39,8 @@ DIRECTION_DELTAS = {
 
 
 def read_file(maze_file: str) -> tuple[list[list[str]], list[int, int]]:
-    """ A helper function to read maze files into a basic format.
+    """ A helper function to read maze files into a basic format. The file may
+        be a text maze file or a binary one (see write_binary_file).
 
     Parameters:
         maze_file: The path to the maze file (e.g. 'maze_files/maze1.txt')
@@ -41,9 +51,4 @@ def read_file(maze_file: str) -> tuple[list[list[str]], list[int, int]]:
             2) A list containing the starting values for the player's strength
                and moves remaining respectively.
     """
-    with open(maze_file, 'r') as file:
-        lines = file.readlines()
-        maze = [list(line.strip()) for line in lines[1:]]
-        player_stats = [int(item) for item in lines[0].strip().split(' ')]
-
-    return maze, player_stats
+    return read_maze_file(maze_file)
@@ -1,12 +1,42 @@
 
+import sys
 from tkinter import messagebox, filedialog
 from typing import Callable
-from model import SokobanModel, Tile, Entity
+from flat_model import MODEL_BACKENDS
+from model import SokobanModel, Tile
 from a2_support import *
 from a3_support import *
 
 # Write your classes and functions here
 
+TILE_IMAGES = {
+    FLOOR: 'images/Floor.png',
+    WALL: 'images/W.png',
+    GOAL: 'images/G.png',
+    FILLED_GOAL: 'images/X.png',
+}
+
+ENTITY_IMAGES = {
+    CRATE: 'images/C.png',
+    FANCY_POTION: 'images/F.png',
+    MOVE_POTION: 'images/M.png',
+    STRENGTH_POTION: 'images/S.png',
+    '$': 'images/$.png',
+}
+
+PLAYER_IMAGE = 'images/P.png'
+
+# Milliseconds between rendered frames (about 60 per second)
+FRAME_DELAY = 16
+
+# Smallest cell size in pixels; bigger mazes are shown through a viewport
+MIN_CELL_SIZE = 24
+# Cells to keep between the player and the edge of the viewport
+FOLLOW_MARGIN = 3
+# Arrow keys scroll the viewport by (#rows, #columns)
+SCROLL_KEYS = {'Up': (-1, 0), 'Down': (1, 0), 'Left': (0, -1), 'Right': (0, 1)}
+
+
 class FancyGameView(AbstractGrid):
     def __init__(
         self,
@@ -18,6 +48,10 @@ class FancyGameView(AbstractGrid):
         """
         Initialize the FancyGameView.
 
+        Mazes too big to fit at MIN_CELL_SIZE are shown through a viewport: a
+        window of whole cells that follows the player and can be scrolled.
+        Only the cells inside the viewport have canvas items.
+
         :param master: The tkinter widget.
         :param dimensions: The dimensions of the grid.
         :param size: The size of grid.
@@ -29,8 +63,137 @@ class FancyGameView(AbstractGrid):
             size
         )
 
+    def set_dimensions(self, dimensions: tuple[int, int]) -> None:
+        """
+        Set the dimensions of the grid. The next display redraws every cell.
+
+        :param dimensions: Dimensions of the grid as (#rows, #columns).
+        """
+        super().set_dimensions(dimensions)
+        # (row, col) of the top left maze cell in the viewport
+        self._origin = (0, 0)
+        self._last_player_position = None
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        """
+        Forget the drawn canvas items, so the next display redraws every cell
+        (e.g. after a different maze is loaded).
+        """
+        self.clear()
+        # Canvas item ids and what they currently show. Tiles are keyed by
+        # (row, col) within the viewport, everything else by maze position
+        self._tile_items = {}
+        self._goal_images = {}
+        self._entity_items = {}
+        self._player_item = None
+        self._player_state = tk.NORMAL
+        self._drawn_origin = None
+        # Keep only the images sized for the current cells alive
         self._image_cache = {}
 
+    def get_cell_size(self) -> tuple[int, int]:
+        """
+        Get the size of the cells (width, height) in pixels, which is never less
+        than MIN_CELL_SIZE.
+        """
+        width, height = super().get_cell_size()
+        return max(width, MIN_CELL_SIZE), max(height, MIN_CELL_SIZE)
+
+    def get_view_dimensions(self) -> tuple[int, int]:
+        """
+        Get the dimensions of the viewport as (#rows, #columns).
+        """
+        rows, cols = self._dimensions
+        cell_width, cell_height = self.get_cell_size()
+        width, height = self._size
+        return min(rows, height // cell_height), min(cols, width // cell_width)
+
+    def get_origin(self) -> tuple[int, int]:
+        """
+        Get the (row, col) maze position shown in the top left of the viewport.
+        """
+        return self._origin
+
+    def scroll(self, rows: int, columns: int) -> bool:
+        """
+        Move the viewport by the given number of cells, without going past the
+        edges of the maze. The next display shows the new cells.
+
+        :param rows: Cells to scroll down (negative to scroll up).
+        :param columns: Cells to scroll right (negative to scroll left).
+        :return: True iff the viewport moved.
+        """
+        origin = self._origin
+        self._set_origin(origin[0] + rows, origin[1] + columns)
+        return self._origin != origin
+
+    def _set_origin(self, row: int, col: int) -> None:
+        """
+        Set the top left cell of the viewport, clamped to the maze.
+
+        :param row: The row of the top left cell.
+        :param col: The column of the top left cell.
+        """
+        rows, cols = self._dimensions
+        view_rows, view_cols = self.get_view_dimensions()
+        self._origin = (min(max(row, 0), rows - view_rows), min(max(col, 0), cols - view_cols))
+
+    def _follow(self, player_position: Position) -> None:
+        """
+        Scroll just far enough to keep the player FOLLOW_MARGIN cells inside the
+        viewport (or as far inside as the viewport allows).
+
+        :param player_position: The position of the player.
+        """
+        view_rows, view_cols = self.get_view_dimensions()
+        origin = list(self._origin)
+        for axis, view_length in enumerate((view_rows, view_cols)):
+            margin = min(FOLLOW_MARGIN, (view_length - 1) // 2)
+            position = player_position[axis]
+            if position < origin[axis] + margin:
+                origin[axis] = position - margin
+            elif position > origin[axis] + view_length - 1 - margin:
+                origin[axis] = position - view_length + 1 + margin
+        self._set_origin(*origin)
+
+    def pixel_to_cell(self, x: int, y: int) -> tuple[int, int]:
+        """
+        Convert a pixel position on the canvas to a maze position.
+
+        :param x: The x pixel position.
+        :param y: The y pixel position.
+        """
+        row, col = super().pixel_to_cell(x, y)
+        return row + self._origin[0], col + self._origin[1]
+
+    def get_bbox(self, position: tuple[int, int]) -> tuple[int, int, int, int]:
+        """
+        Get the bounding box on the canvas of the given maze position.
+
+        :param position: The (row, col) maze position.
+        """
+        return super().get_bbox((position[0] - self._origin[0], position[1] - self._origin[1]))
+
+    def get_midpoint(self, position: tuple[int, int]) -> tuple[int, int]:
+        """
+        Get the pixel position on the canvas of the centre of the given maze
+        position.
+
+        :param position: The (row, col) maze position.
+        """
+        return super().get_midpoint((position[0] - self._origin[0], position[1] - self._origin[1]))
+
+    def is_visible(self, position: Position) -> bool:
+        """
+        Check whether a maze position is inside the viewport.
+
+        :param position: The (row, col) maze position.
+        """
+        view_rows, view_cols = self.get_view_dimensions()
+        return (0 <= position[0] - self._origin[0] < view_rows
+                and 0 <= position[1] - self._origin[1] < view_cols)
+
     def display(
         self,
         maze: Grid,
@@ -40,61 +203,149 @@ class FancyGameView(AbstractGrid):
         """
         Display the maze, entities, and player on the grid.
 
+        The viewport follows the player whenever the player has moved since the
+        last call. Canvas items persist between calls: while the viewport stays
+        put, only cells whose goal, entity or crate annotation changed are
+        updated and the player item is moved. Scrolling updates only the cells
+        in the viewport, so the cost depends on the window, not the maze.
+
         :param maze: The maze grid.
         :param entities: The entities on the grid.
         :param player_position: The position of the player.
         """
-        self.clear()
-        cell_width, cell_height = self.get_cell_size()
+        if player_position != self._last_player_position:
+            self._last_player_position = player_position
+            self._follow(player_position)
+
+        if self._origin != self._drawn_origin:
+            self._drawn_origin = self._origin
+            self._draw_tiles(maze)
+            # Entity items are placed for the old origin, so start them afresh
+            for image_item, text_item, _ in self._entity_items.values():
+                self.delete(image_item)
+                if text_item is not None:
+                    self.delete(text_item)
+            self._entity_items = {}
+        else:
+            for position, image_name in self._goal_images.items():
+                new_image_name = self._tile_image_name(maze[position[0]][position[1]])
+                if new_image_name != image_name:
+                    self._goal_images[position] = new_image_name
+                    cell = (position[0] - self._origin[0], position[1] - self._origin[1])
+                    item = self._tile_items[cell][0]
+                    self._tile_items[cell] = (item, new_image_name)
+                    self.itemconfigure(item, image=self._get_image(new_image_name))
+
+        self._update_entities({position: entities[position] for position in self._visible_positions()
+                               if position in entities})
+
+        x, y = self.get_midpoint(player_position)
+        if self._player_item is None:
+            self._player_item = self.create_image(x, y, image=self._get_image(PLAYER_IMAGE))
+        else:
+            self.coords(self._player_item, x, y)
+        # The player may be scrolled out of the viewport
+        state = tk.NORMAL if self.is_visible(player_position) else tk.HIDDEN
+        if state != self._player_state:
+            self._player_state = state
+            self.itemconfigure(self._player_item, state=state)
+
+    def _visible_positions(self):
+        """
+        Yield the maze positions inside the viewport.
+        """
+        view_rows, view_cols = self.get_view_dimensions()
+        origin_row, origin_col = self._origin
+        for row in range(origin_row, origin_row + view_rows):
+            for col in range(origin_col, origin_col + view_cols):
+                yield row, col
+
+    def _get_image(self, image_name: str) -> ImageTk.PhotoImage:
+        """
+        Get the image for image_name, sized to fit one cell.
+
+        :param image_name: The path of the image.
+        """
+        return get_image(image_name, self.get_cell_size(), self._image_cache)
+
+    def _tile_image_name(self, tile: Tile) -> str:
+        """
+        Get the image path used to draw a tile.
+
+        :param tile: The tile to draw.
+        """
+        if tile.get_type() == GOAL and tile.is_filled():
+            return TILE_IMAGES[FILLED_GOAL]
+        return TILE_IMAGES[tile.get_type()]
+
+    def _draw_tiles(self, maze: Grid) -> None:
+        """
+        Show the tiles inside the viewport. Each cell of the viewport keeps one
+        canvas item, whose image is only changed if it shows a different tile.
 
-        for row, line in enumerate(maze):
-            for col, tile in enumerate(line):
-                type_ = maze[row][col]
-                str_type_ = type_.get_type()
-
-                if str_type_ == FLOOR:
-                    image_name = 'images/Floor.png'
-                elif str_type_ == WALL:
-                    image_name = 'images/W.png'
-                elif str_type_ == GOAL:
-                    if type_.is_filled():
-                        image_name = 'images/X.png'
-                    else:
-                        image_name = 'images/G.png'
-
-                image = get_image(image_name, (cell_width, cell_height), self._image_cache)
+        :param maze: The maze grid.
+        """
+        origin_row, origin_col = self._origin
+        self._goal_images = {}
+        for row, col in self._visible_positions():
+            tile = maze[row][col]
+            image_name = self._tile_image_name(tile)
+            cell = (row - origin_row, col - origin_col)
+            current = self._tile_items.get(cell)
+            if current is None:
                 x, y = self.get_midpoint((row, col))
-                self._image_cache[image_name] = image
-                self.create_image(x, y, image=image)
-        #
+                item = self.create_image(x, y, image=self._get_image(image_name))
+                if self._player_item is not None:
+                    self.tag_lower(item, self._player_item)
+                self._tile_items[cell] = (item, image_name)
+            elif current[1] != image_name:
+                self.itemconfigure(current[0], image=self._get_image(image_name))
+                self._tile_items[cell] = (current[0], image_name)
+            if tile.get_type() == GOAL:
+                self._goal_images[(row, col)] = image_name
+
+    def _update_entities(self, entities: Entities) -> None:
+        """
+        Bring the entity images and crate annotations up to date with entities,
+        touching only the cells that changed.
+
+        :param entities: The entities on the grid.
+        """
+        drawn = self._entity_items
+        for position in [position for position in drawn if position not in entities]:
+            image_item, text_item, _ = drawn.pop(position)
+            self.delete(image_item)
+            if text_item is not None:
+                self.delete(text_item)
+
         for position, entity in entities.items():
-            str_type_ = entity.get_type()
-
-            if str_type_ == CRATE:
-                image_name = 'images/C.png'
-            elif str_type_ == FANCY_POTION:
-                image_name = 'images/F.png'
-            elif str_type_ == MOVE_POTION:
-                image_name = 'images/M.png'
-            elif str_type_ == STRENGTH_POTION:
-                image_name = 'images/S.png'
-            elif str_type_ == "$":
-                image_name = 'images/$.png'
-
-            image = get_image(image_name, (cell_width, cell_height), self._image_cache)
-            x, y = self.get_midpoint(position)
-            self.create_image(x, y, image=image)
-            self._image_cache[image_name] = image
-
-            if str_type_ == CRATE:
-                strength = entity.get_strength()
-                self.annotate_position((position[0], position[1]), text=str(strength), font=CRATE_FONT)
-
-        player_image_name = 'images/P.png'
-        player_image = get_image(player_image_name, (cell_width, cell_height), self._image_cache)
-        self._image_cache[player_image_name] = player_image
-        x, y = self.get_midpoint(player_position)
-        self.create_image(x, y, image=player_image)
+            image_name = ENTITY_IMAGES[entity.get_type()]
+            text = str(entity.get_strength()) if entity.get_type() == CRATE else None
+            current = drawn.get(position)
+            if current is not None and current[2] == (image_name, text):
+                continue
+
+            if current is None:
+                x, y = self.get_midpoint(position)
+                image_item = self.create_image(x, y, image=self._get_image(image_name))
+                text_item = None
+                if self._player_item is not None:
+                    self.tag_lower(image_item, self._player_item)
+            else:
+                image_item, text_item, _ = current
+                self.itemconfigure(image_item, image=self._get_image(image_name))
+
+            if text is None and text_item is not None:
+                self.delete(text_item)
+                text_item = None
+            elif text is not None and text_item is None:
+                text_item = self.create_text(self.get_midpoint(position), text=text, font=CRATE_FONT)
+                if self._player_item is not None:
+                    self.tag_lower(text_item, self._player_item)
+            elif text is not None:
+                self.itemconfigure(text_item, text=text)
+
+            drawn[position] = (image_item, text_item, (image_name, text))
 
 
 class FancyStatsView(AbstractGrid):
@@ -108,14 +359,13 @@ class FancyStatsView(AbstractGrid):
 
     def draw_stats(self, moves_remaining: int, strength: int, money: int) -> None:
         """
-        Draw the player statistics.
+        Draw the player statistics. The text items persist between calls, so
+        only values that changed are updated on the canvas.
 
         :param moves_remaining: Remaining moves for the player.
         :param strength: Strength of the player.
         :param money: Player's money.
         """
-        self.clear()
-
         self.annotate_position((0, 1), text="Player Stats", font=('Arial', 18, 'bold'))
 
         self.annotate_position((1, 0), text="Moves remaining:")
@@ -179,9 +429,8 @@ class FancySokobanView:
         :param dimensions: The dimensions of the grid.
         :param size: The size of grid.
         """
-        global banner_image
-        banner_image = get_image('images/banner.png', size=(660, BANNER_HEIGHT))
-        title_banner = tk.Label(master, image=banner_image)
+        self._banner_image = get_image('images/banner.png', size=(660, BANNER_HEIGHT))
+        title_banner = tk.Label(master, image=self._banner_image)
         title_banner.pack()
 
         self.frame_2 = tk.Frame(master, width=660, height=MAZE_SIZE)
@@ -207,7 +456,6 @@ class FancySokobanView:
         :param entities: The entities on the grid.
         :param player_position: The position of the player.
         """
-        self.F_G_view.clear()
         self.F_G_view.display(maze, entities, player_position)
 
     def display_stats(self, moves: int, strength: int, money: int) -> None:
@@ -218,7 +466,6 @@ class FancySokobanView:
         :param strength: Strength of the player.
         :param money: Player's money.
         """
-        self.F_S_view.clear()
         self.F_S_view.draw_stats(moves, strength, money)
 
     def create_shop_items(self, shop_items: dict[str, int], button_callback: Callable[[str], None] | None = None) -> None:
@@ -234,17 +481,25 @@ class FancySokobanView:
 
 
 class ExtraFancySokoban:
-    def __init__(self, root: tk.Tk, maze_file: str) -> None:
+    def __init__(self, root: tk.Tk, maze_file: str, model_class: type[SokobanModel] = SokobanModel) -> None:
         """
         Initialize the ExtraFancySokoban.
 
         :param root: The root Tkinter .
         :param maze_file: The file containing the maze.
+        :param model_class: The model backend to play with (see MODEL_BACKENDS).
         """
         self.root = root
-        self.model = SokobanModel(maze_file=maze_file)
+        self._model_class = model_class
+        self.model = model_class(maze_file=maze_file)
         self.SokobanView = FancySokobanView(self.root, self.model.get_dimensions(), size=(MAZE_SIZE, MAZE_SIZE))
 
+        # Frame scheduling: moves change the model straight away, but the
+        # views are only redrawn once per frame, and only if something changed
+        self._frame_job = None
+        self._maze_changed = False
+        self._drawn_stats = None
+
         self.redraw()
 
         self.SokobanView.create_shop_items(self.model.get_shop_items(), self.create_shop_event)
@@ -252,6 +507,11 @@ class ExtraFancySokoban:
         self.create_menu()
 
         self.root.bind('<KeyPress>', self.handle_keypress)
+        game_view = self.SokobanView.F_G_view
+        for sequence in ('<MouseWheel>', '<Shift-MouseWheel>', '<Button-4>', '<Button-5>',
+                         '<Shift-Button-4>', '<Shift-Button-5>'):
+            game_view.bind(sequence, self.handle_scroll)
+        game_view.bind('<Button-1>', self.handle_click)
 
     def create_menu(self):
         """
@@ -299,17 +559,50 @@ class ExtraFancySokoban:
         Load a game state from a file.
         """
         file = filedialog.askopenfilename()
-        self.model = SokobanModel(maze_file=file)
+        self.model = self._model_class(maze_file=file)
+        game_view = self.SokobanView.F_G_view
+        game_view.set_dimensions(self.model.get_dimensions())
+        SPRITES.warm(list(TILE_IMAGES.values()) + list(ENTITY_IMAGES.values()) + [PLAYER_IMAGE],
+                     game_view.get_cell_size())
         self.redraw()
 
     def redraw(self):
         """
-        Redraw the game view.
+        Redraw the game view now, cancelling any scheduled frame.
+        """
+        self._maze_changed = True
+        self._drawn_stats = None
+        self.render_frame()
+
+    def schedule_frame(self, maze_changed: bool = True) -> None:
+        """
+        Ask for the views to be redrawn in the next frame. Any number of calls
+        before then are coalesced into a single redraw.
+
+        :param maze_changed: Whether the maze, entities or player may have changed (as opposed to just the stats).
+        """
+        self._maze_changed = self._maze_changed or maze_changed
+        if self._frame_job is None:
+            self._frame_job = self.root.after(FRAME_DELAY, self.render_frame)
+
+    def render_frame(self) -> None:
+        """
+        Redraw whichever views are out of date with the model.
         """
-        self.SokobanView.display_game(maze=self.model.get_maze(), entities=self.model.get_entities(),
-                                      player_position=self.model.get_player_position())
-        self.SokobanView.display_stats(self.model.get_player_moves_remaining(), self.model.get_player_strength(),
-                                       self.model.get_player_money())
+        if self._frame_job is not None:
+            self.root.after_cancel(self._frame_job)
+            self._frame_job = None
+
+        if self._maze_changed:
+            self._maze_changed = False
+            self.SokobanView.display_game(maze=self.model.get_maze(), entities=self.model.get_entities(),
+                                          player_position=self.model.get_player_position())
+
+        stats = (self.model.get_player_moves_remaining(), self.model.get_player_strength(),
+                 self.model.get_player_money())
+        if stats != self._drawn_stats:
+            self._drawn_stats = stats
+            self.SokobanView.display_stats(*stats)
 
     def continue_game(self, flag):
         """
@@ -332,37 +625,82 @@ class ExtraFancySokoban:
         """
         char = event.char.lower()
         if char in [UP, DOWN, LEFT, RIGHT]:
-            self.model.attempt_move(char)
-            self.redraw()
-            if self.model.has_won():
-                self.continue_game('won')
-            elif self.model.get_player_moves_remaining() == 0:
-                self.continue_game('lost')
+            if self.model.attempt_move(char):
+                self.schedule_frame()
+            self.check_game_over()
         elif char == 'u':
-            self.model.undo_move()
-            self.redraw()
+            if self.model.undo_move():
+                self.schedule_frame()
+        elif char == 'r':
+            if self.model.redo_move():
+                self.schedule_frame()
+        elif event.keysym in SCROLL_KEYS:
+            if self.SokobanView.F_G_view.scroll(*SCROLL_KEYS[event.keysym]):
+                self.schedule_frame()
         else:
             pass
 
+    def handle_click(self, event: tk.Event) -> None:
+        """
+        Walk the player to the clicked cell, if it can be reached without pushing a crate. The whole walk is
+        made at once and drawn in a single frame.
+
+        :param event: The mouse click event.
+        """
+        game_view = self.SokobanView.F_G_view
+        position = game_view.pixel_to_cell(event.x, event.y)
+        if not game_view.is_visible(position):
+            return
+        if self.model.walk_to(position):
+            self.schedule_frame()
+            self.check_game_over()
+
+    def check_game_over(self) -> None:
+        """
+        Show the final frame and ask to play again if the game has been won or lost.
+        """
+        if self.model.has_won():
+            self.render_frame()
+            self.continue_game('won')
+        elif self.model.get_player_moves_remaining() == 0:
+            self.render_frame()
+            self.continue_game('lost')
+
+    def handle_scroll(self, event: tk.Event) -> None:
+        """
+        Scroll the game view with the mouse wheel (with shift held to scroll
+        sideways).
+
+        :param event: The mouse wheel or button 4/5 event.
+        """
+        step = -1 if getattr(event, 'num', None) == 4 or getattr(event, 'delta', 0) > 0 else 1
+        if event.state & 0x1:
+            moved = self.SokobanView.F_G_view.scroll(0, step)
+        else:
+            moved = self.SokobanView.F_G_view.scroll(step, 0)
+        if moved:
+            self.schedule_frame()
+
     def create_shop_event(self, item_id: str):
         """
         Handle the event of buying an item from the shop.
 
         :param item_id: The identifier of the item.
         """
-        self.model.attempt_purchase(item_id)
-        self.redraw()
+        if self.model.attempt_purchase(item_id):
+            self.schedule_frame(maze_changed=False)
 
 
-def play_game(root: tk.Tk, maze_file: str) -> None:
+def play_game(root: tk.Tk, maze_file: str, model_class: type[SokobanModel] = SokobanModel) -> None:
     """
     Start playing the game.
 
     :param root: The root Tkinter widget.
     :param maze_file: The file containing the maze.
+    :param model_class: The model backend to play with (see MODEL_BACKENDS).
     """
     root.title(string="Extra Fancy Sokoban")
-    ExtraFancySokoban(root, maze_file)
+    ExtraFancySokoban(root, maze_file, model_class)
     root.mainloop()
 
 
@@ -381,8 +719,10 @@ def main() -> None:
     root.resizable(False, False)
 
     file = './maze_files/coin_maze.txt'
+    # Run with --flat to play on the flat array backend
+    backend = 'flat' if '--flat' in sys.argv[1:] else 'objects'
 
-    play_game(root, file)
+    play_game(root, file, MODEL_BACKENDS[backend])
 
 
 if __name__ == "__main__":
@@ -1,4 +1,7 @@
+import os
+import threading
 import tkinter as tk
+from collections import OrderedDict
 from PIL import ImageTk, Image
 from typing import Union
 
@@ -10,30 +13,161 @@ STATS_HEIGHT = 75
 FONT = ('Arial', 16, 'bold')
 TITLE_FONT = ('Arial', 18, 'bold')
 CRATE_FONT = ('Arial', 20, 'bold')
+IMAGE_DIRECTORY = 'images'
+ATLAS_SIZE = 256
+
+
+class SpriteAtlas:
+    """ A process-wide store of sprites. Every image file is decoded once, and
+        resized copies are kept per (name, size), with the least recently used
+        ones evicted once there are more than max_entries.
+
+        Tk images can only be created on the main thread, so warm resizes in
+        a background thread and get turns the result into a PhotoImage.
+    """
+
+    def __init__(self, directory: str, max_entries: int = ATLAS_SIZE) -> None:
+        """ Constructor for SpriteAtlas.
+
+        Parameters:
+            directory: The directory holding the image files.
+            max_entries: How many resized images of each kind to keep.
+        """
+        self._directory = directory
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._sources = None
+        self._resized = OrderedDict()
+        self._photos = OrderedDict()
+
+    def _load_sources(self) -> dict[str, Image.Image]:
+        """ Returns every image in the directory, decoding them on first use.
+            Images are keyed by their path (e.g. 'images/C.png').
+        """
+        with self._lock:
+            if self._sources is None:
+                sources = {}
+                for file_name in sorted(os.listdir(self._directory)):
+                    path = os.path.join(self._directory, file_name)
+                    try:
+                        with Image.open(path) as image:
+                            image.load()
+                            sources[path.replace(os.sep, '/')] = image
+                    except OSError:
+                        continue
+                self._sources = sources
+            return self._sources
+
+    def _source(self, image_name: str) -> Image.Image:
+        """ Returns the decoded image for image_name, decoding it now if it is
+            not in the atlas directory.
+        """
+        sources = self._load_sources()
+        image = sources.get(image_name)
+        if image is None:
+            with Image.open(image_name) as opened:
+                opened.load()
+                image = opened
+            with self._lock:
+                sources[image_name] = image
+        return image
+
+    def _store(self, store: OrderedDict, key, value) -> None:
+        """ Adds value to an LRU store, evicting the oldest entries if full.
+            The caller must hold the lock.
+        """
+        store[key] = value
+        store.move_to_end(key)
+        while len(store) > self._max_entries:
+            store.popitem(last=False)
+
+    def _resize(self, image_name: str, size: tuple[int, int]) -> Image.Image:
+        """ Returns image_name resized to size, reusing an earlier resize. """
+        key = (image_name, size)
+        with self._lock:
+            resized = self._resized.get(key)
+            if resized is not None:
+                self._resized.move_to_end(key)
+                return resized
+        resized = self._source(image_name).resize(size)
+        with self._lock:
+            self._store(self._resized, key, resized)
+        return resized
+
+    def get(self, image_name: str, size: tuple[int, int]) -> ImageTk.PhotoImage:
+        """ Returns image_name resized to size as a Tk image. Must be called on
+            the main thread.
+
+        Parameters:
+            image_name: The path to the image (e.g. 'images/C.png').
+            size: The size to resize the image to, as (width, height).
+        """
+        key = (image_name, tuple(size))
+        photo = self._photos.get(key)
+        if photo is not None:
+            self._photos.move_to_end(key)
+            return photo
+        photo = ImageTk.PhotoImage(image=self._resize(*key))
+        with self._lock:
+            self._store(self._photos, key, photo)
+        return photo
+
+    def warm(
+        self,
+        image_names: list[str],
+        size: tuple[int, int]
+    ) -> threading.Thread:
+        """ Resizes the given images to size in a background thread, so later
+            calls to get for them only need to create the Tk image.
+
+        Parameters:
+            image_names: The paths of the images that will be needed.
+            size: The size they will be needed at, as (width, height).
+
+        Returns:
+            The (daemon) thread doing the work.
+        """
+        size = tuple(size)
+
+        def work():
+            for image_name in image_names:
+                self._resize(image_name, size)
+
+        thread = threading.Thread(target=work, daemon=True)
+        thread.start()
+        return thread
+
+
+SPRITES = SpriteAtlas(IMAGE_DIRECTORY)
 
 
 def get_image(
     image_name: str,
     size: tuple[int, int],
-    cache: dict[str, ImageTk.PhotoImage] = None
+    cache: dict[tuple[str, tuple[int, int]], ImageTk.PhotoImage] = None
 ) -> ImageTk.PhotoImage:
-    """ Returns the cached image for image_id if one exists, otherwise creates a
-        new one, caches and returns it.
+    """ Returns the image for image_name at the given size from the shared
+        SPRITES atlas, remembering it in cache if one is given.
+
+        A canvas only shows a Tk image while a reference to it is kept, so
+        views should pass a cache of their own: images they use then stay
+        alive even if the atlas evicts them.
 
     Parameters:
         image_name: The path to the image to load.
         size: The size to resize the image to, as (width, height).
-        cache: The cache to use. If None, no caching is performed.
+        cache: The cache to use, keyed by (image_name, size). If None, only
+               the atlas caches the image.
 
     Returns:
         The image for the given image_name, resized appropriately.
     """
-    if cache is None or image_name not in cache:
-        image = ImageTk.PhotoImage(image=Image.open(image_name).resize(size))
-        if cache is not None:
-            cache[image_name] = image
-    elif image_name in cache:
-        return cache[image_name]
+    key = (image_name, tuple(size))
+    if cache is not None and key in cache:
+        return cache[key]
+    image = SPRITES.get(image_name, size)
+    if cache is not None:
+        cache[key] = image
     return image
 
 
@@ -63,6 +197,8 @@ class AbstractGrid(tk.Canvas):
             **kwargs
         )
         self._size = size
+        # (row, col) -> (canvas item id, text, font) of each annotation
+        self._annotations = {}
         self.set_dimensions(dimensions)
 
     def set_dimensions(self, dimensions: tuple[int, int]) -> None:
@@ -128,16 +264,46 @@ class AbstractGrid(tk.Canvas):
         position: tuple[int, int],
         text: str,
         font=None
-    ) -> None:
+    ) -> int:
         """ Annotates the cell at the given (row, col) position with the
-            provided text.
+            provided text. Each cell has one persistent text item: annotating
+            the same cell again reconfigures it, and only if the text or font
+            differs.
 
         Parameters:
             position: The (row, col) cell position.
             text: The text to draw.
+
+        Returns:
+            The id of the canvas text item.
+        """
+        current = self._annotations.get(position)
+        if current is None:
+            item = self.create_text(
+                self.get_midpoint(position),
+                text=text,
+                font=font
+            )
+        else:
+            item, old_text, old_font = current
+            if (old_text, old_font) == (text, font):
+                return item
+            self.itemconfigure(item, text=text, font=font)
+        self._annotations[position] = (item, text, font)
+        return item
+
+    def remove_annotation(self, position: tuple[int, int]) -> None:
+        """ Removes the annotation (if any) from the cell at the given
+            (row, col) position.
+
+        Parameters:
+            position: The (row, col) cell position.
         """
-        self.create_text(self.get_midpoint(position), text=text, font=font)
+        current = self._annotations.pop(position, None)
+        if current is not None:
+            self.delete(current[0])
 
     def clear(self):
         """ Clears all child widgets off the canvas. """
         self.delete("all")
+        self._annotations = {}
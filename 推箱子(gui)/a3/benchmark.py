@@ -0,0 +1,372 @@
+import argparse
+import glob
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from a2_support import *
+from flat_model import MODEL_BACKENDS
+from model import SokobanModel, convert_maze, Crate, Goal, Potion
+
+SHIPPED_MAZES = 'maze_files/*.txt'
+DEFAULT_SIZES = (10, 50, 100, 250, 500)
+DEFAULT_CALLS = 2000
+
+
+def make_scaled_maze(size: int) -> list[str]:
+    """ Returns the lines of a synthetic size x size maze file, with walls
+        around the edge and a regular scattering of inner walls, crates, goals,
+        potions and coins. The player starts in the top left corner with a
+        large move budget.
+
+    Parameters:
+        size: The number of rows and columns (at least 5).
+    """
+    lines = [f'5 {size * size * 10}']
+    for i in range(size):
+        row = []
+        for j in range(size):
+            if i in (0, size - 1) or j in (0, size - 1):
+                tile = WALL
+            elif (i, j) == (1, 1):
+                tile = PLAYER
+            elif i % 6 == 0 and j % 5 == 3:
+                tile = WALL
+            elif i % 4 == 2 and j % 4 == 2:
+                tile = '1'
+            elif i % 8 == 5 and j % 8 == 5:
+                tile = GOAL
+            elif (i + j) % 17 == 0:
+                tile = STRENGTH_POTION
+            elif (i * j) % 23 == 1:
+                tile = '$'
+            elif (i + 2 * j) % 29 == 0:
+                tile = MOVE_POTION
+            else:
+                tile = FLOOR
+            row.append(tile)
+        lines.append(''.join(row))
+    return lines
+
+
+def write_scaled_maze(directory: str, size: int) -> str:
+    """ Writes a synthetic maze from make_scaled_maze into directory and
+        returns its path.
+    """
+    path = os.path.join(directory, f'scaled_{size}x{size}.txt')
+    with open(path, 'w') as file:
+        file.write('\n'.join(make_scaled_maze(size)) + '\n')
+    return path
+
+
+def _summarise(name: str, samples: list[float], calls: int) -> dict:
+    """ Returns summary statistics for per-call latencies in nanoseconds. """
+    ordered = sorted(samples)
+    mean = statistics.fmean(ordered)
+    return {
+        'operation': name,
+        'calls': calls,
+        'mean_ns': round(mean, 1),
+        'median_ns': round(statistics.median(ordered), 1),
+        'p95_ns': round(ordered[int(0.95 * (len(ordered) - 1))], 1),
+        'min_ns': round(ordered[0], 1),
+        'calls_per_second': round(1e9 / mean, 1) if mean else None,
+    }
+
+
+def _time_batches(func, calls: int, batches: int = 20) -> list[float]:
+    """ Returns per-call latencies of func (which takes no arguments), each
+        averaged over a batch so that timer overhead does not dominate fast
+        calls.
+    """
+    size = max(1, calls // batches)
+    samples = []
+    for _ in range(batches):
+        start = time.perf_counter_ns()
+        for _ in range(size):
+            func()
+        samples.append((time.perf_counter_ns() - start) / size)
+    return samples
+
+
+def _find_neighbour(model: SokobanModel, wanted) -> tuple | None:
+    """ Returns (player_position, direction) such that moving in direction from
+        player_position leads onto a square accepted by wanted, or None.
+        wanted is called with (position, direction) and the player_position
+        must be empty floor.
+    """
+    maze = model.get_maze()
+    entities = model.get_entities()
+    for row, line in enumerate(maze):
+        for col, tile in enumerate(line):
+            if tile.is_blocking() or (row, col) in entities:
+                continue
+            for direction, (d_row, d_col) in DIRECTION_DELTAS.items():
+                if wanted((row + d_row, col + d_col), direction):
+                    return (row, col), direction
+    return None
+
+
+def _place_player(model: SokobanModel, position: Position) -> None:
+    """ Moves the player to position without using a move. """
+    model.import_state(model.export_state().move_player(position))
+
+
+def _scenarios(model: SokobanModel) -> dict:
+    """ Returns the (player_position, direction) set-ups for each kind of move
+        benchmarked, or None for the kinds this maze cannot exercise.
+    """
+    maze = model.get_maze()
+    entities = model.get_entities()
+    rows, cols = model.get_dimensions()
+
+    def open_floor(position):
+        row, col = position
+        return (0 <= row < rows and 0 <= col < cols
+                and not maze[row][col].is_blocking()
+                and position not in entities)
+
+    def wall(position, direction):
+        row, col = position
+        return (0 <= row < rows and 0 <= col < cols
+                and maze[row][col].is_blocking())
+
+    def pushable(position, direction):
+        entity = entities.get(position)
+        if entity is None or entity.get_type() != CRATE:
+            return False
+        if entity.get_strength() > model.get_player_strength():
+            return False
+        d_row, d_col = DIRECTION_DELTAS[direction]
+        return open_floor((position[0] + d_row, position[1] + d_col))
+
+    def potion(position, direction):
+        return isinstance(entities.get(position), Potion)
+
+    return {
+        'attempt_move[valid]': _find_neighbour(
+            model, lambda position, direction: open_floor(position)),
+        'attempt_move[blocked]': _find_neighbour(model, wall),
+        'attempt_move[push]': _find_neighbour(model, pushable),
+        'attempt_move[potion]': _find_neighbour(model, potion),
+    }
+
+
+def benchmark_maze(
+    maze_file: str,
+    calls: int = DEFAULT_CALLS,
+    model_class: type[SokobanModel] = SokobanModel
+) -> list[dict]:
+    """ Benchmarks the model hot paths on one maze file.
+
+    Parameters:
+        maze_file: The path to the maze file.
+        calls: Roughly how many calls to time per operation.
+        model_class: The model backend to benchmark (see MODEL_BACKENDS).
+
+    Returns:
+        One summary dictionary per operation (see _summarise).
+    """
+    raw_maze, _ = read_file(maze_file)
+    # Loading big mazes is slow, so time fewer of them
+    cells = len(raw_maze) * len(raw_maze[0])
+    load_calls = max(3, min(calls, 2_000_000 // cells))
+
+    results = [
+        _summarise('convert_maze',
+                   _time_batches(lambda: convert_maze(raw_maze), load_calls,
+                                 min(load_calls, 20)),
+                   load_calls),
+    ]
+
+    model = model_class(maze_file)
+    results.append(_summarise(
+        'reset', _time_batches(model.reset, load_calls, min(load_calls, 20)),
+        load_calls))
+    results.append(_summarise('has_won', _time_batches(model.has_won, calls),
+                              calls))
+
+    undo_samples = []
+    for name, scenario in _scenarios(model).items():
+        if scenario is None:
+            continue
+        position, direction = scenario
+        model.reset()
+        _place_player(model, position)
+        samples = []
+        for _ in range(calls):
+            start = time.perf_counter_ns()
+            moved = model.attempt_move(direction)
+            samples.append(time.perf_counter_ns() - start)
+            if moved:
+                start = time.perf_counter_ns()
+                model.undo_move()
+                undo_samples.append(time.perf_counter_ns() - start)
+        results.append(_summarise(name, samples, calls))
+
+    if undo_samples:
+        results.append(_summarise('undo_move', undo_samples,
+                                  len(undo_samples)))
+
+    model.reset()
+    results.append(_summarise(
+        'snapshot', _time_batches(model.snapshot, load_calls,
+                                  min(load_calls, 20)), load_calls))
+    snapshot = model.snapshot()
+    results.append(_summarise(
+        'restore', _time_batches(lambda: model.restore(snapshot), load_calls,
+                                 min(load_calls, 20)), load_calls))
+    return results
+
+
+def _instance_size(instance) -> int:
+    """ Returns the bytes taken by instance itself, including its __dict__ if
+        it has one (but not the objects its attributes refer to).
+    """
+    size = sys.getsizeof(instance)
+    if hasattr(instance, '__dict__'):
+        size += sys.getsizeof(instance.__dict__)
+    return size
+
+
+def measure_memory(maze_file: str, calls: int = DEFAULT_CALLS) -> dict:
+    """ Measures the memory taken by the tiles and entities of one maze file,
+        and the cost of reading their attributes.
+
+    Parameters:
+        maze_file: The path to the maze file.
+        calls: Roughly how many calls to time per attribute read.
+
+    Returns:
+        A dictionary with the number of entities, the bytes per instance of
+        each tile and entity class in the maze, the bytes convert_maze's
+        result keeps alive (traced with tracemalloc), and a summary (see
+        _summarise) per attribute read.
+    """
+    raw_maze, _ = read_file(maze_file)
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        maze, entities, _ = convert_maze(raw_maze)
+        retained = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+    samples = {}
+    for instance in [tile for line in maze for tile in line] + list(
+            entities.values()):
+        samples.setdefault(type(instance).__name__, instance)
+
+    reads = []
+    for wanted, method in ((Crate, 'get_strength'), (Goal, 'is_filled'),
+                           (Potion, 'effect')):
+        instance = next((instance for instance in samples.values()
+                         if isinstance(instance, wanted)), None)
+        if instance is not None:
+            reads.append(_summarise(
+                f'{wanted.__name__}.{method}',
+                _time_batches(getattr(instance, method), calls), calls))
+
+    return {
+        'entities': len(entities),
+        'bytes_per_instance': {name: _instance_size(instance)
+                               for name, instance in sorted(samples.items())},
+        'convert_maze_retained_bytes': retained,
+        'attribute_reads': reads,
+    }
+
+
+def run_benchmarks(
+    maze_files: list[str],
+    sizes: tuple[int, ...],
+    calls: int = DEFAULT_CALLS,
+    backend: str = 'objects',
+    memory: bool = False
+) -> dict:
+    """ Benchmarks each maze file and a synthetic maze of each size, using the
+        named model backend (a key of MODEL_BACKENDS), or measures their memory
+        with measure_memory if memory is True.
+
+    Returns:
+        A JSON-serialisable dictionary with details of the environment and one
+        entry per maze.
+    """
+    report = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': sys.version.split()[0],
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'calls': calls,
+        'backend': None if memory else backend,
+        'mode': 'memory' if memory else 'timing',
+        'mazes': [],
+    }
+
+    with tempfile.TemporaryDirectory() as directory:
+        targets = list(maze_files) + [write_scaled_maze(directory, size)
+                                      for size in sizes]
+        for maze_file in targets:
+            model_class = MODEL_BACKENDS[backend]
+            model = model_class(maze_file)
+            name = (os.path.basename(maze_file)
+                    if maze_file.startswith(directory) else maze_file)
+            print(f'benchmarking {name} ...', file=sys.stderr)
+            entry = {'maze': name,
+                     'dimensions': list(model.get_dimensions())}
+            if memory:
+                entry['memory'] = measure_memory(maze_file, calls)
+            else:
+                entry['results'] = benchmark_maze(maze_file, calls,
+                                                  model_class)
+            report['mazes'].append(entry)
+    return report
+
+
+def main() -> None:
+    """ Runs the benchmarks from the command line. """
+    parser = argparse.ArgumentParser(
+        description='Benchmark the SokobanModel hot paths.')
+    parser.add_argument('mazes', nargs='*',
+                        help=f'maze files (default: {SHIPPED_MAZES})')
+    parser.add_argument('--sizes', type=int, nargs='*',
+                        default=list(DEFAULT_SIZES),
+                        help='sizes of synthetic square mazes to add')
+    parser.add_argument('--calls', type=int, default=DEFAULT_CALLS,
+                        help='calls to time per operation')
+    parser.add_argument('--backend', choices=sorted(MODEL_BACKENDS),
+                        default='objects', help='model backend to benchmark')
+    parser.add_argument('--memory', action='store_true',
+                        help='measure memory and attribute reads instead')
+    parser.add_argument('--output', default='benchmark_results.json',
+                        help='where to write the JSON results')
+    args = parser.parse_args()
+
+    maze_files = args.mazes or sorted(glob.glob(SHIPPED_MAZES))
+    report = run_benchmarks(maze_files, tuple(args.sizes), args.calls,
+                            args.backend, args.memory)
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2)
+
+    for maze in report['mazes']:
+        print(f"{maze['maze']} ({maze['dimensions'][0]}x"
+              f"{maze['dimensions'][1]})")
+        if args.memory:
+            memory = maze['memory']
+            print(f"  {memory['entities']} entities, convert_maze keeps "
+                  f"{memory['convert_maze_retained_bytes']} bytes")
+            for name, size in memory['bytes_per_instance'].items():
+                print(f'  {name:<24}{size:>14} bytes')
+        for result in maze.get('results', []) + maze.get(
+                'memory', {}).get('attribute_reads', []):
+            print(f"  {result['operation']:<24}{result['mean_ns']:>14.0f} ns"
+                  f"{result['calls_per_second']:>14.0f} calls/s")
+    print(f'results written to {args.output}', file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
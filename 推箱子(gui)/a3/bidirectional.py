@@ -0,0 +1,370 @@
+from heapq import heappop, heappush
+from itertools import count
+
+from a2_support import *
+from deadlock import DeadSquareTable
+from matching import INFINITY, min_cost_matching
+
+# A search node: (crate bits, filled goal bits, smallest cell index the player
+# can reach). Crates a player can walk between without pushing are the same
+# node, wherever in that area the player stands.
+Node = tuple[int, int, int]
+
+
+def _bit_indices(bits: int):
+    """ Yields the indices of the set bits of bits, in ascending order. """
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+class BidirectionalSearch:
+    """ A push-level search which grows best first from the start forwards
+        (pushing crates) and from the won position backwards (pulling them),
+        until the two meet. Forwards, nodes are ranked by pushes so far plus
+        the cheapest matching of crates to unfilled goals; backwards, by
+        pulls so far plus the cheapest matching of crates (and the crates
+        still to come out of filled goals) to where the crates start.
+
+        Crates that are pushed onto an unfilled goal fill it and disappear, as
+        in SokobanModel._attempt_push. The won position therefore has no
+        crates left, and pulling backwards out of a filled goal brings the
+        crate back and unfills the goal. A crate never rests on an unfilled
+        goal, in either direction.
+
+        Only the crates, goals and walls are considered, so the search suits
+        mazes without potions or coins, with exactly one crate per unfilled
+        goal and no crate too heavy for the player. The move budget is not
+        considered either; the plan found should be checked against it.
+    """
+
+    def __init__(
+        self,
+        dimensions: tuple[int, int],
+        walls: set[Position],
+        goals: list[Position],
+        crates: list[Position],
+        player_position: Position,
+        dead_squares: DeadSquareTable
+    ) -> None:
+        """ Constructor for BidirectionalSearch.
+
+        Parameters:
+            dimensions: The dimensions of the maze as (#rows, #columns).
+            walls: The positions of blocking tiles.
+            goals: The positions of the unfilled goals.
+            crates: The positions of the crates, one per unfilled goal.
+            player_position: The player's starting position.
+            dead_squares: The dead square table for the maze.
+        """
+        rows, cols = dimensions
+        # Cells are numbered row by row with a border of walls all round, so
+        # that neighbouring cells never need bounds checks
+        self._width = width = cols + 2
+        self._open = bytearray(width * (rows + 2))
+        self._dead = bytearray(len(self._open))
+        for row in range(rows):
+            for col in range(cols):
+                index = self._to_index((row, col))
+                if (row, col) not in walls:
+                    self._open[index] = 1
+                    self._dead[index] = dead_squares.is_dead((row, col))
+        self._steps = {UP: -width, DOWN: width, LEFT: -1, RIGHT: 1}
+
+        self._goal_bits = 0
+        for goal in goals:
+            self._goal_bits |= 1 << self._to_index(goal)
+        crate_bits = 0
+        for crate in crates:
+            crate_bits |= 1 << self._to_index(crate)
+        self._start = (crate_bits, 0, self._to_index(player_position))
+
+        # Push distances to each goal, and from each starting crate
+        self._to_goals = {
+            self._to_index(goal): {
+                self._to_index(position): distance for position, distance
+                in dead_squares.get_push_distances(goal).items()}
+            for goal in goals}
+        self._from_crates = [self._push_distances(self._to_index(crate))
+                             for crate in crates]
+        self._heuristic_cache = ({}, {})
+
+        self._states_expanded = 0
+        self._complete = True
+
+    def get_states_expanded(self) -> int:
+        """ Returns the number of nodes expanded by the last search, in both
+            directions.
+        """
+        return self._states_expanded
+
+    def search_was_complete(self) -> bool:
+        """ Returns True iff the last search ran until the directions met or
+            one of them ran out of nodes, rather than reaching max_states.
+        """
+        return self._complete
+
+    def search(self, max_states: int) -> str | None:
+        """ Returns the moves of a plan which fills every goal, or None if
+            there is no such plan or max_states nodes were expanded first. The
+            plan is not necessarily the shortest, in moves or pushes.
+
+        Parameters:
+            max_states: The maximum number of nodes to expand.
+        """
+        self._states_expanded = 0
+        self._complete = True
+        tie_breaker = count()
+
+        # Each direction maps the nodes it has expanded to (parent node,
+        # (crate index, direction) of the push between them). Queue entries
+        # are (f, tie, g, node, parent, push), where the player in node may
+        # be anywhere in their area.
+        forward = {}
+        backward = {}
+        forward_queue = []
+        backward_queue = []
+        self._enqueue(forward_queue, True, 0, self._start, None, None,
+                      tie_breaker)
+        for node in self._won_nodes():
+            self._enqueue(backward_queue, False, 0, node, None, None,
+                          tie_breaker)
+
+        while forward_queue and backward_queue:
+            is_forward = len(forward_queue) <= len(backward_queue)
+            if is_forward:
+                queue, seen, other = forward_queue, forward, backward
+            else:
+                queue, seen, other = backward_queue, backward, forward
+
+            _, _, g, (crates, filled, player), parent, push = heappop(queue)
+            reach = self._reach(crates, player)
+            node = (crates, filled, min(reach))
+            if node in seen:
+                continue
+            seen[node] = (parent, push)
+            if node in other:
+                return self._build_moves(node, forward, backward)
+
+            self._states_expanded += 1
+            if self._states_expanded > max_states:
+                self._complete = False
+                return None
+            successors = (self._pushes(node, reach) if is_forward
+                          else self._pulls(node, reach))
+            for successor, push in successors:
+                self._enqueue(queue, is_forward, g + 1, successor, node, push,
+                              tie_breaker)
+        return None
+
+    def _enqueue(
+        self,
+        queue: list,
+        is_forward: bool,
+        g: int,
+        node: Node,
+        parent: Node | None,
+        push: tuple[int, str] | None,
+        tie_breaker: count
+    ) -> None:
+        """ Adds node to the queue of the given direction, unless its
+            heuristic shows it can't lead to the other end of the search.
+        """
+        h = self._heuristic(node, is_forward)
+        if h != INFINITY:
+            heappush(queue, (g + h, next(tie_breaker), g, node, parent, push))
+
+    def _heuristic(self, node: Node, is_forward: bool) -> float:
+        """ Returns an estimate of the pushes between node and the won
+            position (is_forward) or the start (otherwise), which is INFINITY
+            if some crate can't get there.
+        """
+        crates, filled, _ = node
+        cache = self._heuristic_cache[is_forward]
+        key = (crates, filled)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+        if is_forward:
+            distances = [distances for goal, distances in self._to_goals.items()
+                         if not filled >> goal & 1]
+            sources = list(_bit_indices(crates))
+        else:
+            distances = self._from_crates
+            sources = list(_bit_indices(crates)) + list(_bit_indices(filled))
+        costs = [[row.get(source, INFINITY) for source in sources]
+                 for row in distances]
+        result = cache[key] = min_cost_matching(costs)
+        return result
+
+    def _push_distances(self, start: int) -> dict[int, int]:
+        """ Returns the fewest pushes taking a crate from cell start to each
+            cell it can reach, ignoring all other crates.
+        """
+        distances = {start: 0}
+        frontier = [start]
+        while frontier:
+            next_frontier = []
+            for index in frontier:
+                for step in self._steps.values():
+                    target = index + step
+                    if (self._open[target] and self._open[index - step]
+                            and target not in distances):
+                        distances[target] = distances[index] + 1
+                        next_frontier.append(target)
+            frontier = next_frontier
+        return distances
+
+    def _to_index(self, position: Position) -> int:
+        """ Returns the cell index of the (row, col) position. """
+        return (position[0] + 1) * self._width + position[1] + 1
+
+    def _reach(self, crates: int, player: int) -> set[int]:
+        """ Returns the cells the player can walk to from player without
+            pushing any of crates.
+        """
+        reach = {player}
+        stack = [player]
+        is_open = self._open
+        steps = tuple(self._steps.values())
+        while stack:
+            index = stack.pop()
+            for step in steps:
+                neighbour = index + step
+                if (is_open[neighbour] and neighbour not in reach
+                        and not crates >> neighbour & 1):
+                    reach.add(neighbour)
+                    stack.append(neighbour)
+        return reach
+
+    def _won_nodes(self) -> list[Node]:
+        """ Returns a won node (no crates, every goal filled) for each area the
+            player could end the game in, i.e. next to a goal with room to
+            have pushed a crate onto it.
+        """
+        won = []
+        seen = set()
+        goal_bits = self._goal_bits
+        for index, is_open in enumerate(self._open):
+            if not is_open or index in seen:
+                continue
+            reach = self._reach(0, index)
+            seen |= reach
+            if any(goal_bits >> (cell + step) & 1
+                   and self._open[cell - step]
+                   for cell in reach for step in self._steps.values()):
+                won.append((0, goal_bits, index))
+        return won
+
+    def _pushes(self, node: Node, reach: set[int]):
+        """ Yields (successor, push) for each push from node, where push is
+            (index of the crate pushed, direction).
+        """
+        crates, filled, _ = node
+        is_open = self._open
+        for cell in reach:
+            for direction, step in self._steps.items():
+                crate = cell + step
+                if not crates >> crate & 1:
+                    continue
+                target = crate + step
+                if not is_open[target] or crates >> target & 1:
+                    continue
+                without = crates & ~(1 << crate)
+                if self._goal_bits >> target & 1 and not filled >> target & 1:
+                    successor = (without, filled | 1 << target, crate)
+                elif self._dead[target]:
+                    continue
+                else:
+                    successor = (without | 1 << target, filled, crate)
+                yield successor, (crate, direction)
+
+    def _pulls(self, node: Node, reach: set[int]):
+        """ Yields (predecessor, push) for each pull from node, where push is
+            the push (crate index, direction) which undoes the pull, i.e.
+            leads from the predecessor to node.
+        """
+        crates, filled, _ = node
+        is_open = self._open
+        unfilled = self._goal_bits & ~filled
+        for cell in reach:
+            # The crate is pulled onto cell, so cell can't be an unfilled goal
+            if unfilled >> cell & 1:
+                continue
+            for direction, step in self._steps.items():
+                behind = cell - step
+                if not is_open[behind] or crates >> behind & 1:
+                    continue
+                source = cell + step
+                if crates >> source & 1:
+                    predecessor = (crates & ~(1 << source) | 1 << cell,
+                                   filled, behind)
+                elif filled >> source & 1:
+                    # The crate which filled this goal comes back out of it
+                    predecessor = (crates | 1 << cell,
+                                   filled & ~(1 << source), behind)
+                else:
+                    continue
+                yield predecessor, (cell, direction)
+
+    def _build_moves(
+        self,
+        meeting: Node,
+        forward: dict,
+        backward: dict
+    ) -> str:
+        """ Returns the moves of the plan through the meeting node: the pushes
+            leading to it from the start, then those leading from it to the
+            won position, with the walks between them.
+        """
+        pushes = []
+        node = meeting
+        while forward[node][0] is not None:
+            node, push = forward[node]
+            pushes.append(push)
+        pushes.reverse()
+        node = meeting
+        while backward[node][0] is not None:
+            node, push = backward[node]
+            pushes.append(push)
+
+        crates, filled, player = self._start
+        moves = []
+        for crate, direction in pushes:
+            step = self._steps[direction]
+            moves.extend(self._walk(crates, player, crate - step))
+            moves.append(direction)
+            target = crate + step
+            crates &= ~(1 << crate)
+            if self._goal_bits >> target & 1 and not filled >> target & 1:
+                filled |= 1 << target
+            else:
+                crates |= 1 << target
+            player = crate
+        return ''.join(moves)
+
+    def _walk(self, crates: int, source: int, target: int) -> list[str]:
+        """ Returns a shortest list of moves from cell source to cell target
+            which doesn't push any of crates.
+        """
+        came_from = {source: None}
+        frontier = [source]
+        while target not in came_from:
+            next_frontier = []
+            for index in frontier:
+                for direction, step in self._steps.items():
+                    neighbour = index + step
+                    if (self._open[neighbour] and neighbour not in came_from
+                            and not crates >> neighbour & 1):
+                        came_from[neighbour] = (index, direction)
+                        next_frontier.append(neighbour)
+            frontier = next_frontier
+
+        moves = []
+        while came_from[target] is not None:
+            target, direction = came_from[target]
+            moves.append(direction)
+        moves.reverse()
+        return moves
@@ -0,0 +1,269 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from planner import ShopPlanner
+from solver import DEFAULT_MAX_STATES
+# a2_support (imported by planner) puts the shared modules on the path
+from binary_maze import BINARY_EXTENSION
+
+CACHE_FILE = '.solvability_cache.json'
+# Bump when the planner changes in a way that could change its answers
+CACHE_VERSION = 2
+MAZE_PATTERNS = ('*.txt', '*' + BINARY_EXTENSION)
+
+SOLVED = 'solved'
+UNSOLVABLE = 'unsolvable'
+UNKNOWN = 'unknown'
+ERROR = 'error'
+
+
+def hash_maze_file(maze_file: str) -> str:
+    """ Returns the SHA-256 hex digest of the contents of maze_file. """
+    digest = hashlib.sha256()
+    with open(maze_file, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def check_maze(maze_file: str, max_states: int = DEFAULT_MAX_STATES) -> dict:
+    """ Solves one maze file within its move budget and strength constraints,
+        buying potions from the shop where that helps (see ShopPlanner).
+
+    Parameters:
+        maze_file: The path to the maze file.
+        max_states: The most states the planner may expand before giving up.
+
+    Returns:
+        A JSON-serialisable dictionary with the status (SOLVED, UNSOLVABLE, or
+        UNKNOWN if the planner gave up), the minimal number of moves and the
+        pushes, moves, purchases (as [move number, item] pairs, each item
+        bought just before that move) and money spent of that solution (None
+        unless solved), the states expanded, the max_states allowed and the
+        seconds taken.
+    """
+    start = time.perf_counter()
+    planner = ShopPlanner.from_file(maze_file)
+    plan = planner.solve(max_states)
+    if plan is not None:
+        status = SOLVED
+    elif planner.search_was_complete():
+        status = UNSOLVABLE
+    else:
+        status = UNKNOWN
+    return {
+        'status': status,
+        'moves': len(plan) if plan is not None else None,
+        'pushes': plan.get_pushes() if plan is not None else None,
+        'solution': plan.get_moves() if plan is not None else None,
+        'purchases': ([list(purchase) for purchase in plan.get_purchases()]
+                      if plan is not None else None),
+        'money_spent': plan.get_money_spent() if plan is not None else None,
+        'states_expanded': planner.get_states_expanded(),
+        'max_states': max_states,
+        'seconds': round(time.perf_counter() - start, 3),
+    }
+
+
+def error_result(error: Exception, max_states: int) -> dict:
+    """ Returns a result like check_maze's, with the status ERROR, for a maze
+        which could not be checked because of error (e.g. a malformed file).
+    """
+    return {
+        'status': ERROR,
+        'error': f'{type(error).__name__}: {error}',
+        'moves': None,
+        'pushes': None,
+        'solution': None,
+        'purchases': None,
+        'money_spent': None,
+        'states_expanded': None,
+        'max_states': max_states,
+        'seconds': None,
+    }
+
+
+def _check_job(job: tuple[str, int]) -> dict:
+    """ Runs check_maze on a (maze_file, max_states) job in a worker. """
+    return check_maze(*job)
+
+
+def load_cache(cache_file: str) -> dict:
+    """ Returns the results cached in cache_file, keyed by maze content hash.
+        A missing, unreadable or out of date cache is treated as empty.
+    """
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as file:
+            cache = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    if cache.get('version') != CACHE_VERSION:
+        return {}
+    return cache.get('results', {})
+
+
+def save_cache(cache_file: str, results: dict) -> None:
+    """ Writes results to cache_file, replacing it atomically so that an
+        interrupted run never leaves a truncated cache behind.
+    """
+    temporary = cache_file + '.tmp'
+    with open(temporary, 'w', encoding='utf-8') as file:
+        json.dump({'version': CACHE_VERSION, 'results': results}, file,
+                  indent=1, sort_keys=True)
+    os.replace(temporary, cache_file)
+
+
+def _is_usable(result: dict | None, max_states: int) -> bool:
+    """ Returns True iff a cached result answers a check with max_states: a
+        definite answer always does, but giving up only does if the planner
+        was allowed at least as many states.
+    """
+    if result is None:
+        return False
+    return result['status'] != UNKNOWN or result['max_states'] >= max_states
+
+
+def check_pack(
+    maze_files: list[str],
+    cache_file: str,
+    workers: int = None,
+    max_states: int = DEFAULT_MAX_STATES
+) -> list[dict]:
+    """ Checks whether each maze file is solvable, solving only the mazes whose
+        contents have no usable result in the cache, in parallel. A maze which
+        cannot be checked gets an error_result instead, which is not cached,
+        and the other mazes are still checked.
+
+    Parameters:
+        maze_files: The paths of the maze files to check.
+        cache_file: The path of the results cache (created if missing).
+        workers: The number of worker processes (defaults to the CPU count).
+                 If 1, the mazes are solved in this process.
+        max_states: The most states the planner may expand per maze.
+
+    Returns:
+        The check_maze result for each maze file, in the same order as
+        maze_files, with extra 'maze_file', 'hash' and 'cached' keys.
+    """
+    cache = load_cache(cache_file)
+    hashes = [hash_maze_file(maze_file) for maze_file in maze_files]
+    pending = {}
+    for maze_file, digest in zip(maze_files, hashes):
+        if not _is_usable(cache.get(digest), max_states):
+            pending.setdefault(digest, maze_file)
+
+    errors = {}
+
+    def store(digest: str, result: dict) -> None:
+        cache[digest] = result
+        save_cache(cache_file, cache)
+        print(f'solved {pending[digest]}: {result["status"]}', file=sys.stderr)
+
+    def fail(digest: str, error: Exception) -> None:
+        errors[digest] = error_result(error, max_states)
+        print(f'failed {pending[digest]}: {errors[digest]["error"]}',
+              file=sys.stderr)
+
+    if workers == 1 or len(pending) <= 1:
+        for digest, maze_file in pending.items():
+            try:
+                result = check_maze(maze_file, max_states)
+            except Exception as error:
+                fail(digest, error)
+            else:
+                store(digest, result)
+    else:
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(_check_job, (maze_file, max_states)):
+                       digest for digest, maze_file in pending.items()}
+            for future in as_completed(futures):
+                try:
+                    result = future.result()
+                except Exception as error:
+                    fail(futures[future], error)
+                else:
+                    store(futures[future], result)
+
+    return [dict(errors.get(digest) or cache[digest], maze_file=maze_file,
+                 hash=digest, cached=digest not in pending)
+            for maze_file, digest in zip(maze_files, hashes)]
+
+
+def find_maze_files(directory: str) -> list[str]:
+    """ Returns the text and binary maze files in directory, sorted by name.
+    """
+    maze_files = []
+    for pattern in MAZE_PATTERNS:
+        maze_files.extend(glob.glob(os.path.join(directory, pattern)))
+    return sorted(maze_files)
+
+
+def main() -> None:
+    """ Checks a directory of maze files from the command line. The exit
+        status is 1 if any maze is unsolvable, 2 if any is undecided, and 3 if
+        any could not be checked.
+    """
+    parser = argparse.ArgumentParser(
+        description='Check that every maze in a level pack is solvable.')
+    parser.add_argument('directory', nargs='?', default='maze_files',
+                        help='directory of maze files (default: maze_files)')
+    parser.add_argument('--cache',
+                        help=f'results cache (default: DIRECTORY/{CACHE_FILE})')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of worker processes')
+    parser.add_argument('--max-states', type=int, default=DEFAULT_MAX_STATES,
+                        help='states the planner may expand per maze')
+    parser.add_argument('--json', help='write the results to this file')
+    args = parser.parse_args()
+
+    maze_files = find_maze_files(args.directory)
+    if not maze_files:
+        parser.error(f'no maze files in {args.directory}')
+    cache_file = args.cache or os.path.join(args.directory, CACHE_FILE)
+    results = check_pack(maze_files, cache_file, args.workers,
+                         args.max_states)
+
+    for result in results:
+        if result['status'] == SOLVED:
+            detail = f"{result['moves']} moves, {result['pushes']} pushes"
+            if result['purchases']:
+                detail += ', buys ' + ', '.join(
+                    f'{item} before move {number + 1}'
+                    for number, item in result['purchases'])
+        elif result['status'] == UNSOLVABLE:
+            detail = 'no solution within the move budget'
+        elif result['status'] == ERROR:
+            detail = result['error']
+        else:
+            detail = f"gave up after {result['states_expanded']} states"
+        if result['cached']:
+            source = 'cached'
+        elif result['seconds'] is None:
+            source = 'failed'
+        else:
+            source = f"{result['seconds']}s"
+        print(f"{result['maze_file']}: {result['status']} ({detail}) "
+              f"[{source}]")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+
+    statuses = {result['status'] for result in results}
+    if UNSOLVABLE in statuses:
+        sys.exit(1)
+    if UNKNOWN in statuses:
+        sys.exit(2)
+    if ERROR in statuses:
+        sys.exit(3)
+
+
+if __name__ == "__main__":
+    main()
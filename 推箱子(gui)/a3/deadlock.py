@@ -0,0 +1,257 @@
+from collections import deque
+from functools import lru_cache
+from typing import Callable
+
+from a2_support import *
+
+# Reasons a square is dead, from cheapest to most expensive to detect
+DEAD_CORNER = 'corner'
+DEAD_WALL = 'wall'
+DEAD_UNREACHABLE = 'unreachable'
+
+
+class DeadSquareTable:
+    """ The squares of a maze from which a crate can never be pushed onto an
+        unfilled goal, whatever else is in the maze. Only walls and goals are
+        considered, so the table can be shared by every game on the same maze.
+    """
+
+    def __init__(self, layout: tuple[str, ...]) -> None:
+        """ Constructor for DeadSquareTable.
+
+        Parameters:
+            layout: The maze, one string per row, using WALL for blocking
+                    tiles, GOAL for unfilled goals and FLOOR for the rest.
+        """
+        self._rows = len(layout)
+        self._cols = len(layout[0]) if layout else 0
+        self._layout = layout
+        self._goals = [(i, j) for i, row in enumerate(layout)
+                       for j, tile in enumerate(row) if tile == GOAL]
+        self._distances = {}
+
+        self._dead = {}
+        self._mark_corners()
+        self._mark_wall_segments()
+        live = self._pull_distances(self._goals)
+        for i, row in enumerate(layout):
+            for j, tile in enumerate(row):
+                position = (i, j)
+                if (tile == FLOOR and position not in self._dead
+                        and position not in live):
+                    self._dead[position] = DEAD_UNREACHABLE
+
+    def get_dimensions(self) -> tuple[int, int]:
+        """ Returns the dimensions of the maze as (#rows, #columns). """
+        return self._rows, self._cols
+
+    def get_goals(self) -> list[Position]:
+        """ Returns the positions of the unfilled goals. """
+        return self._goals
+
+    def is_dead(self, position: Position) -> bool:
+        """ Returns True iff a crate at position can never reach a goal. """
+        return position in self._dead
+
+    def get_reason(self, position: Position) -> str | None:
+        """ Returns why position is dead (DEAD_CORNER, DEAD_WALL or
+            DEAD_UNREACHABLE), or None if it is not a dead square.
+        """
+        return self._dead.get(position)
+
+    def get_dead_squares(self) -> set[Position]:
+        """ Returns the positions of every dead square. """
+        return set(self._dead)
+
+    def get_push_distances(self, goal: Position) -> dict[Position, int]:
+        """ Returns a dictionary mapping each position from which a crate can
+            reach goal to the minimum number of pushes needed, ignoring all
+            other crates and entities.
+
+        Parameters:
+            goal: The position of an unfilled goal.
+        """
+        distances = self._distances.get(goal)
+        if distances is None:
+            distances = self._distances[goal] = self._pull_distances([goal])
+        return distances
+
+    def is_wall(self, position: Position) -> bool:
+        """ Returns True iff position is out of bounds or a wall. """
+        return not self._is_open(position)
+
+    def _is_open(self, position: Position) -> bool:
+        """ Returns True iff position is in bounds and not a wall. """
+        row, col = position
+        return (0 <= row < self._rows and 0 <= col < self._cols
+                and self._layout[row][col] != WALL)
+
+    def _pull_distances(self, goals: list[Position]) -> dict[Position, int]:
+        """ Returns push distances to the nearest of goals, found by pulling a
+            crate backwards away from them: a crate can come from
+            position - delta whenever the player has room to stand behind it
+            at position - 2 * delta.
+        """
+        distances = {goal: 0 for goal in goals}
+        queue = deque(goals)
+        while queue:
+            position = queue.popleft()
+            for d_row, d_col in DIRECTION_DELTAS.values():
+                crate = (position[0] - d_row, position[1] - d_col)
+                player = (crate[0] - d_row, crate[1] - d_col)
+                if (crate not in distances and self._is_open(crate)
+                        and self._is_open(player)):
+                    distances[crate] = distances[position] + 1
+                    queue.append(crate)
+        return distances
+
+    def _is_corner(self, row: int, col: int) -> bool:
+        """ Returns True iff the floor at (row, col) has a wall both above or
+            below it and to its left or right.
+        """
+        vertical = (not self._is_open((row - 1, col))
+                    or not self._is_open((row + 1, col)))
+        horizontal = (not self._is_open((row, col - 1))
+                      or not self._is_open((row, col + 1)))
+        return vertical and horizontal
+
+    def _mark_corners(self) -> None:
+        """ Marks floor squares wedged into a corner as dead. """
+        for i, row in enumerate(self._layout):
+            for j, tile in enumerate(row):
+                if tile == FLOOR and self._is_corner(i, j):
+                    self._dead[(i, j)] = DEAD_CORNER
+
+    def _mark_wall_segments(self) -> None:
+        """ Marks floor squares between two dead corners as dead when the whole
+            run hugs a wall on the same side and contains no goal: a crate
+            pushed onto it can only slide along the wall into a corner.
+        """
+        corners = [position for position, reason in self._dead.items()
+                   if reason == DEAD_CORNER]
+        for row, col in corners:
+            for d_row, d_col in ((0, 1), (1, 0)):
+                side_a, side_b = (d_col, d_row), (-d_col, -d_row)
+                run = []
+                position = (row + d_row, col + d_col)
+                while (self._is_open(position)
+                        and self._layout[position[0]][position[1]] != GOAL):
+                    if self._dead.get(position) == DEAD_CORNER:
+                        if run and (self._hugs_wall(run, side_a)
+                                    or self._hugs_wall(run, side_b)):
+                            for square in run:
+                                self._dead[square] = DEAD_WALL
+                        break
+                    run.append(position)
+                    position = (position[0] + d_row, position[1] + d_col)
+
+    def _hugs_wall(self, run: list[Position], side: tuple[int, int]) -> bool:
+        """ Returns True iff every square in run has a wall on the given side.
+        """
+        return all(not self._is_open((row + side[0], col + side[1]))
+                   for row, col in run)
+
+
+VERTICAL = ((-1, 0), (1, 0))
+HORIZONTAL = ((0, -1), (0, 1))
+
+
+def is_frozen(
+    position: Position,
+    table: DeadSquareTable,
+    crate_strength: Callable[[Position], int | None],
+    max_strength: int
+) -> bool:
+    """ Returns True iff the crate at position can never be pushed again (and
+        so can never reach a goal). Only the crates around position are
+        inspected, so this is cheap enough to run after every push.
+
+        A crate is frozen when it is too heavy for the strongest the player
+        could ever become, or when it is blocked both vertically and
+        horizontally. It is blocked along an axis by a wall on either side,
+        by dead squares on both sides, or by a neighbouring crate which is
+        itself frozen or blocked along the other axis.
+
+    Parameters:
+        position: The position of the crate to check.
+        table: The dead square table for the maze.
+        crate_strength: Returns the strength of the crate at a position, or
+                        None if there is no crate there.
+        max_strength: An upper bound on the strength the player can reach
+                      (e.g. counting potions still in the maze and potions
+                      the player could buy).
+    """
+    if crate_strength(position) > max_strength:
+        return True
+    checked = {position}
+    return (_is_blocked(position, VERTICAL, table, crate_strength,
+                        max_strength, checked)
+            and _is_blocked(position, HORIZONTAL, table, crate_strength,
+                            max_strength, checked))
+
+
+def _is_blocked(
+    position: Position,
+    axis: tuple[Position, Position],
+    table: DeadSquareTable,
+    crate_strength: Callable[[Position], int | None],
+    max_strength: int,
+    checked: set[Position]
+) -> bool:
+    """ Returns True iff the crate at position cannot be pushed along axis.
+        Crates in checked are already being examined and count as walls,
+        which breaks cycles such as a 2x2 block of crates.
+    """
+    row, col = position
+    sides = [(row + d_row, col + d_col) for d_row, d_col in axis]
+    if any(table.is_wall(side) for side in sides):
+        return True
+    if all(table.is_dead(side) for side in sides):
+        return True
+
+    other_axis = HORIZONTAL if axis == VERTICAL else VERTICAL
+    for side in sides:
+        strength = crate_strength(side)
+        if strength is None:
+            continue
+        if side in checked or strength > max_strength:
+            return True
+        checked.add(side)
+        blocked = _is_blocked(side, other_axis, table, crate_strength,
+                              max_strength, checked)
+        checked.discard(side)
+        if blocked:
+            return True
+    return False
+
+
+def get_layout(maze: Grid) -> tuple[str, ...]:
+    """ Returns the walls and unfilled goals of maze, one string per row, in
+        the form DeadSquareTable expects.
+
+    Parameters:
+        maze: The maze, as a list of lists of tiles.
+    """
+    return tuple(
+        ''.join(WALL if tile.is_blocking()
+                else GOAL if tile.get_type() == GOAL and not tile.is_filled()
+                else FLOOR
+                for tile in row)
+        for row in maze
+    )
+
+
+@lru_cache(maxsize=256)
+def _table_for_layout(layout: tuple[str, ...]) -> DeadSquareTable:
+    """ Returns the (cached) dead square table for the given layout. """
+    return DeadSquareTable(layout)
+
+
+def get_dead_square_table(maze: Grid) -> DeadSquareTable:
+    """ Returns the dead square table for maze. Tables are cached by layout, so
+        reloading or resetting the same maze file reuses the first one.
+
+    Parameters:
+        maze: The maze, as a list of lists of tiles.
+    """
+    return _table_for_layout(get_layout(maze))
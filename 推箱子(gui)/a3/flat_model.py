@@ -0,0 +1,549 @@
+import re
+from collections.abc import Mapping
+
+from a2_support import *
+from deadlock import get_dead_square_table
+from model import (COIN_AMOUNT, ENTITY_IDS_TO_CLASS, SokobanModel, Crate,
+                   Entity, convert_maze)
+from state import COIN, ITEM_TYPES, SokobanState
+
+# Cell codes of the flat maze. The border of BLOCKED cells all round means
+# that neighbours never need bounds checks.
+BLOCKED = 0
+OPEN = 1
+UNFILLED_GOAL = 2
+FILLED_GOAL_CELL = 3
+
+# Item codes of the flat item array (0 means no item)
+ITEM_CODES = {item: code for code, item in enumerate(ITEM_TYPES, start=1)}
+ITEM_NAMES = dict(enumerate(ITEM_TYPES, start=1))
+
+# The flat crate array holds each crate's strength plus this, so that 0 can
+# mean no crate even though a crate's strength can be 0
+CRATE_OFFSET = 1
+
+# Any non-zero byte, to find the occupied cells of a flat array
+_OCCUPIED = re.compile(rb'[^\x00]')
+# Maps each cell code to 1 if the player can stand on it, else 0
+_PASSABLE = bytes([0] + [1] * 255)
+
+# Undo records are tuples (player_from, player_to, crate_from, crate_to,
+# crate_strength, filled, item_index, item_code, strength, moves, money,
+# was_lost, lost). crate_from is -1 if no crate was pushed, and crate_to is
+# the goal the crate went to if filled is True. crate_strength is as stored
+# in the flat crate array (plus CRATE_OFFSET). item_index is -1 if no item
+# was consumed. strength, moves and money are the changes to the stats.
+(PLAYER_FROM, PLAYER_TO, CRATE_FROM, CRATE_TO, CRATE_STRENGTH, FILLED,
+ ITEM_INDEX, ITEM_CODE, STRENGTH, MOVES, MONEY, WAS_LOST, LOST) = range(13)
+
+
+def _item_changes(item: str) -> tuple[int, int, int]:
+    """ Returns the (strength, moves, money) an item gives when picked up. """
+    if item == COIN:
+        return 0, 0, COIN_AMOUNT
+    effect = ENTITY_IDS_TO_CLASS[item]().effect()
+    return effect.get('strength', 0), effect.get('moves', 0), 0
+
+
+ITEM_CHANGES = {code: _item_changes(item) for code, item in ITEM_NAMES.items()}
+
+
+class FlatEntities(Mapping):
+    """ A read-only view of the crates and items of a FlatSokobanModel as a
+        mapping from (row, col) positions to entities, like
+        SokobanModel.get_entities. Looking up a position reads the flat
+        arrays directly, so views only pay for the positions they look at.
+    """
+
+    def __init__(self, model: 'FlatSokobanModel') -> None:
+        """ Constructor for FlatEntities.
+
+        Parameters:
+            model: The model whose crates and items to show.
+        """
+        self._model = model
+
+    def __getitem__(self, position: Position) -> Entity:
+        index = self._model._index_of(position)
+        if index is None:
+            raise KeyError(position)
+        crate = self._model._crates[index]
+        if crate:
+            return Crate(crate - CRATE_OFFSET)
+        code = self._model._items[index]
+        if code:
+            return ENTITY_IDS_TO_CLASS[ITEM_NAMES[code]]()
+        raise KeyError(position)
+
+    def __contains__(self, position) -> bool:
+        index = self._model._index_of(position)
+        return index is not None and bool(self._model._crates[index]
+                                          or self._model._items[index])
+
+    def __iter__(self):
+        model = self._model
+        indices = sorted(
+            {match.start() for match in _OCCUPIED.finditer(model._crates)}
+            | {match.start() for match in _OCCUPIED.finditer(model._items)})
+        for index in indices:
+            yield model._position_of(index)
+
+    def __len__(self) -> int:
+        model = self._model
+        return (len(model._crates) - model._crates.count(0)
+                + len(model._items) - model._items.count(0))
+
+
+class FlatSokobanModel(SokobanModel):
+    """ A SokobanModel which keeps the maze, crates and items in flat arrays
+        indexed by (row + 1) * (#columns + 2) + col + 1, instead of a grid of
+        tiles and a dictionary of entities. Moves step by a precomputed offset
+        per direction, and snapshots are copies of the arrays.
+
+        The public getters are the same as SokobanModel's: get_maze returns a
+        grid of tiles kept in step with the goals, and get_entities a
+        FlatEntities view, so the views work with either backend.
+    """
+
+    def reset(self) -> None:
+        """ Resets the model to its initial state. """
+        raw_maze, (strength, moves) = read_file(self._maze_file)
+        maze, entities, player_position = convert_maze(raw_maze)
+        self._rows, self._cols = len(maze), len(maze[0])
+        self._width = width = self._cols + 2
+        size = width * (self._rows + 2)
+        self._steps = {direction: d_row * width + d_col
+                       for direction, (d_row, d_col)
+                       in DIRECTION_DELTAS.items()}
+
+        self._cells = bytearray(size)
+        self._goal_tiles = {}
+        for row, line in enumerate(maze):
+            for col, tile in enumerate(line):
+                index = (row + 1) * width + col + 1
+                if tile.is_blocking():
+                    continue
+                if tile.get_type() == GOAL:
+                    self._goal_tiles[index] = tile
+                    self._cells[index] = (FILLED_GOAL_CELL if tile.is_filled()
+                                          else UNFILLED_GOAL)
+                else:
+                    self._cells[index] = OPEN
+        self._maze = maze
+
+        self._crates = bytearray(size)
+        self._items = bytearray(size)
+        for position, entity in entities.items():
+            index = self._cell_index(position)
+            if entity.get_type() == CRATE:
+                self._crates[index] = entity.get_strength() + CRATE_OFFSET
+            else:
+                self._items[index] = ITEM_CODES[entity.get_type()]
+        self._entity_view = FlatEntities(self)
+
+        self._player_index = self._cell_index(player_position)
+        self._strength = strength
+        self._moves = moves
+        self._money = 0
+        self._undo_stack = []
+        self._redo_stack = []
+        self._unfilled_goals = self._cells.count(UNFILLED_GOAL)
+        self._dead_squares = get_dead_square_table(self._maze)
+        self._track_crates()
+        self._build_passable()
+
+    def get_maze(self) -> Grid:
+        """ Returns the maze. The goal tiles are filled and unfilled as crates
+            are pushed onto them, so the grid can be kept between calls.
+        """
+        return self._maze
+
+    def get_dimensions(self) -> tuple[int, int]:
+        """ Returns the dimensions of the maze as (#rows, #columns). """
+        return self._rows, self._cols
+
+    def get_entities(self) -> FlatEntities:
+        """ Returns a read-only mapping from (row, col) positions to the
+            entities at those positions, which reflects later moves.
+        """
+        return self._entity_view
+
+    def get_player_position(self) -> Position:
+        """ Returns the player's current position. """
+        return self._position_of(self._player_index)
+
+    @property
+    def _player_position(self) -> Position:
+        """ The player's current position, for the methods of SokobanModel
+            which read it.
+        """
+        return self._position_of(self._player_index)
+
+    def get_player_moves_remaining(self) -> int:
+        """ Returns the number of moves remaining for the player. """
+        return self._moves
+
+    def get_player_strength(self) -> int:
+        """ Returns the player's current strength. """
+        return self._strength
+
+    def get_player_money(self) -> int:
+        """ Returns the amount of money the player has. """
+        return self._money
+
+    def export_state(self) -> SokobanState:
+        """ Returns a compact, hashable snapshot of the current game state. """
+        cols = self._cols
+        width = self._width
+
+        def flat(index):
+            row, col = divmod(index, width)
+            return (row - 1) * cols + col - 1
+
+        crates = 0
+        strengths = []
+        for match in _OCCUPIED.finditer(self._crates):
+            crates |= 1 << flat(match.start())
+            strengths.append(self._crates[match.start()] - CRATE_OFFSET)
+        filled = 0
+        for index in self._goal_tiles:
+            if self._cells[index] == FILLED_GOAL_CELL:
+                filled |= 1 << flat(index)
+        items = [0] * len(ITEM_TYPES)
+        for match in _OCCUPIED.finditer(self._items):
+            index = match.start()
+            items[self._items[index] - 1] |= 1 << flat(index)
+        return SokobanState((self._rows, cols), flat(self._player_index),
+                            crates, tuple(strengths), filled, tuple(items),
+                            self._strength, self._moves, self._money)
+
+    def import_state(self, state: SokobanState) -> None:
+        """ Replaces the current game state with the given snapshot. The undo
+            history is cleared.
+
+        Parameters:
+            state: A state exported from a model of the same maze file.
+        """
+        for index in self._goal_tiles:
+            filled = state.is_goal_filled(self._position_of(index))
+            self._set_goal(index, filled)
+        self._crates = bytearray(len(self._cells))
+        for position, strength in state.get_crates().items():
+            self._crates[self._cell_index(position)] = strength + CRATE_OFFSET
+        self._items = bytearray(len(self._cells))
+        for position, item in state.get_items().items():
+            self._items[self._cell_index(position)] = ITEM_CODES[item]
+
+        self._player_index = self._cell_index(state.get_player_position())
+        self._strength = state.get_player_strength()
+        self._moves = state.get_player_moves_remaining()
+        self._money = state.get_player_money()
+        self._after_load()
+
+    def snapshot(self) -> tuple:
+        """ Returns a copy of the current game state, which restore can return
+            to. The flat arrays are copied whole, along with the player and the
+            counts which follow from them, so neither needs a scan of the maze.
+            The undo history is not included.
+        """
+        return (bytes(self._cells), bytes(self._crates), bytes(self._items),
+                bytes(self._passable), self._player_index, self._strength,
+                self._moves, self._money, self._unfilled_goals,
+                self._crates_left, self._strength_limit,
+                frozenset(self._lost_crates))
+
+    def restore(self, snapshot: tuple) -> None:
+        """ Returns to a state taken with snapshot on this model, exactly as
+            the model was then. The undo history is cleared.
+
+        Parameters:
+            snapshot: A snapshot taken from this model.
+        """
+        (cells, crates, items, passable, self._player_index, self._strength,
+         self._moves, self._money, self._unfilled_goals, self._crates_left,
+         self._strength_limit, lost_crates) = snapshot
+        for index in self._goal_tiles:
+            self._set_goal(index, cells[index] == FILLED_GOAL_CELL)
+        self._crates = bytearray(crates)
+        self._items = bytearray(items)
+        self._passable = bytearray(passable)
+        self._lost_crates = set(lost_crates)
+        self._reach = None
+        self._reachable_positions = None
+        self._undo_stack = []
+        self._redo_stack = []
+
+    def _after_load(self) -> None:
+        """ Brings the counts and caches up to date after the whole state was
+            replaced, and clears the undo history.
+        """
+        self._undo_stack = []
+        self._redo_stack = []
+        self._unfilled_goals = self._cells.count(UNFILLED_GOAL)
+        self._track_crates()
+        self._build_passable()
+
+    def attempt_purchase(self, item: str) -> bool:
+        """ Attempts to purchase the given item.
+
+        Parameters:
+            item: The id / type of the item to purchase.
+        """
+        cost = self.ITEM_COSTS.get(item)
+        if cost is None or self._money < cost:
+            return False
+
+        strength, moves, _ = ITEM_CHANGES[ITEM_CODES[item]]
+        self._strength += strength
+        self._moves += moves
+        self._money -= cost
+        player = self._player_index
+        self._record((player, player, -1, -1, 0, False, -1, 0, strength,
+                      moves, -cost, False, ()))
+        return True
+
+    def attempt_move(self, direction: str) -> bool:
+        """ Attempts to move the player in the given direction.
+
+        Parameters:
+            direction: The direction to move in. This should be one of the
+                        constants UP, DOWN, LEFT or RIGHT, or 'u' for undo.
+
+        Returns:
+            True iff the move was successful.
+        """
+        if direction == 'u':
+            self.undo_move()
+            return True
+
+        step = self._steps.get(direction)
+        if step is None:
+            return False
+        source = self._player_index
+        target = source + step
+        if not self._cells[target]:
+            return False
+
+        crate_from = crate_to = item_index = -1
+        item_code = strength = money = 0
+        moves = -1
+        was_lost = filled = False
+        lost = ()
+        crate = self._crates[target]
+        if crate:
+            beyond = target + step
+            if (not self._cells[beyond] or self._crates[beyond]
+                    or self._items[beyond]
+                    or crate - CRATE_OFFSET > self._strength):
+                return False
+            crate_from = target
+            crate_to = beyond
+            self._crates[target] = 0
+            self._passable[target] = 1
+            position = self._position_of(target)
+            if position in self._lost_crates:
+                self._lost_crates.discard(position)
+                was_lost = True
+            if self._cells[beyond] == UNFILLED_GOAL:
+                filled = True
+                self._set_goal(beyond, True)
+                self._unfilled_goals -= 1
+                self._crates_left -= 1
+            else:
+                self._crates[beyond] = crate
+                self._passable[beyond] = 0
+                crates = self._crates
+                lost = self._find_lost_crates(
+                    [self._position_of(index) for index in
+                     (beyond, beyond - self._width, beyond + self._width,
+                      beyond - 1, beyond + 1) if crates[index]])
+            self._reach = None
+            self._reachable_positions = None
+        else:
+            item_code = self._items[target]
+            if item_code:
+                item_index = target
+                self._items[target] = 0
+                strength, gained, money = ITEM_CHANGES[item_code]
+                moves += gained
+                self._strength += strength
+                self._money += money
+
+        self._player_index = target
+        self._moves += moves
+        self._record((source, target, crate_from, crate_to, crate, filled,
+                      item_index, item_code, strength, moves, money, was_lost,
+                      lost))
+        return True
+
+    def undo_move(self) -> bool:
+        """ Undoes the last valid move (or purchase) made by the player.
+
+        Returns:
+            True iff there was a move to undo.
+        """
+        if not self._undo_stack:
+            return False
+        record = self._undo_stack.pop()
+
+        self._strength -= record[STRENGTH]
+        self._moves -= record[MOVES]
+        self._money -= record[MONEY]
+        if record[ITEM_INDEX] >= 0:
+            self._items[record[ITEM_INDEX]] = record[ITEM_CODE]
+        crate_from = record[CRATE_FROM]
+        if crate_from >= 0:
+            crate_to = record[CRATE_TO]
+            if record[FILLED]:
+                self._set_goal(crate_to, False)
+                self._unfilled_goals += 1
+                self._crates_left += 1
+            else:
+                self._crates[crate_to] = 0
+                self._passable[crate_to] = 1
+            self._crates[crate_from] = record[CRATE_STRENGTH]
+            self._passable[crate_from] = 0
+            self._reach = None
+            self._reachable_positions = None
+            self._lost_crates.difference_update(record[LOST])
+            if record[WAS_LOST]:
+                self._lost_crates.add(self._position_of(crate_from))
+        self._player_index = record[PLAYER_FROM]
+
+        self._redo_stack.append(record)
+        return True
+
+    def redo_move(self) -> bool:
+        """ Redoes the last move (or purchase) undone by undo_move.
+
+        Returns:
+            True iff there was a move to redo.
+        """
+        if not self._redo_stack:
+            return False
+        record = self._redo_stack.pop()
+
+        crate_from = record[CRATE_FROM]
+        if crate_from >= 0:
+            self._crates[crate_from] = 0
+            self._passable[crate_from] = 1
+            crate_to = record[CRATE_TO]
+            if record[FILLED]:
+                self._set_goal(crate_to, True)
+                self._unfilled_goals -= 1
+                self._crates_left -= 1
+            else:
+                self._crates[crate_to] = record[CRATE_STRENGTH]
+                self._passable[crate_to] = 0
+            self._reach = None
+            self._reachable_positions = None
+            if record[WAS_LOST]:
+                self._lost_crates.discard(self._position_of(crate_from))
+            self._lost_crates.update(record[LOST])
+        if record[ITEM_INDEX] >= 0:
+            self._items[record[ITEM_INDEX]] = 0
+        self._strength += record[STRENGTH]
+        self._moves += record[MOVES]
+        self._money += record[MONEY]
+        self._player_index = record[PLAYER_TO]
+
+        self._undo_stack.append(record)
+        return True
+
+    def _record(self, record: tuple) -> None:
+        """ Pushes a newly made move onto the undo stack. A new move makes any
+            undone moves impossible to redo.
+
+        Parameters:
+            record: The undo record of the move.
+        """
+        self._undo_stack.append(record)
+        self._redo_stack.clear()
+
+    def _set_goal(self, index: int, filled: bool) -> None:
+        """ Fills or unfills the goal at index, in the flat maze and in the
+            grid of tiles returned by get_maze.
+        """
+        self._cells[index] = FILLED_GOAL_CELL if filled else UNFILLED_GOAL
+        tile = self._goal_tiles[index]
+        if filled:
+            tile.fill()
+        else:
+            tile.unfill()
+
+    def _index_of(self, position) -> int | None:
+        """ Returns the flat index of position, or None if it is out of
+            bounds.
+        """
+        try:
+            row, col = position
+        except (TypeError, ValueError):
+            return None
+        if not (0 <= row < self._rows and 0 <= col < self._cols):
+            return None
+        return (row + 1) * self._width + col + 1
+
+    def _position_of(self, index: int) -> Position:
+        """ Returns the (row, col) position of the flat index. """
+        row, col = divmod(index, self._width)
+        return row - 1, col - 1
+
+    def _in_bounds(self, row: int, col: int) -> bool:
+        """ Returns True iff the given (row, col) position is in bounds for the
+            maze.
+        """
+        return 0 <= row < self._rows and 0 <= col < self._cols
+
+    def _count_unfilled_goals(self) -> int:
+        """ Returns the number of unfilled goals. """
+        return self._cells.count(UNFILLED_GOAL)
+
+    def _track_crates(self) -> None:
+        """ Initialises the crate count, the player's strength limit and the
+            set of lost crates after the state has been (re)loaded.
+        """
+        crates = [self._position_of(match.start())
+                  for match in _OCCUPIED.finditer(self._crates)]
+        self._crates_left = len(crates)
+
+        strength = self._strength
+        money = self._money
+        for match in _OCCUPIED.finditer(self._items):
+            item_strength, _, item_money = ITEM_CHANGES[self._items[
+                match.start()]]
+            strength += item_strength
+            money += item_money
+        best_rate = max(ITEM_CHANGES[ITEM_CODES[item]][0] / cost
+                        for item, cost in self.ITEM_COSTS.items())
+        self._strength_limit = strength + int(money * best_rate)
+
+        self._lost_crates = set()
+        self._find_lost_crates(crates)
+
+    def _build_passable(self) -> None:
+        """ Builds the flat array of cells the player can walk on without
+            pushing (1) or not (0), after the state was (re)loaded.
+        """
+        passable = self._cells.translate(_PASSABLE)
+        for match in _OCCUPIED.finditer(self._crates):
+            passable[match.start()] = 0
+        self._passable = passable
+        self._reach = None
+        self._reachable_positions = None
+
+    def _crate_strength(self, position: Position) -> int | None:
+        """ Returns the strength of the crate at position, or None if there is
+            no crate there.
+        """
+        row, col = position
+        if not (0 <= row < self._rows and 0 <= col < self._cols):
+            return None
+        crate = self._crates[(row + 1) * self._width + col + 1]
+        return crate - CRATE_OFFSET if crate else None
+
+
+# The model classes which can be chosen by name, e.g. on the command line
+MODEL_BACKENDS = {
+    'objects': SokobanModel,
+    'flat': FlatSokobanModel,
+}
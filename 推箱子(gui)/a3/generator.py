@@ -0,0 +1,395 @@
+import argparse
+import json
+import math
+import os
+import random
+import re
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import count as count_from
+
+from a2_support import *
+from model import convert_maze
+from solver import SokobanSolver
+from state import COIN
+
+INDEX_FILE = 'levels.jsonl'
+LEVEL_NAME = 'level_{:05d}.txt'
+_LEVEL_PATTERN = re.compile(r'level_(\d+)\.txt')
+POTIONS = (STRENGTH_POTION, MOVE_POTION, FANCY_POTION)
+DEFAULT_MAX_STATES = 200_000
+# The chance that the player pulls a crate which is behind them as they step
+PULL_CHANCE = 0.7
+
+
+def effective_branching_factor(states_expanded: int, depth: int) -> float:
+    """ Returns the branching factor b a uniform search tree of the given depth
+        would need to hold states_expanded nodes, i.e. the b solving
+        b + b**2 + ... + b**depth == states_expanded.
+
+    Parameters:
+        states_expanded: The number of states the search expanded.
+        depth: The depth of the solution found.
+    """
+    if depth <= 0 or states_expanded <= depth:
+        return 1.0
+
+    def nodes(b):
+        return depth if b == 1 else b * (b ** depth - 1) / (b - 1)
+
+    low, high = 1.0, float(states_expanded)
+    for _ in range(60):
+        middle = (low + high) / 2
+        if nodes(middle) < states_expanded:
+            low = middle
+        else:
+            high = middle
+    return round(low, 3)
+
+
+def _flood(grid: list[list[str]], start: Position) -> set[Position]:
+    """ Returns the non-wall cells connected to start. """
+    seen = {start}
+    stack = [start]
+    while stack:
+        row, col = stack.pop()
+        for d_row, d_col in DIRECTION_DELTAS.values():
+            neighbour = (row + d_row, col + d_col)
+            if (neighbour not in seen
+                    and grid[neighbour[0]][neighbour[1]] != WALL):
+                seen.add(neighbour)
+                stack.append(neighbour)
+    return seen
+
+
+def make_layout(
+    rnd: random.Random,
+    rows: int,
+    cols: int,
+    wall_density: float
+) -> tuple[list[list[str]], set[Position]]:
+    """ Returns a grid of WALL and FLOOR surrounded by walls, with inner walls
+        scattered at random, and the largest connected area of floor in it.
+
+    Parameters:
+        rnd: The random number generator to use.
+        rows: The number of rows, including the outer walls.
+        cols: The number of columns, including the outer walls.
+        wall_density: The fraction of inner cells to turn into walls.
+    """
+    grid = [[WALL if i in (0, rows - 1) or j in (0, cols - 1) else FLOOR
+             for j in range(cols)] for i in range(rows)]
+    inner = [(i, j) for i in range(1, rows - 1) for j in range(1, cols - 1)]
+    for row, col in rnd.sample(inner, int(len(inner) * wall_density)):
+        grid[row][col] = WALL
+
+    area = set()
+    remaining = {position for position in inner
+                 if grid[position[0]][position[1]] == FLOOR}
+    while remaining:
+        component = _flood(grid, remaining.pop())
+        remaining -= component
+        if len(component) > len(area):
+            area = component
+    return grid, area
+
+
+def pull_crates(
+    rnd: random.Random,
+    grid: list[list[str]],
+    area: set[Position],
+    goals: list[Position],
+    steps: int
+) -> tuple[dict[Position, Position], Position, set[Position]] | None:
+    """ Starts with a crate on each goal and walks the player around at random
+        for the given number of steps, pulling crates along behind them. Played
+        backwards, the walk is a way to push every crate onto a goal, so the
+        maze it leaves behind can be won (as long as the crates are not too
+        heavy and nothing is put in their way).
+
+        As in SokobanModel, a crate pushed onto an unfilled goal fills it, so
+        a crate is never pulled onto a goal once it has left its own. The
+        player's cell is written over whatever tile is under them, so the walk
+        goes on past the given number of steps (up to twice as many) until the
+        player is off the goals.
+
+    Parameters:
+        rnd: The random number generator to use.
+        grid: The walls and floor of the maze.
+        area: The floor the player walks on, which contains the goals.
+        goals: The positions of the goals.
+        steps: The number of steps to try.
+
+    Returns:
+        None if some crate never left its goal, or the player ended up on a
+        goal. Otherwise a tuple of a
+        dictionary mapping each crate's position to its goal, the player's
+        position, and every cell a crate passed through on the way.
+    """
+    crates = {goal: goal for goal in goals}
+    goal_cells = set(goals)
+    player = rnd.choice([position for position in sorted(area)
+                         if position not in goal_cells])
+    crate_path = set(goals)
+    deltas = list(DIRECTION_DELTAS.values())
+
+    for step in range(2 * steps):
+        if step >= steps and player not in goal_cells:
+            break
+        d_row, d_col = rnd.choice(deltas)
+        target = (player[0] + d_row, player[1] + d_col)
+        if grid[target[0]][target[1]] == WALL or target in crates:
+            continue
+        behind = (player[0] - d_row, player[1] - d_col)
+        if (behind in crates and player not in goal_cells
+                and rnd.random() < PULL_CHANCE):
+            crates[player] = crates.pop(behind)
+            crate_path.add(player)
+        player = target
+
+    if player in goal_cells or any(position in goal_cells
+                                   for position in crates):
+        return None
+    return crates, player, crate_path
+
+
+def generate_level(
+    seed: int,
+    rows: int = 10,
+    cols: int = 10,
+    crates: int = 3,
+    wall_density: float = 0.15,
+    strength: int = 2,
+    potions: int = 2,
+    coins: int = 2,
+    min_pushes: int = 0,
+    slack: float = 0.25,
+    max_states: int = DEFAULT_MAX_STATES
+) -> dict | None:
+    """ Generates one maze from the given seed and checks it with the solver.
+
+        Crates are placed by pulling them off the goals (see pull_crates), and
+        potions and coins are then scattered where no crate went, so most
+        attempts can be won. The solver confirms it and finds the fewest moves
+        needed. The move budget is set to that number plus the slack.
+
+    Parameters:
+        seed: The seed for the random number generator. The same seed and
+              settings always give the same maze.
+        rows: The number of rows, including the outer walls.
+        cols: The number of columns, including the outer walls.
+        crates: The number of crates (and goals).
+        wall_density: The fraction of inner cells to turn into walls.
+        strength: The player's starting strength. Each crate's strength is
+                  between 1 and this.
+        potions: The number of potions to scatter.
+        coins: The number of coins to scatter.
+        min_pushes: Rejects mazes that can be won in fewer pushes.
+        slack: The extra fraction of moves the budget allows.
+        max_states: The most states the solver may expand before the maze is
+                    rejected.
+
+    Returns:
+        None if the maze was rejected. Otherwise a JSON-serialisable
+        dictionary with the seed, the lines of the maze file, the moves and
+        pushes of a shortest solution, the states expanded, the effective
+        branching factor and the difficulty.
+    """
+    rnd = random.Random(seed)
+    grid, area = make_layout(rnd, rows, cols, wall_density)
+    if len(area) < 2 * crates + 2:
+        return None
+    goals = rnd.sample(sorted(area), crates)
+    pulled = pull_crates(rnd, grid, area, goals, steps=40 * crates * crates
+                         + len(area))
+    if pulled is None:
+        return None
+    crate_positions, player, crate_path = pulled
+
+    raw_maze = [row[:] for row in grid]
+    for row, col in goals:
+        raw_maze[row][col] = GOAL
+    for row, col in crate_positions:
+        raw_maze[row][col] = str(rnd.randint(1, strength))
+    raw_maze[player[0]][player[1]] = PLAYER
+    free = sorted(position for position in area
+                  if position not in crate_path and position != player)
+    items = [rnd.choice(POTIONS) for _ in range(potions)] + [COIN] * coins
+    for (row, col), item in zip(rnd.sample(free, min(len(free), len(items))),
+                                items):
+        raw_maze[row][col] = item
+
+    # Solve with a budget that can't run out, then tighten it to fit
+    maze, entities, player_position = convert_maze(raw_maze)
+    solver = SokobanSolver(maze, entities, player_position,
+                           [strength, rows * cols * crates * 4])
+    plan = solver.solve(max_states)
+    if plan is None or plan.get_pushes() < min_pushes:
+        return None
+
+    states_expanded = plan.get_states_expanded()
+    branching = effective_branching_factor(states_expanded, plan.get_pushes())
+    budget = len(plan) + math.ceil(len(plan) * slack)
+    return {
+        'seed': seed,
+        'lines': [f'{strength} {budget}'] + [''.join(row) for row in raw_maze],
+        'moves': len(plan),
+        'pushes': plan.get_pushes(),
+        'states_expanded': states_expanded,
+        'branching_factor': branching,
+        'difficulty': round(plan.get_pushes() * branching, 2),
+    }
+
+
+def last_level_number(directory: str) -> int:
+    """ Returns the highest number of the level files in directory, or 0 if
+        there are none (or no such directory).
+    """
+    if not os.path.isdir(directory):
+        return 0
+    numbers = [int(match.group(1)) for match in
+               map(_LEVEL_PATTERN.fullmatch, os.listdir(directory)) if match]
+    return max(numbers, default=0)
+
+
+def _write_level(directory: str, number: int, level: dict) -> dict:
+    """ Writes level to the maze file with the given number in directory and
+        appends its entry to the index file. Returns the entry.
+    """
+    name = LEVEL_NAME.format(number)
+    with open(os.path.join(directory, name), 'w') as file:
+        file.write('\n'.join(level['lines']) + '\n')
+    entry = {key: value for key, value in level.items() if key != 'lines'}
+    entry['maze_file'] = name
+    with open(os.path.join(directory, INDEX_FILE), 'a',
+              encoding='utf-8') as file:
+        file.write(json.dumps(entry) + '\n')
+    return entry
+
+
+def generate_pack(
+    directory: str,
+    count: int,
+    settings: dict,
+    workers: int = None,
+    first_seed: int = 0,
+    max_attempts: int = None
+):
+    """ Generates maze files into directory until count have been accepted,
+        trying seeds in a pool of processes. Each maze is written (and its
+        entry appended to INDEX_FILE) as soon as it is accepted, so a long run
+        can be stopped at any point without losing the levels made so far.
+        Levels already in directory are kept: the new ones are numbered after
+        the highest existing level file. Levels are accepted in seed order
+        however many workers there are, so the same seeds and settings always
+        give the same pack.
+
+    Parameters:
+        directory: The directory to write to (created if missing).
+        count: The number of levels to generate.
+        settings: Keyword arguments for generate_level.
+        workers: The number of worker processes (defaults to the CPU count).
+                 If 1, the levels are generated in this process.
+        first_seed: The first seed to try; later seeds count up from it.
+        max_attempts: The most seeds to try (defaults to no limit).
+
+    Yields:
+        The index entry of each level, in seed order.
+    """
+    os.makedirs(directory, exist_ok=True)
+    seeds = iter(range(first_seed, first_seed + max_attempts)
+                 if max_attempts is not None else count_from(first_seed))
+    accepted = 0
+    number = last_level_number(directory)
+
+    if workers == 1:
+        for seed in seeds:
+            if accepted >= count:
+                return
+            level = generate_level(seed, **settings)
+            if level is not None:
+                accepted += 1
+                number += 1
+                yield _write_level(directory, number, level)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    # Keep a few seeds queued per worker, so no worker waits for the next
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        # The seeds being tried, oldest first
+        pending = deque()
+        for seed in seeds:
+            pending.append(executor.submit(generate_level, seed, **settings))
+            if len(pending) >= 2 * workers:
+                break
+        while pending and accepted < count:
+            level = pending.popleft().result()
+            seed = next(seeds, None)
+            if seed is not None:
+                pending.append(executor.submit(generate_level, seed,
+                                               **settings))
+            if level is not None:
+                accepted += 1
+                number += 1
+                yield _write_level(directory, number, level)
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def main() -> None:
+    """ Generates a level pack from the command line. """
+    parser = argparse.ArgumentParser(
+        description='Generate solvable Sokoban maze files.')
+    parser.add_argument('directory', help='directory to write the levels to')
+    parser.add_argument('--count', type=int, default=100,
+                        help='number of levels to generate')
+    parser.add_argument('--rows', type=int, default=10)
+    parser.add_argument('--cols', type=int, default=10)
+    parser.add_argument('--crates', type=int, default=3)
+    parser.add_argument('--wall-density', type=float, default=0.15)
+    parser.add_argument('--strength', type=int, default=2,
+                        help="player's starting strength (1-9)")
+    parser.add_argument('--potions', type=int, default=2)
+    parser.add_argument('--coins', type=int, default=2)
+    parser.add_argument('--min-pushes', type=int, default=0,
+                        help='reject levels that need fewer pushes')
+    parser.add_argument('--slack', type=float, default=0.25,
+                        help='extra fraction of moves in the move budget')
+    parser.add_argument('--max-states', type=int, default=DEFAULT_MAX_STATES,
+                        help='states the solver may expand per level')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='first seed to try')
+    parser.add_argument('--max-attempts', type=int, default=None,
+                        help='most seeds to try')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of worker processes')
+    args = parser.parse_args()
+    if not 1 <= args.strength <= 9:
+        parser.error('--strength must be between 1 and 9')
+
+    settings = {
+        'rows': args.rows,
+        'cols': args.cols,
+        'crates': args.crates,
+        'wall_density': args.wall_density,
+        'strength': args.strength,
+        'potions': args.potions,
+        'coins': args.coins,
+        'min_pushes': args.min_pushes,
+        'slack': args.slack,
+        'max_states': args.max_states,
+    }
+    generated = 0
+    for entry in generate_pack(args.directory, args.count, settings,
+                               args.workers, args.seed, args.max_attempts):
+        generated += 1
+        print(f"{entry['maze_file']}: seed {entry['seed']}, "
+              f"{entry['moves']} moves, {entry['pushes']} pushes, "
+              f"difficulty {entry['difficulty']}")
+    print(f'{generated} levels written to {args.directory}', file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+INFINITY = float('inf')
+
+
+def min_cost_matching(costs: list[list[float]]) -> float:
+    """ Returns the cost of the cheapest assignment of every row to a distinct
+        column of costs (Hungarian algorithm). Requires #rows <= #columns.
+
+    Parameters:
+        costs: A rectangular matrix of non-negative costs, which may contain
+               INFINITY for forbidden pairs.
+
+    Returns:
+        The minimum total cost, or INFINITY if no finite assignment exists.
+    """
+    n = len(costs)
+    if n == 0:
+        return 0
+    m = len(costs[0])
+    if n > m:
+        return INFINITY
+
+    # Forbidden pairs get a cost larger than any finite assignment so that the
+    # potentials stay finite; such an assignment is then reported as INFINITY.
+    big = 1 + sum(max((c for c in row if c != INFINITY), default=0)
+                  for row in costs)
+    matrix = [[c if c != INFINITY else big for c in row] for row in costs]
+
+    u = [0] * (n + 1)
+    v = [0] * (m + 1)
+    way = [0] * (m + 1)
+    match = [0] * (m + 1)
+    for i in range(1, n + 1):
+        match[0] = i
+        j0 = 0
+        min_v = [INFINITY] * (m + 1)
+        used = [False] * (m + 1)
+        while match[j0] != 0:
+            used[j0] = True
+            i0 = match[j0]
+            delta = INFINITY
+            j1 = 0
+            for j in range(1, m + 1):
+                if not used[j]:
+                    cur = matrix[i0 - 1][j - 1] - u[i0] - v[j]
+                    if cur < min_v[j]:
+                        min_v[j] = cur
+                        way[j] = j0
+                    if min_v[j] < delta:
+                        delta = min_v[j]
+                        j1 = j
+            for j in range(m + 1):
+                if used[j]:
+                    u[match[j]] += delta
+                    v[j] -= delta
+                else:
+                    min_v[j] -= delta
+            j0 = j1
+        while j0:
+            j1 = way[j0]
+            match[j0] = match[j1]
+            j0 = j1
+
+    total = 0
+    for j in range(1, m + 1):
+        if match[j]:
+            cost = matrix[match[j] - 1][j - 1]
+            if cost >= big:
+                return INFINITY
+            total += cost
+    return total
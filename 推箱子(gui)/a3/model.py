@@ -1,11 +1,18 @@
+from types import MappingProxyType
+from typing import Mapping
+
 from a2_support import *
+from deadlock import DeadSquareTable, get_dead_square_table, is_frozen
+from state import COIN, SokobanState
 
-COIN = '$'
 COIN_AMOUNT = 5
 
 
 class Tile:
-    """ Abstract class for a tile in the maze. """
+    """ Abstract class for a tile in the maze. Tiles and entities use __slots__
+        to keep the many instances in a large maze small.
+    """
+    __slots__ = ()
     TYPE = 'Abstract Tile'
     BLOCKING = False
 
@@ -25,18 +32,29 @@ class Tile:
 
 
 class Floor(Tile):
-    """ A basic floor tile (non-blocking) in the maze. """
+    """ A basic floor tile (non-blocking) in the maze. Floors have no state, so
+        every floor square in a maze shares FLOOR_TILE.
+    """
+    __slots__ = ()
     TYPE = FLOOR
 
 
 class Wall(Tile):
-    """ A basic wall tile (blocking) in the maze. """
+    """ A basic wall tile (blocking) in the maze. Walls have no state, so
+        every wall square in a maze shares WALL_TILE.
+    """
+    __slots__ = ()
     TYPE = WALL
     BLOCKING = True
 
 
+FLOOR_TILE = Floor()
+WALL_TILE = Wall()
+
+
 class Goal(Tile):
     """ A goal tile onto which crates should be pushed in the maze. """
+    __slots__ = ('_is_filled',)
     TYPE = GOAL
 
     def __init__(self) -> None:
@@ -62,6 +80,7 @@ class Goal(Tile):
 
 class Entity:
     """ Abstract class for an entity in the maze. """
+    __slots__ = ()
     TYPE = 'Abstract Entity'
     MOVABLE = False
 
@@ -82,6 +101,7 @@ class Entity:
 
 class Crate(Entity):
     """ A crate entity in the maze. """
+    __slots__ = ('_strength',)
     TYPE = CRATE
     MOVABLE = True
 
@@ -106,43 +126,50 @@ class Coin(Entity):
     """ A coin entity in the maze, which can be collected by a player to
         increase their money.
     """
+    __slots__ = ()
     TYPE = COIN
 
 
 class Potion(Entity):
     """ Abstract class for a potion entity in the maze. """
+    __slots__ = ()
     TYPE = 'Potion'
-    EFFECT = {}
+    EFFECT = MappingProxyType({})
 
-    def effect(self) -> dict[str, int]:
+    def effect(self) -> Mapping[str, int]:
         """ Returns the effect of this potion. Keys that may (or may not) exist
-            in this dictionary are 'strength' and 'moves'.
+            in this mapping are 'strength' and 'moves'. The mapping is shared
+            by every potion of the same type and cannot be modified.
         """
         return self.EFFECT
 
 
 class StrengthPotion(Potion):
     """ A potion that increases the strength of the player. """
+    __slots__ = ()
     TYPE = STRENGTH_POTION
-    EFFECT = {'strength': 2}
+    EFFECT = MappingProxyType({'strength': 2})
 
 
 class MovePotion(Potion):
     """ A potion that increases the moves remaining for the player. """
+    __slots__ = ()
     TYPE = MOVE_POTION
-    EFFECT = {'moves': 5}
+    EFFECT = MappingProxyType({'moves': 5})
 
 
 class FancyPotion(Potion):
     """ A potion that increases both the strength and moves remaining for the
         player.
     """
+    __slots__ = ()
     TYPE = FANCY_POTION
-    EFFECT = {'strength': 2, 'moves': 2}
+    EFFECT = MappingProxyType({'strength': 2, 'moves': 2})
 
 
 class Player(Entity):
     """ A player entity in the maze. """
+    __slots__ = ('_strength', '_moves_remaining', '_money')
     TYPE = PLAYER
 
     def __init__(self, start_strength: int, moves_remaining: int) -> None:
@@ -197,7 +224,7 @@ class Player(Entity):
         """
         self._moves_remaining += moves
 
-    def apply_effect(self, potion_effect: dict[str, int]) -> None:
+    def apply_effect(self, potion_effect: Mapping[str, int]) -> None:
         """ Applies the effects described in potion_effect to the player.
 
         Parameters:
@@ -215,6 +242,13 @@ TILE_IDS_TO_CLASS = {
     FILLED_GOAL: Goal,
 }
 
+# The tiles shared by every square of their type (goals each have their own
+# tile, since they can be filled)
+SHARED_TILES = {
+    FLOOR: FLOOR_TILE,
+    WALL: WALL_TILE,
+}
+
 ENTITY_IDS_TO_CLASS = {
     CRATE: Crate,
     COIN: Coin,
@@ -225,6 +259,37 @@ ENTITY_IDS_TO_CLASS = {
 }
 
 
+class MoveDelta:
+    """ A record of the changes made by one move or purchase, which is enough
+        to undo or redo it without copying the maze.
+    """
+    __slots__ = ('player_from', 'player_to', 'crate', 'crate_from',
+                 'crate_to', 'filled_goal', 'consumed', 'consumed_position',
+                 'strength', 'moves', 'money', 'was_lost', 'lost')
+
+    def __init__(self, player_from: Position, player_to: Position) -> None:
+        """ Constructor for MoveDelta. Nothing but the player moves, until the
+            other attributes are set.
+
+        Parameters:
+            player_from: The player's position before the move.
+            player_to: The player's position after the move.
+        """
+        self.player_from = player_from
+        self.player_to = player_to
+        self.crate = None
+        self.crate_from = None
+        self.crate_to = None
+        self.filled_goal = None
+        self.consumed = None
+        self.consumed_position = None
+        self.strength = 0
+        self.moves = 0
+        self.money = 0
+        self.was_lost = False
+        self.lost = ()
+
+
 def convert_maze(raw_maze: list[list[str]]) -> tuple[Grid, Entities, Position]:
     """ Converts a raw maze into a proper maze, entities and player position.
 
@@ -246,12 +311,18 @@ def convert_maze(raw_maze: list[list[str]]) -> tuple[Grid, Entities, Position]:
     for i, row in enumerate(raw_maze):
         new_row = []
         for j, tile_type in enumerate(row):
-            tile = TILE_IDS_TO_CLASS.get(tile_type, Floor)()
-            if tile_type == FILLED_GOAL:
-                tile.fill()
+            tile = SHARED_TILES.get(tile_type)
+            if tile is None:
+                if tile_type in (GOAL, FILLED_GOAL):
+                    tile = Goal()
+                    if tile_type == FILLED_GOAL:
+                        tile.fill()
+                else:
+                    # Entities stand on floor
+                    tile = FLOOR_TILE
 
             new_row.append(tile)
-            if not TILE_IDS_TO_CLASS.get(tile_type):
+            if tile_type not in TILE_IDS_TO_CLASS:
                 if tile_type == PLAYER:
                     player_position = (i, j)
                 else:
@@ -289,14 +360,12 @@ class SokobanModel:
         self._maze, self._entities, self._player_position = convert_maze(
             raw_maze)
         self._player = Player(*player_stats)
-
-        self._last_state = {
-            'maze': [[item for item in row] for row in self._maze],
-            'entities': {key: value for key, value in self._entities.items()},
-            'player_stats': player_stats,
-            'player_position': self._player_position,
-            'last_filled': None,
-        }
+        self._undo_stack = []
+        self._redo_stack = []
+        self._unfilled_goals = self._count_unfilled_goals()
+        self._dead_squares = get_dead_square_table(self._maze)
+        self._track_crates()
+        self._build_passable()
 
     def get_shop_items(self) -> dict[str, int]:
         """ Returns a dictionary mapping item names to their cost. """
@@ -311,9 +380,13 @@ class SokobanModel:
         if self._player.get_money() < self.ITEM_COSTS.get(item):
             return False
 
-        self._player.add_money(-self.ITEM_COSTS[item])
+        delta = MoveDelta(self._player_position, self._player_position)
+        delta.money = -self.ITEM_COSTS[item]
+        self._player.add_money(delta.money)
         self._entities[self._player_position] = ENTITY_IDS_TO_CLASS[item]()
-        self._handle_potion(self._player_position)
+        self._handle_potion(self._player_position, delta)
+        delta.consumed = None
+        self._record(delta)
         return True
 
     def get_maze(self) -> Grid:
@@ -335,6 +408,33 @@ class SokobanModel:
         """ Returns the player's current position. """
         return self._player_position
 
+    def get_dead_square_table(self) -> DeadSquareTable:
+        """ Returns the table of squares from which a crate can never reach a
+            goal. It is computed once per maze layout and shared.
+        """
+        return self._dead_squares
+
+    def is_dead_square(self, position: Position) -> bool:
+        """ Returns True iff a crate at position can never reach a goal.
+
+        Parameters:
+            position: The (row, col) position to check.
+        """
+        return self._dead_squares.is_dead(position)
+
+    def get_lost_crates(self) -> set[Position]:
+        """ Returns the positions of crates which can never reach a goal,
+            because they are on a dead square or frozen in place.
+        """
+        return self._lost_crates
+
+    def is_deadlocked(self) -> bool:
+        """ Returns True iff too few crates can still reach a goal to fill every
+            unfilled goal, so the game can no longer be won (without undoing).
+        """
+        return (self._crates_left - len(self._lost_crates)
+                < self._unfilled_goals)
+
     def get_player_moves_remaining(self) -> int:
         """ Returns the number of moves remaining for the player. """
         return self._player.get_moves_remaining()
@@ -347,15 +447,219 @@ class SokobanModel:
         """ Returns the amount of money the player has. """
         return self._player.get_money()
 
-    def undo_move(self) -> None:
-        """ Undoes the last valid move made by the player. """
-        self._maze = self._last_state['maze']
-        self._entities = self._last_state['entities']
-        self._player_position = self._last_state['player_position']
-        self._player = Player(*self._last_state['player_stats'])
-        if self._last_state['last_filled'] is not None:
-            row, col = self._last_state['last_filled']
-            self._get_tile(row, col).unfill()
+    def export_state(self) -> SokobanState:
+        """ Returns a compact, hashable snapshot of the current game state. """
+        return SokobanState.from_model(
+            self._maze,
+            self._entities,
+            self._player_position,
+            (self._player.get_strength(), self._player.get_moves_remaining(),
+             self._player.get_money()),
+        )
+
+    def import_state(self, state: SokobanState) -> None:
+        """ Replaces the current game state with the given snapshot. The undo
+            history is cleared.
+
+        Parameters:
+            state: A state exported from a model of the same maze file.
+        """
+        for row, line in enumerate(self._maze):
+            for col, tile in enumerate(line):
+                if tile.get_type() == GOAL:
+                    if state.is_goal_filled((row, col)):
+                        tile.fill()
+                    else:
+                        tile.unfill()
+        self._unfilled_goals = self._count_unfilled_goals()
+
+        self._entities = {position: Crate(strength)
+                          for position, strength in state.get_crates().items()}
+        for position, item in state.get_items().items():
+            self._entities[position] = ENTITY_IDS_TO_CLASS[item]()
+
+        self._player_position = state.get_player_position()
+        self._player = Player(state.get_player_strength(),
+                              state.get_player_moves_remaining())
+        self._player.add_money(state.get_player_money())
+        self._undo_stack = []
+        self._redo_stack = []
+        self._track_crates()
+        self._build_passable()
+
+    def snapshot(self) -> SokobanState:
+        """ Returns a copy of the current game state, which restore can return
+            to. The undo history is not included.
+        """
+        return self.export_state()
+
+    def restore(self, snapshot: SokobanState) -> None:
+        """ Returns to a state taken with snapshot on this model. The undo
+            history is cleared.
+
+        Parameters:
+            snapshot: A snapshot taken from this model.
+        """
+        self.import_state(snapshot)
+
+    def get_reachable_positions(self) -> frozenset[Position]:
+        """ Returns the positions the player can walk to without pushing a
+            crate (including their own position). Walking may pick up coins and
+            potions on the way.
+
+            The flood fill behind this is cached until a crate moves.
+        """
+        if self._reachable_positions is None:
+            reach = self._get_reach()
+            width = self._width
+            self._reachable_positions = frozenset(
+                (index // width - 1, index % width - 1)
+                for index, reached in enumerate(reach) if reached)
+        return self._reachable_positions
+
+    def is_reachable(self, position: Position) -> bool:
+        """ Returns True iff the player can walk to position without pushing a
+            crate.
+
+        Parameters:
+            position: The (row, col) position to check.
+        """
+        row, col = position
+        if not self._in_bounds(row, col):
+            return False
+        return bool(self._get_reach()[(row + 1) * self._width + col + 1])
+
+    def get_path_to(self, position: Position) -> list[str] | None:
+        """ Returns a shortest list of moves (UP, DOWN, LEFT or RIGHT) which
+            walks the player to position without pushing a crate.
+
+        Parameters:
+            position: The (row, col) position to walk to.
+
+        Returns:
+            The moves to make (empty if the player is already at position), or
+            None if position cannot be reached without pushing a crate.
+        """
+        if not self.is_reachable(position):
+            return None
+
+        width = self._width
+        start = self._cell_index(self._player_position)
+        target = self._cell_index(position)
+        steps = [(direction, d_row * width + d_col)
+                 for direction, (d_row, d_col) in DIRECTION_DELTAS.items()]
+        # The offset last stepped to reach each cell seen so far
+        came_from = {start: 0}
+        frontier = [start]
+        while target not in came_from:
+            next_frontier = []
+            for index in frontier:
+                for _, step in steps:
+                    neighbour = index + step
+                    if self._passable[neighbour] and neighbour not in came_from:
+                        came_from[neighbour] = step
+                        next_frontier.append(neighbour)
+            frontier = next_frontier
+
+        directions = {step: direction for direction, step in steps}
+        moves = []
+        index = target
+        while index != start:
+            step = came_from[index]
+            moves.append(directions[step])
+            index -= step
+        moves.reverse()
+        return moves
+
+    def walk_to(self, position: Position) -> int:
+        """ Walks the player along a shortest path to position without pushing
+            a crate, picking up any coins and potions on the way. Each step is
+            an ordinary move (and can be undone as one). The walk stops early if
+            the player runs out of moves.
+
+        Parameters:
+            position: The (row, col) position to walk to.
+
+        Returns:
+            The number of moves made (0 if position cannot be reached without
+            pushing, or is where the player already is).
+        """
+        path = self.get_path_to(position)
+        if not path:
+            return 0
+        made = 0
+        for direction in path:
+            if self.get_player_moves_remaining() <= 0:
+                break
+            self.attempt_move(direction)
+            made += 1
+        return made
+
+    def undo_move(self) -> bool:
+        """ Undoes the last valid move (or purchase) made by the player.
+
+        Returns:
+            True iff there was a move to undo.
+        """
+        if not self._undo_stack:
+            return False
+        delta = self._undo_stack.pop()
+
+        self._player.add_strength(-delta.strength)
+        self._player.add_moves_remaining(-delta.moves)
+        self._player.add_money(-delta.money)
+        if delta.consumed is not None:
+            self._entities[delta.consumed_position] = delta.consumed
+        if delta.crate is not None:
+            if delta.filled_goal is not None:
+                self._get_tile(*delta.filled_goal).unfill()
+                self._unfilled_goals += 1
+                self._crates_left += 1
+            else:
+                self._entities.pop(delta.crate_to)
+            self._entities[delta.crate_from] = delta.crate
+            self._move_crate_cell(delta.crate_to, delta.crate_from)
+            self._lost_crates.difference_update(delta.lost)
+            if delta.was_lost:
+                self._lost_crates.add(delta.crate_from)
+        self._player_position = delta.player_from
+
+        self._redo_stack.append(delta)
+        return True
+
+    def redo_move(self) -> bool:
+        """ Redoes the last move (or purchase) undone by undo_move.
+
+        Returns:
+            True iff there was a move to redo.
+        """
+        if not self._redo_stack:
+            return False
+        delta = self._redo_stack.pop()
+
+        if delta.crate is not None:
+            self._entities.pop(delta.crate_from)
+            if delta.filled_goal is not None:
+                self._get_tile(*delta.filled_goal).fill()
+                self._unfilled_goals -= 1
+                self._crates_left -= 1
+            else:
+                self._entities[delta.crate_to] = delta.crate
+            self._move_crate_cell(
+                delta.crate_from,
+                delta.crate_to if delta.filled_goal is None else None)
+            if delta.was_lost:
+                self._lost_crates.discard(delta.crate_from)
+            self._lost_crates.update(delta.lost)
+        if delta.consumed is not None:
+            self._entities.pop(delta.consumed_position)
+        self._player.add_strength(delta.strength)
+        self._player.add_moves_remaining(delta.moves)
+        self._player.add_money(delta.money)
+        self._player_position = delta.player_to
+
+        self._undo_stack.append(delta)
+        return True
 
     def attempt_move(self, direction: str) -> bool:
         """ Attempts to move the player in the given direction.
@@ -372,17 +676,6 @@ class SokobanModel:
             self.undo_move()
             return True
 
-        # Make a copy of important information about this state to overwrite
-        # self._last_state if the move is successful
-        last_state = {
-            'maze': [[item for item in row] for row in self._maze],
-            'entities': {key: value for key, value in self._entities.items()},
-            'player_stats': (self._player.get_strength(),
-                             self._player.get_moves_remaining()),
-            'player_position': self._player_position,
-            'last_filled': None,
-        }
-
         # Handle directional move
         if not DIRECTION_DELTAS.get(direction):
             return False
@@ -396,32 +689,52 @@ class SokobanModel:
         if self._get_tile(new_row, new_col).is_blocking():
             return False
 
+        # The move is applied in place; delta records just enough to undo it
+        delta = MoveDelta(self._player_position, new_position)
+
         # Handle case where there is a crate in the new position
         entity_present = self._entities.get(new_position)
         if entity_present is not None:
             if entity_present.get_type() == CRATE:
-                if not self._attempt_push(new_position, direction):
+                if not self._attempt_push(new_position, direction, delta):
                     return False
             elif entity_present.get_type() == COIN:
                 self._player.add_money(COIN_AMOUNT)
-                self._entities.pop(new_position)
+                delta.money = COIN_AMOUNT
+                delta.consumed = self._entities.pop(new_position)
+                delta.consumed_position = new_position
 
             elif isinstance(entity_present, Potion):
-                self._handle_potion(new_position)
+                self._handle_potion(new_position, delta)
 
         self._player_position = new_position
         self._player.add_moves_remaining(-1)
+        delta.moves -= 1
 
-        self._last_state = last_state
+        self._record(delta)
         return True
 
+    def _record(self, delta: MoveDelta) -> None:
+        """ Pushes a newly made move onto the undo stack. A new move makes any
+            undone moves impossible to redo.
+
+        Parameters:
+            delta: The changes made by the move.
+        """
+        self._undo_stack.append(delta)
+        self._redo_stack.clear()
+
     def has_won(self) -> bool:
         """ Returns True iff the player has won the game. """
-        for row in self._maze:
-            for tile in row:
-                if tile.get_type() == GOAL and not tile.is_filled():
-                    return False
-        return True
+        return self._unfilled_goals == 0
+
+    def _count_unfilled_goals(self) -> int:
+        """ Returns the number of unfilled goals, by scanning the whole maze.
+            has_won relies on a count kept up to date as goals are filled and
+            unfilled, so this is only needed when the maze is (re)loaded.
+        """
+        return sum(1 for row in self._maze for tile in row
+                   if tile.get_type() == GOAL and not tile.is_filled())
 
     def _get_new_position(self, position: Position, direction: str) -> Position:
         """ Returns the new position for an entity if it were to move in the
@@ -467,7 +780,12 @@ class SokobanModel:
         """
         return 0 <= row < len(self._maze) and 0 <= col < len(self._maze[0])
 
-    def _attempt_push(self, position: Position, direction: str) -> bool:
+    def _attempt_push(
+        self,
+        position: Position,
+        direction: str,
+        delta: MoveDelta
+    ) -> bool:
         """ Attempts to push a crate from the given position in the given
             direction.
 
@@ -475,6 +793,7 @@ class SokobanModel:
             position: The current (row, col) position of the crate.
             direction: The direction in which to push the crate. This should be
                         one of the constants UP, DOWN, LEFT or RIGHT.
+            delta: The record of the move being made, to note the push in.
 
         Returns:
             True iff the crate was successfully pushed.
@@ -497,24 +816,170 @@ class SokobanModel:
             return False
 
         crate = self._entities.pop(position)
+        delta.crate = crate
+        delta.crate_from = position
+        delta.crate_to = (new_row, new_col)
+        if position in self._lost_crates:
+            self._lost_crates.discard(position)
+            delta.was_lost = True
 
         # If the crate would fill an unfilled goal, do so and don't add the
         # crate back to the entities
         if tile.get_type() == GOAL and not tile.is_filled():
             tile.fill()
-            self._last_state['last_filled'] = (new_row, new_col)
+            self._unfilled_goals -= 1
+            self._crates_left -= 1
+            delta.filled_goal = (new_row, new_col)
+            self._move_crate_cell(position, None)
             return True
 
-        # Otherwise, add the crate back to the entities
+        # Otherwise, add the crate back to the entities, and check whether it
+        # (or a crate next to it) can no longer reach a goal
         self._entities[(new_row, new_col)] = crate
+        self._move_crate_cell(position, (new_row, new_col))
+        around = [(new_row + d_row, new_col + d_col)
+                  for d_row, d_col in DIRECTION_DELTAS.values()]
+        delta.lost = self._find_lost_crates([(new_row, new_col)] + around)
         return True
 
-    def _handle_potion(self, position: tuple[int, int]) -> None:
+    def _track_crates(self) -> None:
+        """ Initialises the crate count, the player's strength limit and the
+            set of lost crates after the maze has been (re)loaded.
+        """
+        crates = [position for position, entity in self._entities.items()
+                  if entity.get_type() == CRATE]
+        self._crates_left = len(crates)
+
+        # Potions and coins only convert into strength, so this bound stays
+        # the same for the whole game.
+        strength = self._player.get_strength()
+        money = self._player.get_money()
+        for entity in self._entities.values():
+            if entity.get_type() == COIN:
+                money += COIN_AMOUNT
+            elif isinstance(entity, Potion):
+                strength += entity.effect().get('strength', 0)
+        best_rate = max(ENTITY_IDS_TO_CLASS[item]().effect().get('strength', 0)
+                        / cost for item, cost in self.ITEM_COSTS.items())
+        self._strength_limit = strength + int(money * best_rate)
+
+        self._lost_crates = set()
+        self._find_lost_crates(crates)
+
+    def _cell_index(self, position: Position) -> int:
+        """ Returns the index of position in the flat cell arrays, which have a
+            border of blocked cells all round so that neighbours never need
+            bounds checks.
+        """
+        return (position[0] + 1) * self._width + position[1] + 1
+
+    def _build_passable(self) -> None:
+        """ Builds the flat array of cells the player can walk on without
+            pushing (1) or not (0), after the maze or entities were (re)loaded.
+        """
+        rows, cols = self.get_dimensions()
+        self._width = width = cols + 2
+        passable = bytearray(width * (rows + 2))
+        for row, line in enumerate(self._maze):
+            start = (row + 1) * width + 1
+            passable[start:start + cols] = bytes(
+                not tile.is_blocking() for tile in line)
+        for position, entity in self._entities.items():
+            if entity.get_type() == CRATE:
+                passable[self._cell_index(position)] = 0
+        self._passable = passable
+        self._reach = None
+        self._reachable_positions = None
+
+    def _move_crate_cell(
+        self,
+        source: Position,
+        destination: Position | None
+    ) -> None:
+        """ Updates the passable cells after a crate moved from source to
+            destination (None if it was removed onto a goal, or back again when
+            source is None), and drops the cached reachable cells.
+        """
+        if source is not None:
+            self._passable[self._cell_index(source)] = 1
+        if destination is not None:
+            self._passable[self._cell_index(destination)] = 0
+        self._reach = None
+        self._reachable_positions = None
+
+    def _get_reach(self) -> bytearray:
+        """ Returns a flat array marking the cells the player can reach without
+            pushing, flood filling from the player if the cache is out of date.
+        """
+        start = self._cell_index(self._player_position)
+        reach = self._reach
+        if reach is not None and reach[start]:
+            return reach
+
+        passable = self._passable
+        width = self._width
+        reach = bytearray(len(passable))
+        reach[start] = 1
+        stack = [start]
+        while stack:
+            index = stack.pop()
+            for neighbour in (index - width, index + width, index - 1,
+                              index + 1):
+                if passable[neighbour] and not reach[neighbour]:
+                    reach[neighbour] = 1
+                    stack.append(neighbour)
+        self._reach = reach
+        self._reachable_positions = None
+        return reach
+
+    def _crate_strength(self, position: Position) -> int | None:
+        """ Returns the strength of the crate at position, or None if there is
+            no crate there.
+        """
+        entity = self._entities.get(position)
+        if entity is None or entity.get_type() != CRATE:
+            return None
+        return entity.get_strength()
+
+    def _find_lost_crates(self, positions: list[Position]) -> tuple:
+        """ Adds any crates at the given positions which can never reach a goal
+            to the lost crates.
+
+        Parameters:
+            positions: The positions to check. Positions without a crate, or
+                       with a crate already known to be lost, are skipped.
+
+        Returns:
+            The positions of the newly lost crates.
+        """
+        found = []
+        for position in positions:
+            if (self._crate_strength(position) is None
+                    or position in self._lost_crates):
+                continue
+            if self._dead_squares.is_dead(position) or is_frozen(
+                    position, self._dead_squares, self._crate_strength,
+                    self._strength_limit):
+                self._lost_crates.add(position)
+                found.append(position)
+        return tuple(found)
+
+    def _handle_potion(
+        self,
+        position: tuple[int, int],
+        delta: MoveDelta
+    ) -> None:
         """ Handles applying the effect of a potion at the given position to the
             player.
 
         Parameters:
             position: The position of the potion.
+            delta: The record of the move being made, to note the effect in.
         """
         potion = self._entities.pop(position)
-        self._player.apply_effect(potion.effect())
+        effect = potion.effect()
+        self._player.apply_effect(effect)
+        delta.consumed = potion
+        delta.consumed_position = position
+        delta.strength += effect.get('strength', 0)
+        delta.moves += effect.get('moves', 0)
@@ -0,0 +1,378 @@
+import sys
+from heapq import heappush, heappop
+from itertools import count
+
+from a2_support import *
+from matching import INFINITY
+from model import COIN_AMOUNT, ENTITY_IDS_TO_CLASS, SokobanModel
+from solver import DEFAULT_MAX_STATES, Plan, SokobanSolver
+from state import SokobanState, COIN
+
+# Entries of the search, as lists so that a dominated entry can be retired in
+# place: [g, strength, moves remaining, money, alive, state, parent entry,
+# direction, purchases made just before the move]
+(G, STRENGTH, REMAINING, MONEY, ALIVE, STATE, PARENT, DIRECTION,
+ BOUGHT) = range(9)
+
+
+class ShopPlan(Plan):
+    """ A winning sequence of moves and purchases found by ShopPlanner. """
+
+    def __init__(
+        self,
+        moves: str,
+        pushes: int,
+        states_expanded: int,
+        purchases: list[tuple[int, str]]
+    ) -> None:
+        """ Constructor for ShopPlan.
+
+        Parameters:
+            moves: The moves to make, as a string of UP, DOWN, LEFT and RIGHT.
+            pushes: The number of those moves which push a crate.
+            states_expanded: How many states the search expanded to find it.
+            purchases: (move number, item) for each item to buy, in order,
+                       where the item is bought just before that move (counting
+                       from 0).
+        """
+        super().__init__(moves, pushes, states_expanded)
+        self._purchases = purchases
+
+    def get_purchases(self) -> list[tuple[int, str]]:
+        """ Returns (move number, item) for each purchase, in order. """
+        return self._purchases
+
+    def get_money_spent(self) -> int:
+        """ Returns the total cost of the purchases. """
+        return sum(SokobanModel.ITEM_COSTS[item]
+                   for _, item in self._purchases)
+
+    def get_steps(self) -> list[str]:
+        """ Returns the moves and the items bought, in the order to make them.
+        """
+        steps = []
+        purchases = iter(self._purchases)
+        purchase = next(purchases, None)
+        for number, move in enumerate(self._moves):
+            while purchase is not None and purchase[0] == number:
+                steps.append(purchase[1])
+                purchase = next(purchases, None)
+            steps.append(move)
+        return steps
+
+    def __repr__(self) -> str:
+        return (f'ShopPlan({self._moves!r}, pushes={self._pushes}, '
+                f'purchases={self._purchases})')
+
+
+class ShopPlanner(SokobanSolver):
+    """ Finds winning strategies which may also buy potions from the shop (see
+        SokobanModel.attempt_purchase), using the fewest moves and, among
+        those, spending the least money.
+
+        The player's strength, moves remaining and money are part of each
+        search state. A state is dropped when another with the same maze has
+        been reached in no more moves with at least as much of all three.
+
+        Buying takes no moves, so a purchase is never worth making before it
+        is needed. Purchases are therefore only tried just before a push the
+        player is too weak for, or a move which would otherwise leave them
+        with no moves and the game not won. Only the smallest sets of items
+        that cover the shortfall are tried.
+    """
+
+    def __init__(
+        self,
+        maze: Grid,
+        entities: Entities,
+        player_position: Position,
+        player_stats: list[int],
+        item_costs: dict[str, int] = None
+    ) -> None:
+        """ Constructor for ShopPlanner.
+
+        Parameters:
+            maze: The maze, as returned by convert_maze.
+            entities: The entities, as returned by convert_maze.
+            player_position: The player's starting position.
+            player_stats: The player's starting strength and moves remaining.
+            item_costs: The shop's prices (defaults to
+                        SokobanModel.ITEM_COSTS).
+        """
+        super().__init__(maze, entities, player_position, player_stats)
+        self._costs = dict(item_costs or SokobanModel.ITEM_COSTS)
+        self._shop_effects = {item: ENTITY_IDS_TO_CLASS[item]().effect()
+                              for item in self._costs}
+
+        start = self._start
+        self._total_money = (start.get_player_money()
+                             + start.get_item_bits(COIN).bit_count()
+                             * COIN_AMOUNT)
+        self._strength_rate = max(effect.get('strength', 0) / self._costs[item]
+                                  for item, effect
+                                  in self._shop_effects.items())
+        self._moves_rate = max(effect.get('moves', 0) / self._costs[item]
+                               for item, effect in self._shop_effects.items())
+        # Every coin could be spent on strength, so crates only this heavy
+        # can be pushed at all
+        self._strength_limit += int(self._total_money * self._strength_rate)
+        self._bundle_cache = {}
+
+    def solve(self, max_states: int = DEFAULT_MAX_STATES) -> ShopPlan | None:
+        """ Returns a plan winning the maze in the fewest possible moves, with
+            the cheapest purchases for that many moves, or None if there is no
+            such plan (or max_states was exceeded).
+
+        Parameters:
+            max_states: The maximum number of states to expand.
+        """
+        self._states_expanded = 0
+        self._complete = True
+        start = self._start
+        start_h = self._heuristic(start)
+        if start_h == INFINITY:
+            return None
+
+        tie_breaker = count()
+        # Pareto fronts of the live entries for each maze layout, i.e. each
+        # state with its stats cleared
+        fronts = {}
+        entry = self._entry(0, start, None, None, ())
+        fronts[start.with_stats(0, 0, 0)] = [entry]
+        # Queue entries: (f, money spent, -g, tie, entry)
+        queue = [(start_h, 0, 0, next(tie_breaker), entry)]
+
+        while queue:
+            _, _, _, _, entry = heappop(queue)
+            if not entry[ALIVE]:
+                continue
+            g, state = entry[G], entry[STATE]
+            if self._is_won(state):
+                return self._build_shop_plan(entry)
+
+            self._states_expanded += 1
+            if self._states_expanded > max_states:
+                self._complete = False
+                return None
+
+            for direction, bundle, successor in self._shop_successors(state,
+                                                                      g):
+                h = self._heuristic(successor)
+                if h == INFINITY:
+                    continue
+                new_g = g + 1
+                if h > (self._moves_remaining(successor, new_g)
+                        + self._potential_moves(successor)):
+                    continue
+                child = self._entry(new_g, successor, entry, direction, bundle)
+                if not self._add_to_front(fronts, child):
+                    continue
+                heappush(queue, (new_g + h, self._money_spent(successor),
+                                 -new_g, next(tie_breaker), child))
+        return None
+
+    def _entry(
+        self,
+        g: int,
+        state: SokobanState,
+        parent: list | None,
+        direction: str | None,
+        bundle: tuple[str, ...]
+    ) -> list:
+        """ Returns a new search entry for state, reached after g moves. """
+        return [g, state.get_player_strength(),
+                self._moves_remaining(state, g), state.get_player_money(),
+                True, state, parent, direction, bundle]
+
+    def _add_to_front(self, fronts: dict, entry: list) -> bool:
+        """ Adds entry to the front of its maze layout and retires the entries
+            it dominates. Returns False (and adds nothing) if entry is itself
+            dominated.
+        """
+        key = entry[STATE].with_stats(0, 0, 0)
+        front = fronts.setdefault(key, [])
+        g, strength, remaining, money = entry[G:ALIVE]
+        for other in front:
+            if (other[G] <= g and other[STRENGTH] >= strength
+                    and other[REMAINING] >= remaining
+                    and other[MONEY] >= money):
+                return False
+        survivors = []
+        for other in front:
+            if (g <= other[G] and strength >= other[STRENGTH]
+                    and remaining >= other[REMAINING]
+                    and money >= other[MONEY]):
+                other[ALIVE] = False
+            else:
+                survivors.append(other)
+        survivors.append(entry)
+        fronts[key] = survivors
+        return True
+
+    def _shop_successors(self, state: SokobanState, g: int):
+        """ Yields (direction, items bought, new_state) for each valid move
+            from state, each preceded by any smallest set of purchases the move
+            needs.
+        """
+        strength = state.get_player_strength()
+        row, col = state.get_player_position()
+        for direction, (d_row, d_col) in DIRECTION_DELTAS.items():
+            needed = state.crate_strength((row + d_row, col + d_col)) or 0
+            # Make the move as if strong enough, to see what else it needs
+            strong = state
+            if needed > strength:
+                strong = state.with_stats(
+                    needed, state.get_player_moves_remaining(),
+                    state.get_player_money())
+            successor = self._move(strong, direction)
+            if successor is None:
+                continue
+            moves_short = 0
+            if not self._is_won(successor):
+                moves_short = max(0, 1 - self._moves_remaining(successor,
+                                                               g + 1))
+            if needed <= strength and not moves_short:
+                yield direction, (), successor
+                continue
+
+            for bundle in self._bundles(max(0, needed - strength),
+                                        moves_short,
+                                        state.get_player_money()):
+                successor = self._move(self._buy(state, bundle), direction)
+                if successor is not None:
+                    yield direction, bundle, successor
+
+    def _bundles(self, strength: int, moves: int, money: int
+                 ) -> list[tuple[str, ...]]:
+        """ Returns each smallest set of items (as a sorted tuple, possibly
+            with repeats) costing at most money which adds at least the given
+            strength and moves: removing any one item would fall short.
+        """
+        key = (strength, moves, money)
+        cached = self._bundle_cache.get(key)
+        if cached is not None:
+            return cached
+
+        items = sorted(self._costs)
+        bundles = []
+
+        def extend(start, bundle, spent, strength_left, moves_left):
+            if strength_left <= 0 and moves_left <= 0:
+                if all(self._falls_short(bundle, i, strength, moves)
+                       for i in range(len(bundle))):
+                    bundles.append(tuple(bundle))
+                return
+            for i in range(start, len(items)):
+                item = items[i]
+                cost = self._costs[item]
+                effect = self._shop_effects[item]
+                gains_strength = strength_left > 0 and effect.get('strength')
+                gains_moves = moves_left > 0 and effect.get('moves')
+                if spent + cost > money or not (gains_strength or gains_moves):
+                    continue
+                bundle.append(item)
+                extend(i, bundle, spent + cost,
+                       strength_left - effect.get('strength', 0),
+                       moves_left - effect.get('moves', 0))
+                bundle.pop()
+
+        extend(0, [], 0, strength, moves)
+        self._bundle_cache[key] = bundles
+        return bundles
+
+    def _falls_short(
+        self,
+        bundle: list[str],
+        index: int,
+        strength: int,
+        moves: int
+    ) -> bool:
+        """ Returns True iff bundle without its item at index adds less than
+            the given strength or moves.
+        """
+        rest = bundle[:index] + bundle[index + 1:]
+        return (sum(self._shop_effects[item].get('strength', 0)
+                    for item in rest) < strength
+                or sum(self._shop_effects[item].get('moves', 0)
+                       for item in rest) < moves)
+
+    def _buy(self, state: SokobanState, bundle: tuple[str, ...]
+             ) -> SokobanState:
+        """ Returns state with the items in bundle bought and drunk. """
+        strength = state.get_player_strength()
+        moves = state.get_player_moves_remaining()
+        money = state.get_player_money()
+        for item in bundle:
+            effect = self._shop_effects[item]
+            strength += effect.get('strength', 0)
+            moves += effect.get('moves', 0)
+            money -= self._costs[item]
+        return state.with_stats(strength, moves, money)
+
+    def _money_spent(self, state: SokobanState) -> int:
+        """ Returns the money spent in the shop on the way to state. """
+        coins_left = state.get_item_bits(COIN).bit_count()
+        return (self._total_money - coins_left * COIN_AMOUNT
+                - state.get_player_money())
+
+    def _potential_moves(self, state: SokobanState) -> int:
+        """ Returns the most extra moves that unused potions, and the money
+            the player has or could still pick up, could grant.
+        """
+        money = (state.get_player_money()
+                 + state.get_item_bits(COIN).bit_count() * COIN_AMOUNT)
+        return (super()._potential_moves(state)
+                + int(money * self._moves_rate))
+
+    def _build_shop_plan(self, entry: list) -> ShopPlan:
+        """ Returns the plan leading from the start to entry. """
+        moves = []
+        bundles = []
+        pushes = 0
+        while entry[PARENT] is not None:
+            parent = entry[PARENT]
+            if entry[STATE].get_crate_bits() != parent[STATE].get_crate_bits():
+                pushes += 1
+            moves.append(entry[DIRECTION])
+            bundles.append(entry[BOUGHT])
+            entry = parent
+        moves.reverse()
+        bundles.reverse()
+        purchases = [(number, item) for number, bundle in enumerate(bundles)
+                     for item in bundle]
+        return ShopPlan(''.join(moves), pushes, self._states_expanded,
+                        purchases)
+
+
+def plan_file(maze_file: str, max_states: int = DEFAULT_MAX_STATES
+              ) -> ShopPlan | None:
+    """ Returns the cheapest winning plan, purchases included, for the given
+        maze file, or None.
+
+    Parameters:
+        maze_file: The path to the maze file (e.g. 'maze_files/maze1.txt')
+        max_states: The maximum number of states to expand.
+    """
+    return ShopPlanner.from_file(maze_file).solve(max_states)
+
+
+def main() -> None:
+    """ Plans each maze file given on the command line, shop included. """
+    for maze_file in sys.argv[1:] or ['maze_files/maze1.txt']:
+        planner = ShopPlanner.from_file(maze_file)
+        plan = planner.solve()
+        if plan is not None:
+            bought = ', '.join(f'{item} before move {number + 1}'
+                               for number, item in plan.get_purchases())
+            print(f'{maze_file}: {len(plan)} moves, {plan.get_pushes()} '
+                  f'pushes, {plan.get_money_spent()} spent'
+                  f'{" (" + bought + ")" if bought else ""}: {plan}')
+        elif planner.search_was_complete():
+            print(f'{maze_file}: unsolvable')
+        else:
+            print(f'{maze_file}: gave up after '
+                  f'{planner.get_states_expanded()} states')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import argparse
+import glob
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from a2_support import *
+from model import SokobanModel
+from move_script import split_script
+
+UNDO = 'u'
+REDO = 'r'
+SCRIPT_MOVES = (UP, DOWN, LEFT, RIGHT, UNDO, REDO)
+
+WON = 'won'
+LOST = 'lost'
+UNFINISHED = 'unfinished'
+
+
+def parse_script(text: str) -> str:
+    """ Returns the moves in a move script. A script is either a plain string
+        of moves (e.g. 'ddssu') or a transcript in the format of the console
+        game_examples, where each move follows an 'Enter move:' prompt.
+        Anything other than a move or undo/redo (e.g. 'q') is dropped.
+
+    Parameters:
+        text: The contents of the script.
+    """
+    moves = (entry.lower() for entry in split_script(text))
+    return ''.join(move for move in moves if move in SCRIPT_MOVES)
+
+
+def load_script(script: str) -> str:
+    """ Returns the moves of script, which is either the path of a script file
+        or a literal string of moves.
+
+    Parameters:
+        script: A script file path or a string of moves.
+    """
+    if os.path.isfile(script):
+        with open(script, 'r', encoding='utf-8') as file:
+            return parse_script(file.read())
+    if os.sep in script or '/' in script or script.endswith('.txt'):
+        raise FileNotFoundError(f'No such script file: {script}')
+    return parse_script(script)
+
+
+def run_script(maze_file: str, moves: str) -> dict:
+    """ Replays moves against a fresh SokobanModel, stopping as soon as the game
+        is won or the player runs out of moves, like the GUI does.
+
+    Parameters:
+        maze_file: The path to the maze file (e.g. 'maze_files/maze1.txt')
+        moves: The moves to replay, e.g. as returned by load_script.
+
+    Returns:
+        A dictionary describing the run: the maze file, the result (WON, LOST
+        or UNFINISHED), how many moves were used (an undone move is not used,
+        as the model gives it back), rejected and replayed before the game
+        ended, and the player's final stats and position.
+    """
+    model = SokobanModel(maze_file)
+    used = rejected = replayed = 0
+    result = UNFINISHED
+
+    for move in moves:
+        replayed += 1
+        if move == UNDO:
+            if model.undo_move():
+                used -= 1
+        elif move == REDO:
+            if model.redo_move():
+                used += 1
+        elif model.attempt_move(move):
+            used += 1
+            if model.has_won():
+                result = WON
+                break
+            if model.get_player_moves_remaining() <= 0:
+                result = LOST
+                break
+        else:
+            rejected += 1
+
+    return {
+        'maze_file': maze_file,
+        'result': result,
+        'moves_used': used,
+        'invalid_moves': rejected,
+        'script_moves_replayed': replayed,
+        'moves_remaining': model.get_player_moves_remaining(),
+        'strength': model.get_player_strength(),
+        'money': model.get_player_money(),
+        'player_position': list(model.get_player_position()),
+    }
+
+
+def _run_job(job: tuple[str, str, str]) -> dict:
+    """ Runs a single (maze_file, script_name, moves) job in a worker. """
+    maze_file, script_name, moves = job
+    result = run_script(maze_file, moves)
+    result['script'] = script_name
+    return result
+
+
+def run_batch(
+    jobs: list[tuple[str, str]],
+    workers: int = None
+) -> list[dict]:
+    """ Replays many scripts across a pool of processes.
+
+    Parameters:
+        jobs: (maze_file, script) pairs, where script is a script file path or
+              a literal string of moves.
+        workers: The number of worker processes (defaults to the CPU count).
+                 If 1, the jobs are run in this process.
+
+    Returns:
+        The result of run_script for each job, in the same order as jobs, with
+        an extra 'script' key naming the script.
+    """
+    loaded = [(maze_file, script, load_script(script))
+              for maze_file, script in jobs]
+    if workers == 1 or len(loaded) <= 1:
+        return [_run_job(job) for job in loaded]
+
+    workers = workers or os.cpu_count() or 1
+    chunk_size = max(1, len(loaded) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_run_job, loaded, chunksize=chunk_size))
+
+
+def _expand(patterns: list[str]) -> list[str]:
+    """ Returns the files matching each glob pattern, keeping any pattern that
+        matches no file as it is (it may be a literal move string).
+    """
+    paths = []
+    for pattern in patterns:
+        paths.extend(sorted(glob.glob(pattern)) or [pattern])
+    return paths
+
+
+def main() -> None:
+    """ Replays move scripts against maze files from the command line. """
+    parser = argparse.ArgumentParser(
+        description='Replay Sokoban move scripts without a GUI.')
+    parser.add_argument('--maze', action='append', default=[],
+                        help='maze file or glob; every maze is paired with '
+                             'every --script')
+    parser.add_argument('--script', action='append', default=[],
+                        help='script file, glob or literal moves (wasdur)')
+    parser.add_argument('--pair', nargs=2, action='append', default=[],
+                        metavar=('MAZE', 'SCRIPT'),
+                        help='replay one script against one maze')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of worker processes')
+    parser.add_argument('--json', help='write the results to this file')
+    args = parser.parse_args()
+
+    jobs = [(maze, script) for maze in _expand(args.maze)
+            for script in _expand(args.script)]
+    jobs.extend((maze, script) for maze, script in args.pair)
+    if not jobs:
+        parser.error('nothing to replay: give --maze and --script, or --pair')
+
+    results = run_batch(jobs, args.workers)
+    for result in results:
+        print(f"{result['maze_file']} <- {result['script']}: "
+              f"{result['result']} after {result['moves_used']} moves "
+              f"(moves remaining: {result['moves_remaining']}, "
+              f"strength: {result['strength']}, money: {result['money']})")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+
+    won = sum(result['result'] == WON for result in results)
+    print(f'{len(results)} runs: {won} won, {len(results) - won} not won',
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
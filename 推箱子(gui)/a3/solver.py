@@ -0,0 +1,406 @@
+import sys
+from heapq import heappush, heappop
+from itertools import count
+
+from a2_support import *
+from bidirectional import BidirectionalSearch
+from deadlock import get_dead_square_table, is_frozen
+from matching import INFINITY, min_cost_matching
+from model import convert_maze, COIN_AMOUNT, ENTITY_IDS_TO_CLASS
+from state import SokobanState, COIN, ITEM_TYPES
+
+DEFAULT_MAX_STATES = 2_000_000
+
+
+class Plan:
+    """ A winning sequence of moves found by SokobanSolver. """
+
+    def __init__(self, moves: str, pushes: int, states_expanded: int) -> None:
+        """ Constructor for Plan.
+
+        Parameters:
+            moves: The moves to make, as a string of UP, DOWN, LEFT and RIGHT.
+            pushes: The number of those moves which push a crate.
+            states_expanded: How many states the search expanded to find it.
+        """
+        self._moves = moves
+        self._pushes = pushes
+        self._states_expanded = states_expanded
+
+    def get_moves(self) -> str:
+        """ Returns the moves of this plan as a string. """
+        return self._moves
+
+    def get_pushes(self) -> int:
+        """ Returns the number of crate pushes in this plan. """
+        return self._pushes
+
+    def get_states_expanded(self) -> int:
+        """ Returns the number of states expanded while searching. """
+        return self._states_expanded
+
+    def __len__(self) -> int:
+        return len(self._moves)
+
+    def __str__(self) -> str:
+        return self._moves
+
+    def __repr__(self) -> str:
+        return f'Plan({self._moves!r}, pushes={self._pushes})'
+
+
+class SokobanSolver:
+    """ Finds shortest winning move sequences for a maze, following the rules
+        enforced by SokobanModel.attempt_move (crate strength, potions and the
+        moves remaining budget).
+
+        Only moves are searched. Coins are picked up but never spent, as
+        SokobanModel.attempt_purchase is not modelled, so finding no plan does
+        not prove a maze which has a shop is unsolvable; only that it can't be
+        won without buying anything. ShopPlanner (see planner.py) also
+        searches purchases.
+    """
+
+    def __init__(
+        self,
+        maze: Grid,
+        entities: Entities,
+        player_position: Position,
+        player_stats: list[int]
+    ) -> None:
+        """ Constructor for SokobanSolver.
+
+        Parameters:
+            maze: The maze, as returned by convert_maze.
+            entities: The entities, as returned by convert_maze.
+            player_position: The player's starting position.
+            player_stats: The player's starting strength and moves remaining.
+        """
+        self._rows = len(maze)
+        self._cols = len(maze[0]) if maze else 0
+        self._walls = set()
+        self._goals = []
+        for i, row in enumerate(maze):
+            for j, tile in enumerate(row):
+                if tile.is_blocking():
+                    self._walls.add((i, j))
+                elif tile.get_type() == GOAL and not tile.is_filled():
+                    self._goals.append((i, j))
+
+        # The moves stat of a search state holds the moves gained from
+        # potions so far rather than the moves remaining, which follow from
+        # the path length. Paths of different lengths to the same position
+        # then share one state.
+        strength, self._start_moves = player_stats
+        self._start = SokobanState.from_model(
+            maze, entities, player_position, (strength, 0, 0))
+        self._filled_at_start = self._start.get_filled_bits()
+        self._effects = {item: ENTITY_IDS_TO_CLASS[item]().effect()
+                         for item in ITEM_TYPES if item != COIN}
+        self._strength_limit = strength + sum(
+            self._start.get_item_bits(item).bit_count()
+            * effect.get('strength', 0)
+            for item, effect in self._effects.items())
+        self._dead_squares = get_dead_square_table(maze)
+        self._distances = {goal: self._dead_squares.get_push_distances(goal)
+                           for goal in self._goals}
+        self._heuristic_cache = {}
+        self._states_expanded = 0
+        self._complete = True
+
+    @classmethod
+    def from_file(cls, maze_file: str) -> 'SokobanSolver':
+        """ Returns a solver for the maze stored in the given maze file.
+
+        Parameters:
+            maze_file: The path to the maze file (e.g. 'maze_files/maze1.txt')
+        """
+        raw_maze, player_stats = read_file(maze_file)
+        maze, entities, player_position = convert_maze(raw_maze)
+        return cls(maze, entities, player_position, player_stats)
+
+    def get_states_expanded(self) -> int:
+        """ Returns the number of states expanded by the last search. """
+        return self._states_expanded
+
+    def search_was_complete(self) -> bool:
+        """ Returns True iff the last search explored every state it needed to,
+            i.e. a None result from solve means the maze can't be won without
+            buying anything, rather than that the state limit was reached.
+        """
+        return self._complete
+
+    def solve(self, max_states: int = DEFAULT_MAX_STATES) -> Plan | None:
+        """ Returns a plan using the fewest possible moves to win the maze
+            without buying anything, or None if there is no such plan (or
+            max_states was exceeded).
+
+        Parameters:
+            max_states: The maximum number of states to expand.
+        """
+        self._states_expanded = 0
+        self._complete = True
+        start = self._start
+        start_h = self._heuristic(start)
+        if start_h == INFINITY:
+            return None
+
+        tie_breaker = count()
+        # Queue entries: (f, -g, tie, g, state)
+        queue = [(start_h, 0, next(tie_breaker), 0, start)]
+        parents = {start: None}
+        best_g = {start: 0}
+
+        while queue:
+            _, _, _, g, state = heappop(queue)
+            if best_g.get(state) != g:
+                continue
+            if self._is_won(state):
+                return self._build_plan(state, parents)
+
+            self._states_expanded += 1
+            if self._states_expanded > max_states:
+                self._complete = False
+                return None
+
+            if self._moves_remaining(state, g) <= 0:
+                continue
+
+            for direction, successor in self._successors(state):
+                new_g = g + 1
+                if new_g >= best_g.get(successor, INFINITY):
+                    continue
+                h = self._heuristic(successor)
+                if h == INFINITY:
+                    continue
+                if h > (self._moves_remaining(successor, new_g)
+                        + self._potential_moves(successor)):
+                    continue
+                best_g[successor] = new_g
+                parents[successor] = (state, direction)
+                heappush(queue, (new_g + h, -new_g, next(tie_breaker), new_g,
+                                 successor))
+        return None
+
+    def solve_bidirectional(self, max_states: int = DEFAULT_MAX_STATES
+                            ) -> Plan | None:
+        """ Returns a plan to win the maze found by searching forwards from the
+            start and backwards from the won position until they meet (see
+            BidirectionalSearch), or None if there is no plan (or max_states
+            was exceeded). This needs far fewer states than solve on mazes
+            with many crates, but the plan is not necessarily the shortest.
+
+            Mazes the bidirectional search doesn't model (with potions or
+            coins, spare crates, or crates too heavy to push), and plans it
+            finds which don't fit the move budget, are left to solve.
+
+        Parameters:
+            max_states: The maximum number of states to expand.
+        """
+        if not self._suits_bidirectional():
+            return self.solve(max_states)
+
+        search = BidirectionalSearch(
+            (self._rows, self._cols), self._walls, self._goals,
+            list(self._start.get_crates()),
+            self._start.get_player_position(), self._dead_squares)
+        moves = search.search(max_states)
+        self._states_expanded = search.get_states_expanded()
+        self._complete = search.search_was_complete()
+        if moves is None:
+            return None
+
+        plan = self._replay(moves)
+        if plan is None:
+            # Too long for the move budget: only the forward search can tell
+            # whether a shorter plan exists
+            return self.solve(max_states)
+        return plan
+
+    def _suits_bidirectional(self) -> bool:
+        """ Returns True iff the maze has no potions or coins, one crate per
+            unfilled goal, and no crate too heavy for the player.
+        """
+        start = self._start
+        crates = start.get_crates()
+        return (not start.get_items() and len(crates) == len(self._goals)
+                and all(strength <= start.get_player_strength()
+                        for strength in crates.values()))
+
+    def _replay(self, moves: str) -> Plan | None:
+        """ Returns moves as a plan if, following the same rules as solve, they
+            win the maze within the move budget, or None if not.
+        """
+        state = self._start
+        pushes = 0
+        for g, direction in enumerate(moves):
+            if self._moves_remaining(state, g) <= 0:
+                return None
+            successor = dict(self._successors(state)).get(direction)
+            if successor is None:
+                return None
+            if successor.get_crate_bits() != state.get_crate_bits():
+                pushes += 1
+            state = successor
+        if not self._is_won(state):
+            return None
+        return Plan(moves, pushes, self._states_expanded)
+
+    def _successors(self, state: SokobanState):
+        """ Yields (direction, new_state) for each valid move from the given
+            state, mirroring SokobanModel.attempt_move.
+        """
+        for direction in DIRECTION_DELTAS:
+            successor = self._move(state, direction)
+            if successor is not None:
+                yield direction, successor
+
+    def _move(self, state: SokobanState, direction: str
+              ) -> SokobanState | None:
+        """ Returns the state after moving in direction from the given state,
+            or None if the move is invalid (or leads to a dead end).
+        """
+        row, col = state.get_player_position()
+        d_row, d_col = DIRECTION_DELTAS[direction]
+        new_position = (row + d_row, col + d_col)
+        if not self._is_open(new_position):
+            return None
+
+        crate_strength = state.crate_strength(new_position)
+        if crate_strength is not None:
+            target = (new_position[0] + d_row, new_position[1] + d_col)
+            if (not self._is_open(target)
+                    or state.crate_strength(target) is not None
+                    or state.item_at(target) is not None
+                    or crate_strength > state.get_player_strength()):
+                return None
+            if target in self._distances and not state.is_goal_filled(target):
+                successor = state.fill_goal(new_position, target)
+            elif (self._dead_squares.is_dead(target)
+                    and not self._has_spare_crates(state)):
+                return None
+            else:
+                successor = state.move_crate(new_position, target)
+                if not self._has_spare_crates(state) and is_frozen(
+                        target, self._dead_squares, successor.crate_strength,
+                        self._strength_limit):
+                    return None
+        else:
+            successor = state
+            item = state.item_at(new_position)
+            if item is not None:
+                successor = self._collect(state.remove_item(new_position),
+                                          item)
+
+        return successor.move_player(new_position)
+
+    def _collect(self, state: SokobanState, item: str) -> SokobanState:
+        """ Returns state with the stats changed by collecting item. """
+        strength = state.get_player_strength()
+        moves = state.get_player_moves_remaining()
+        money = state.get_player_money()
+        if item == COIN:
+            money += COIN_AMOUNT
+        else:
+            effect = self._effects[item]
+            strength += effect.get('strength', 0)
+            moves += effect.get('moves', 0)
+        return state.with_stats(strength, moves, money)
+
+    def _has_spare_crates(self, state: SokobanState) -> bool:
+        """ Returns True iff state has more crates than unfilled goals, so a
+            crate can be lost to a dead square without losing the game.
+        """
+        unfilled = len(self._goals) - (
+            state.get_filled_bits() & ~self._filled_at_start).bit_count()
+        return state.get_crate_bits().bit_count() > unfilled
+
+    def _is_open(self, position: Position) -> bool:
+        """ Returns True iff position is in bounds and not a blocking tile. """
+        row, col = position
+        return (0 <= row < self._rows and 0 <= col < self._cols
+                and position not in self._walls)
+
+    def _is_won(self, state: SokobanState) -> bool:
+        """ Returns True iff every goal in the given state is filled. """
+        filled = state.get_filled_bits() & ~self._filled_at_start
+        return filled.bit_count() == len(self._goals)
+
+    def _moves_remaining(self, state: SokobanState, g: int) -> int:
+        """ Returns the player's moves remaining in state after g moves. """
+        return self._start_moves - g + state.get_player_moves_remaining()
+
+    def _potential_moves(self, state: SokobanState) -> int:
+        """ Returns the most extra moves that unused potions could grant. """
+        return sum(state.get_item_bits(item).bit_count()
+                   * effect.get('moves', 0)
+                   for item, effect in self._effects.items())
+
+    def _heuristic(self, state: SokobanState) -> float:
+        """ Returns a lower bound on the moves needed to fill every remaining
+            goal: the cheapest matching of unfilled goals to distinct crates,
+            using push distances.
+        """
+        key = (state.get_crate_bits(), state.get_filled_bits())
+        cached = self._heuristic_cache.get(key)
+        if cached is not None:
+            return cached
+
+        goals = [goal for goal in self._goals
+                 if not state.is_goal_filled(goal)]
+        positions = list(state.get_crates())
+        costs = [[self._distances[goal].get(position, INFINITY)
+                  for position in positions] for goal in goals]
+        result = min_cost_matching(costs)
+        self._heuristic_cache[key] = result
+        return result
+
+    def _build_plan(self, state: SokobanState, parents) -> Plan:
+        """ Returns the plan leading from the start state to state. """
+        moves = []
+        pushes = 0
+        while parents[state] is not None:
+            previous, direction = parents[state]
+            if state.get_crate_bits() != previous.get_crate_bits():
+                pushes += 1
+            moves.append(direction)
+            state = previous
+        moves.reverse()
+        return Plan(''.join(moves), pushes, self._states_expanded)
+
+
+def solve_file(maze_file: str, max_states: int = DEFAULT_MAX_STATES
+               ) -> Plan | None:
+    """ Returns a shortest winning plan for the given maze file, or None.
+
+    Parameters:
+        maze_file: The path to the maze file (e.g. 'maze_files/maze1.txt')
+        max_states: The maximum number of states to expand.
+    """
+    return SokobanSolver.from_file(maze_file).solve(max_states)
+
+
+def main() -> None:
+    """ Solves each maze file given on the command line, without purchases.
+        With --bidirectional, solve_bidirectional is used instead of solve.
+    """
+    arguments = sys.argv[1:]
+    bidirectional = '--bidirectional' in arguments
+    maze_files = [argument for argument in arguments
+                  if argument != '--bidirectional']
+    for maze_file in maze_files or ['maze_files/maze1.txt']:
+        solver = SokobanSolver.from_file(maze_file)
+        plan = solver.solve_bidirectional() if bidirectional else solver.solve()
+        if plan is not None:
+            print(f'{maze_file}: {len(plan)} moves, {plan.get_pushes()} '
+                  f'pushes: {plan}')
+        elif solver.search_was_complete():
+            print(f'{maze_file}: no plan without purchases (use planner.py '
+                  f'for mazes with a shop)')
+        else:
+            print(f'{maze_file}: gave up after '
+                  f'{solver.get_states_expanded()} states')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+from functools import lru_cache
+
+from a2_support import *
+
+COIN = '$'
+ITEM_TYPES = (COIN, STRENGTH_POTION, MOVE_POTION, FANCY_POTION)
+
+# Zobrist layers. Crates get one layer per strength so that two crates of
+# different strength on the same cell hash differently.
+PLAYER_LAYER = 0
+FILLED_GOAL_LAYER = 1
+STRENGTH_LAYER = 2
+MOVES_LAYER = 3
+MONEY_LAYER = 4
+ITEM_LAYERS = {item: 5 + i for i, item in enumerate(ITEM_TYPES)}
+CRATE_LAYER = 16
+
+_MASK_64 = (1 << 64) - 1
+
+
+@lru_cache(maxsize=None)
+def zobrist_key(layer: int, index: int) -> int:
+    """ Returns the 64-bit Zobrist key for the given layer and cell index (or
+        stat value). Keys are derived with splitmix64, so they are the same in
+        every process and do not need to be stored with saved states.
+
+    Parameters:
+        layer: The layer, e.g. PLAYER_LAYER or CRATE_LAYER + crate strength.
+        index: The flat cell index (row * #columns + col), or a stat value.
+    """
+    z = ((layer << 40) ^ (index & 0xFFFFFFFFFF)) + 0x9E3779B97F4A7C15
+    z &= _MASK_64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK_64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK_64
+    return z ^ (z >> 31)
+
+
+def _bit_indices(bits: int):
+    """ Yields the indices of the set bits of bits, in ascending order. """
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+class SokobanState:
+    """ A compact, immutable snapshot of everything in a Sokoban game that can
+        change while playing: crates, filled goals, collectable items and the
+        player's position and stats. Walls and goal positions are not stored;
+        they are fixed by the maze file.
+
+        Crate positions are a bitset over flat cell indices, with a parallel
+        tuple of strengths in ascending index order. Every transition returns
+        a new state whose Zobrist hash is updated incrementally, so states are
+        cheap to hash, compare and store in sets or dictionaries.
+    """
+    __slots__ = ('_rows', '_cols', '_player', '_crates', '_strengths',
+                 '_filled', '_items', '_strength', '_moves', '_money',
+                 '_hash')
+
+    def __init__(
+        self,
+        dimensions: tuple[int, int],
+        player: int,
+        crates: int,
+        strengths: tuple[int, ...],
+        filled: int,
+        items: tuple[int, ...],
+        strength: int,
+        moves: int,
+        money: int,
+        zobrist: int = None
+    ) -> None:
+        """ Constructor for SokobanState. Most code should use from_model or
+            the transition methods rather than calling this directly.
+
+        Parameters:
+            dimensions: The dimensions of the maze as (#rows, #columns).
+            player: The flat index of the player's position.
+            crates: Bitset of the flat indices of the crates.
+            strengths: The strength of each crate, in ascending index order.
+            filled: Bitset of the flat indices of filled goals.
+            items: One bitset per entry of ITEM_TYPES.
+            strength: The player's strength.
+            moves: The player's moves remaining.
+            money: The player's money.
+            zobrist: The hash of this state, if already known.
+        """
+        self._rows, self._cols = dimensions
+        self._player = player
+        self._crates = crates
+        self._strengths = strengths
+        self._filled = filled
+        self._items = items
+        self._strength = strength
+        self._moves = moves
+        self._money = money
+        self._hash = self._compute_hash() if zobrist is None else zobrist
+
+    @classmethod
+    def from_model(
+        cls,
+        maze: Grid,
+        entities: Entities,
+        player_position: Position,
+        player_stats: tuple[int, int, int]
+    ) -> 'SokobanState':
+        """ Returns the state described by the given model data.
+
+        Parameters:
+            maze: The maze, as a list of lists of tiles.
+            entities: A dictionary mapping positions to entities.
+            player_position: The player's position.
+            player_stats: The player's (strength, moves remaining, money).
+        """
+        rows, cols = len(maze), len(maze[0])
+        filled = 0
+        for i, row in enumerate(maze):
+            for j, tile in enumerate(row):
+                if tile.get_type() == GOAL and tile.is_filled():
+                    filled |= 1 << (i * cols + j)
+
+        crates = {}
+        items = [0] * len(ITEM_TYPES)
+        for (i, j), entity in entities.items():
+            index = i * cols + j
+            if entity.get_type() == CRATE:
+                crates[index] = entity.get_strength()
+            else:
+                items[ITEM_TYPES.index(entity.get_type())] |= 1 << index
+
+        crate_bits = 0
+        for index in crates:
+            crate_bits |= 1 << index
+        return cls(
+            (rows, cols),
+            player_position[0] * cols + player_position[1],
+            crate_bits,
+            tuple(crates[index] for index in sorted(crates)),
+            filled,
+            tuple(items),
+            *player_stats,
+        )
+
+    def _compute_hash(self) -> int:
+        """ Returns the Zobrist hash of this state, computed from scratch. """
+        value = zobrist_key(PLAYER_LAYER, self._player)
+        for index, strength in zip(_bit_indices(self._crates),
+                                   self._strengths):
+            value ^= zobrist_key(CRATE_LAYER + strength, index)
+        for index in _bit_indices(self._filled):
+            value ^= zobrist_key(FILLED_GOAL_LAYER, index)
+        for item, bits in zip(ITEM_TYPES, self._items):
+            for index in _bit_indices(bits):
+                value ^= zobrist_key(ITEM_LAYERS[item], index)
+        value ^= zobrist_key(STRENGTH_LAYER, self._strength)
+        value ^= zobrist_key(MOVES_LAYER, self._moves)
+        value ^= zobrist_key(MONEY_LAYER, self._money)
+        return value
+
+    def to_index(self, position: Position) -> int:
+        """ Returns the flat index of the given (row, col) position. """
+        return position[0] * self._cols + position[1]
+
+    def to_position(self, index: int) -> Position:
+        """ Returns the (row, col) position of the given flat index. """
+        return divmod(index, self._cols)
+
+    def get_dimensions(self) -> tuple[int, int]:
+        """ Returns the dimensions of the maze as (#rows, #columns). """
+        return self._rows, self._cols
+
+    def get_player_position(self) -> Position:
+        """ Returns the player's position. """
+        return self.to_position(self._player)
+
+    def get_player_strength(self) -> int:
+        """ Returns the player's strength. """
+        return self._strength
+
+    def get_player_moves_remaining(self) -> int:
+        """ Returns the player's moves remaining. """
+        return self._moves
+
+    def get_player_money(self) -> int:
+        """ Returns the player's money. """
+        return self._money
+
+    def get_crate_bits(self) -> int:
+        """ Returns the bitset of flat crate indices. """
+        return self._crates
+
+    def get_filled_bits(self) -> int:
+        """ Returns the bitset of flat filled goal indices. """
+        return self._filled
+
+    def get_item_bits(self, item: str) -> int:
+        """ Returns the bitset of flat indices holding the given item type. """
+        return self._items[ITEM_TYPES.index(item)]
+
+    def get_crates(self) -> dict[Position, int]:
+        """ Returns a dictionary mapping crate positions to their strength. """
+        return {self.to_position(index): strength
+                for index, strength in zip(_bit_indices(self._crates),
+                                           self._strengths)}
+
+    def get_items(self) -> dict[Position, str]:
+        """ Returns a dictionary mapping item positions to their type. """
+        return {self.to_position(index): item
+                for item, bits in zip(ITEM_TYPES, self._items)
+                for index in _bit_indices(bits)}
+
+    def get_filled_goals(self) -> list[Position]:
+        """ Returns the positions of the filled goals. """
+        return [self.to_position(index)
+                for index in _bit_indices(self._filled)]
+
+    def crate_strength(self, position: Position) -> int | None:
+        """ Returns the strength of the crate at position, or None if there is
+            no crate there.
+        """
+        bit = 1 << self.to_index(position)
+        if not self._crates & bit:
+            return None
+        return self._strengths[(self._crates & (bit - 1)).bit_count()]
+
+    def item_at(self, position: Position) -> str | None:
+        """ Returns the type of the item at position, or None if there is no
+            item there.
+        """
+        bit = 1 << self.to_index(position)
+        for item, bits in zip(ITEM_TYPES, self._items):
+            if bits & bit:
+                return item
+        return None
+
+    def is_goal_filled(self, position: Position) -> bool:
+        """ Returns True iff position holds a filled goal. """
+        return bool(self._filled >> self.to_index(position) & 1)
+
+    def _copy(self, zobrist: int) -> 'SokobanState':
+        """ Returns a copy of this state with the given hash, for a transition
+            to update before returning it.
+        """
+        state = object.__new__(SokobanState)
+        state._rows = self._rows
+        state._cols = self._cols
+        state._player = self._player
+        state._crates = self._crates
+        state._strengths = self._strengths
+        state._filled = self._filled
+        state._items = self._items
+        state._strength = self._strength
+        state._moves = self._moves
+        state._money = self._money
+        state._hash = zobrist
+        return state
+
+    def move_player(self, position: Position) -> 'SokobanState':
+        """ Returns this state with the player moved to position. """
+        index = self.to_index(position)
+        zobrist = (self._hash ^ zobrist_key(PLAYER_LAYER, self._player)
+                   ^ zobrist_key(PLAYER_LAYER, index))
+        state = self._copy(zobrist)
+        state._player = index
+        return state
+
+    def _without_crate(self, index: int) -> tuple[int, list[int], int]:
+        """ Returns (bitset, strengths, strength) with the crate at index
+            removed.
+        """
+        rank = (self._crates & ((1 << index) - 1)).bit_count()
+        strengths = list(self._strengths)
+        strength = strengths.pop(rank)
+        return self._crates & ~(1 << index), strengths, strength
+
+    def move_crate(self, source: Position, target: Position) -> 'SokobanState':
+        """ Returns this state with the crate at source moved to target.
+
+        Preconditions:
+            There is a crate at source and none at target.
+        """
+        old, new = self.to_index(source), self.to_index(target)
+        crates, strengths, strength = self._without_crate(old)
+        strengths.insert((crates & ((1 << new) - 1)).bit_count(), strength)
+        zobrist = (self._hash ^ zobrist_key(CRATE_LAYER + strength, old)
+                   ^ zobrist_key(CRATE_LAYER + strength, new))
+        state = self._copy(zobrist)
+        state._crates = crates | (1 << new)
+        state._strengths = tuple(strengths)
+        return state
+
+    def fill_goal(self, source: Position, goal: Position) -> 'SokobanState':
+        """ Returns this state with the crate at source pushed onto the
+            unfilled goal at goal, which removes the crate and fills the goal.
+        """
+        old, new = self.to_index(source), self.to_index(goal)
+        crates, strengths, strength = self._without_crate(old)
+        zobrist = (self._hash ^ zobrist_key(CRATE_LAYER + strength, old)
+                   ^ zobrist_key(FILLED_GOAL_LAYER, new))
+        state = self._copy(zobrist)
+        state._crates = crates
+        state._strengths = tuple(strengths)
+        state._filled = self._filled | (1 << new)
+        return state
+
+    def remove_item(self, position: Position) -> 'SokobanState':
+        """ Returns this state with the item at position removed. """
+        index = self.to_index(position)
+        bit = 1 << index
+        items = list(self._items)
+        zobrist = self._hash
+        for i, item in enumerate(ITEM_TYPES):
+            if items[i] & bit:
+                items[i] &= ~bit
+                zobrist ^= zobrist_key(ITEM_LAYERS[item], index)
+        state = self._copy(zobrist)
+        state._items = tuple(items)
+        return state
+
+    def with_stats(self, strength: int, moves: int, money: int
+                   ) -> 'SokobanState':
+        """ Returns this state with the player's stats replaced. """
+        zobrist = (self._hash
+                   ^ zobrist_key(STRENGTH_LAYER, self._strength)
+                   ^ zobrist_key(STRENGTH_LAYER, strength)
+                   ^ zobrist_key(MOVES_LAYER, self._moves)
+                   ^ zobrist_key(MOVES_LAYER, moves)
+                   ^ zobrist_key(MONEY_LAYER, self._money)
+                   ^ zobrist_key(MONEY_LAYER, money))
+        state = self._copy(zobrist)
+        state._strength = strength
+        state._moves = moves
+        state._money = money
+        return state
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, SokobanState):
+            return NotImplemented
+        return (self._hash == other._hash
+                and self._player == other._player
+                and self._crates == other._crates
+                and self._strengths == other._strengths
+                and self._filled == other._filled
+                and self._items == other._items
+                and self._strength == other._strength
+                and self._moves == other._moves
+                and self._money == other._money
+                and self._cols == other._cols)
+
+    def __repr__(self) -> str:
+        return (f'SokobanState(player={self.get_player_position()}, '
+                f'crates={self.get_crates()}, '
+                f'stats=({self._strength}, {self._moves}, {self._money}), '
+                f'hash={self._hash:016x})')
@@ -0,0 +1,19 @@
+import os
+import sys
+
+from benchmark import measure_memory
+
+MAZE_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'maze_files')
+
+
+def test_measure_memory_of_slotted_instances():
+    memory = measure_memory(os.path.join(MAZE_DIRECTORY, 'maze3.txt'), 100)
+    assert memory['entities'] == 4
+    sizes = memory['bytes_per_instance']
+    assert {'Crate', 'Goal', 'Wall', 'Floor', 'StrengthPotion'} <= set(sizes)
+    # Slotted instances have no __dict__ to add on
+    assert sizes['Crate'] < sys.getsizeof(object()) + sys.getsizeof({})
+    assert memory['convert_maze_retained_bytes'] > 0
+    assert [read['operation'] for read in memory['attribute_reads']] == [
+        'Crate.get_strength', 'Goal.is_filled', 'Potion.effect']
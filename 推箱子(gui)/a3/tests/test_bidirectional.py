@@ -0,0 +1,73 @@
+import itertools
+import os
+import random
+
+import pytest
+
+from matching import INFINITY, min_cost_matching
+from model import SokobanModel
+from solver import SokobanSolver
+
+MAZE_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'maze_files')
+TWO_CRATES = """1 60
+WWWWWWWW
+W      W
+W 1  1 W
+W  P   W
+W G  G W
+W      W
+WWWWWWWW
+"""
+
+
+def brute_force_matching(costs: list[list[float]]) -> float:
+    """ Returns the cheapest assignment of rows to columns, by trying them all.
+    """
+    columns = range(len(costs[0]))
+    return min((sum(row[column] for row, column in zip(costs, assignment))
+                for assignment in itertools.permutations(columns, len(costs))),
+               default=INFINITY)
+
+
+@pytest.mark.parametrize('seed', range(30))
+def test_matching_agrees_with_brute_force(seed):
+    rnd = random.Random(seed)
+    rows = rnd.randint(1, 4)
+    columns = rnd.randint(rows, 5)
+    costs = [[INFINITY if rnd.random() < 0.3 else rnd.randint(0, 9)
+              for _ in range(columns)] for _ in range(rows)]
+    assert min_cost_matching(costs) == brute_force_matching(costs)
+
+
+def test_matching_edge_cases():
+    assert min_cost_matching([]) == 0
+    assert min_cost_matching([[1], [2]]) == INFINITY
+    assert min_cost_matching([[INFINITY, INFINITY]]) == INFINITY
+
+
+def wins(maze_file: str, moves: str) -> bool:
+    model = SokobanModel(maze_file)
+    for move in moves:
+        if not model.attempt_move(move):
+            return False
+    return model.has_won()
+
+
+def test_bidirectional_plans_win(tmp_path):
+    maze_file = str(tmp_path / 'two_crates.txt')
+    with open(maze_file, 'w') as file:
+        file.write(TWO_CRATES)
+    solver = SokobanSolver.from_file(maze_file)
+    plan = solver.solve_bidirectional()
+    assert plan is not None and wins(maze_file, plan.get_moves())
+    assert len(plan) >= len(SokobanSolver.from_file(maze_file).solve())
+
+
+@pytest.mark.parametrize('name, moves', [('maze1.txt', 11), ('maze3.txt', 23)])
+def test_bidirectional_on_shipped_mazes(name, moves):
+    # maze3 has potions, so it is left to solve
+    maze_file = os.path.join(MAZE_DIRECTORY, name)
+    plan = SokobanSolver.from_file(maze_file).solve_bidirectional()
+    assert len(plan) == moves
+    assert wins(maze_file, plan.get_moves())
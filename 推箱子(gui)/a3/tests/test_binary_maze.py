@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+from a2_support import read_file
+from binary_maze import (BINARY_HEADER, BINARY_MAGIC, BINARY_VERSION,
+                         MAP_THRESHOLD, convert_to_binary, read_binary_file,
+                         write_binary_file)
+
+MAZE_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'maze_files')
+MAZE_FILES = sorted(os.listdir(MAZE_DIRECTORY))
+
+
+@pytest.mark.parametrize('name', MAZE_FILES)
+def test_shipped_mazes_round_trip(tmp_path, name):
+    text_file = os.path.join(MAZE_DIRECTORY, name)
+    binary_file = str(tmp_path / 'maze.skb')
+    convert_to_binary(text_file, binary_file)
+    assert read_file(binary_file) == read_file(text_file)
+
+
+@pytest.mark.parametrize('cols', range(1, 10))
+def test_every_row_padding_round_trips(tmp_path, cols):
+    cells = ' WGX123SMFP'
+    maze = [[cells[(row * 7 + col * 3) % len(cells)] for col in range(cols)]
+            for row in range(5)]
+    binary_file = str(tmp_path / 'maze.skb')
+    write_binary_file(binary_file, maze, [3, 40])
+    assert read_binary_file(binary_file) == (maze, [3, 40])
+
+
+def test_large_mazes_are_mapped(tmp_path):
+    size = 600
+    maze = [[' ' if (row + col) % 3 else 'W' for col in range(size)]
+            for row in range(size)]
+    maze[1][1] = 'P'
+    maze[2][5] = '4'
+    binary_file = str(tmp_path / 'maze.skb')
+    write_binary_file(binary_file, maze, [1, 10])
+    assert os.path.getsize(binary_file) >= MAP_THRESHOLD
+    assert read_file(binary_file) == (maze, [1, 10])
+
+
+def write_header(path, rows: int, cols: int, count: int = 0,
+                 version: int = BINARY_VERSION, body: bytes = b'') -> str:
+    with open(path, 'wb') as file:
+        file.write(BINARY_HEADER.pack(BINARY_MAGIC, version, 1, 1, rows, cols,
+                                      count))
+        file.write(body)
+    return str(path)
+
+
+@pytest.mark.parametrize('rows, cols', [(0, 0), (3, 0), (0, 3)])
+def test_empty_mazes_are_rejected(tmp_path, rows, cols):
+    with pytest.raises(ValueError, match='empty'):
+        read_file(write_header(tmp_path / 'maze.skb', rows, cols))
+
+
+def test_truncated_files_are_rejected(tmp_path):
+    with pytest.raises(ValueError, match='takes'):
+        read_file(write_header(tmp_path / 'maze.skb', 1000, 1000))
+
+
+def test_entities_outside_the_maze_are_rejected(tmp_path):
+    body = bytes(2) + (99).to_bytes(4, 'little') + b'P'
+    with pytest.raises(ValueError, match='outside'):
+        read_file(write_header(tmp_path / 'maze.skb', 2, 4, 1, body=body))
+
+
+def test_other_versions_are_rejected(tmp_path):
+    path = write_header(tmp_path / 'maze.skb', 1, 4, version=1, body=bytes(1))
+    with pytest.raises(ValueError, match='version'):
+        read_file(path)
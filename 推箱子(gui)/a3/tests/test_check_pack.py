@@ -0,0 +1,75 @@
+import json
+import os
+import shutil
+
+from check_pack import (CACHE_VERSION, ERROR, SOLVED, UNSOLVABLE, check_maze,
+                        check_pack, save_cache)
+
+MAZE_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'maze_files')
+
+
+def maze_path(name: str) -> str:
+    return os.path.join(MAZE_DIRECTORY, name)
+
+
+def test_coin_maze_is_solved_by_buying():
+    result = check_maze(maze_path('coin_maze.txt'))
+    assert result['status'] == SOLVED
+    assert result['moves'] == 19
+    assert result['purchases'] == [[14, 'M']]
+    assert result['money_spent'] == 5
+
+
+def test_unsolvable_maze():
+    result = check_maze(maze_path('2.txt'))
+    assert result['status'] == UNSOLVABLE
+    assert result['moves'] is None and result['purchases'] is None
+
+
+def test_results_are_cached_by_contents(tmp_path):
+    cache_file = str(tmp_path / 'cache.json')
+    copy = str(tmp_path / 'copy.txt')
+    shutil.copy(maze_path('maze1.txt'), copy)
+    maze_files = [maze_path('maze1.txt'), copy]
+    first = check_pack(maze_files, cache_file, workers=1)
+    # The copy has the same contents, so the maze is only solved once
+    assert first[0]['hash'] == first[1]['hash']
+    assert first[0]['moves'] == 11
+    second = check_pack(maze_files, cache_file, workers=1)
+    assert [result['cached'] for result in second] == [True, True]
+    assert second[0]['moves'] == 11
+
+
+def test_stale_cache_versions_are_ignored(tmp_path):
+    cache_file = str(tmp_path / 'cache.json')
+    maze_file = maze_path('coin_maze.txt')
+    check_pack([maze_file], cache_file, workers=1)
+    with open(cache_file) as file:
+        results = json.load(file)['results']
+    for result in results.values():
+        result['status'] = UNSOLVABLE
+    save_cache(cache_file, results)
+    with open(cache_file) as file:
+        cache = json.load(file)
+    cache['version'] = CACHE_VERSION - 1
+    with open(cache_file, 'w') as file:
+        json.dump(cache, file)
+
+    [result] = check_pack([maze_file], cache_file, workers=1)
+    assert not result['cached']
+    assert result['status'] == SOLVED
+
+
+def test_malformed_maze_does_not_stop_the_pack(tmp_path):
+    broken = str(tmp_path / 'broken.txt')
+    with open(broken, 'w') as file:
+        file.write('not a maze\n')
+    maze_files = [broken, maze_path('maze1.txt'), maze_path('2.txt')]
+    for workers in (1, 2):
+        cache_file = str(tmp_path / f'cache_{workers}.json')
+        results = check_pack(maze_files, cache_file, workers=workers)
+        assert [result['status'] for result in results] == [
+            ERROR, SOLVED, UNSOLVABLE]
+        assert results[0]['error']
+        assert not results[0]['cached']
@@ -0,0 +1,82 @@
+import os
+
+from deadlock import (DEAD_CORNER, DEAD_UNREACHABLE, DEAD_WALL,
+                      DeadSquareTable, get_dead_square_table, is_frozen)
+from model import SokobanModel
+
+ROOM = (
+    'WWWWWWW',
+    'W     W',
+    'W  G  W',
+    'W     W',
+    'WWWWWWW',
+)
+OPEN_ROOM = (
+    'WWWWWWWW',
+    'W      W',
+    'W      W',
+    'W      W',
+    'W      W',
+    'W     GW',
+    'WWWWWWWW',
+)
+
+
+def test_corners_and_walls_are_dead():
+    table = DeadSquareTable(ROOM)
+    corners = {(1, 1), (1, 5), (3, 1), (3, 5)}
+    walls = {(1, 2), (1, 3), (1, 4), (3, 2), (3, 3), (3, 4), (2, 1), (2, 5)}
+    assert table.get_dead_squares() == corners | walls
+    assert all(table.get_reason(square) == DEAD_CORNER for square in corners)
+    assert all(table.get_reason(square) == DEAD_WALL for square in walls)
+    assert table.get_reason((2, 2)) is None
+
+
+def test_squares_a_crate_cannot_be_pulled_to_are_dead():
+    table = DeadSquareTable((
+        'WWWWWW',
+        'W    W',
+        'WW WGW',
+        'W    W',
+        'WWWWWW',
+    ))
+    # A crate in the gap at (2, 2) can only move up or down, never reaching
+    # the goal's column
+    assert table.get_reason((2, 2)) == DEAD_UNREACHABLE
+
+
+def test_push_distances():
+    table = DeadSquareTable(ROOM)
+    assert table.get_push_distances((2, 3)) == {(2, 3): 0, (2, 2): 1,
+                                                (2, 4): 1}
+
+
+def test_tables_are_shared_per_layout():
+    maze_file = os.path.join(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))), 'maze_files', 'maze3.txt')
+    first, second = SokobanModel(maze_file), SokobanModel(maze_file)
+    assert (get_dead_square_table(first.get_maze())
+            is get_dead_square_table(second.get_maze()))
+
+
+def crates_at(crates: dict):
+    return crates.get
+
+
+def test_a_lone_crate_in_the_open_is_not_frozen():
+    table = DeadSquareTable(OPEN_ROOM)
+    assert not is_frozen((2, 2), table, crates_at({(2, 2): 1}), 1)
+
+
+def test_a_crate_too_heavy_to_push_is_frozen():
+    table = DeadSquareTable(OPEN_ROOM)
+    assert is_frozen((2, 2), table, crates_at({(2, 2): 3}), 2)
+
+
+def test_a_square_of_crates_is_frozen():
+    table = DeadSquareTable(OPEN_ROOM)
+    crates = {(2, 2): 1, (2, 3): 1, (3, 2): 1, (3, 3): 1}
+    assert all(is_frozen(crate, table, crates_at(crates), 1)
+               for crate in crates)
+    del crates[(3, 3)]
+    assert not is_frozen((2, 2), table, crates_at(crates), 1)
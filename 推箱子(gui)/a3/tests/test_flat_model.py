@@ -0,0 +1,116 @@
+import os
+import random
+
+import pytest
+
+from flat_model import FlatSokobanModel
+from model import SokobanModel
+from solver import solve_file
+
+MAZE_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'maze_files')
+MAZES = ['maze1.txt', 'maze2.txt', 'maze3.txt', 'coin_maze.txt', '2.txt']
+STEPS = 1000
+# A crate's strength can be 0, which the flat crate array must not mistake for
+# an empty cell
+ZERO_CRATE = """1 30
+WWWWWWW
+W  0  W
+W P1 GW
+W  2 GW
+W    GW
+WWWWWWW
+"""
+
+
+def view(model: SokobanModel) -> tuple:
+    """ Returns everything a view or solver can ask of model. """
+    return ([''.join(str(tile) for tile in row) for row in model.get_maze()],
+            {position: str(entity)
+             for position, entity in model.get_entities().items()},
+            model.get_player_position(), model.get_player_strength(),
+            model.get_player_moves_remaining(), model.get_player_money(),
+            model.has_won(), model.export_state(),
+            set(model.get_lost_crates()), model.is_deadlocked())
+
+
+def random_walk(maze_file: str, seed: int) -> None:
+    """ Makes the same random moves, undos, purchases etc. on both backends
+        of maze_file, checking that they agree after each one.
+    """
+    model, flat = SokobanModel(maze_file), FlatSokobanModel(maze_file)
+    rows, cols = model.get_dimensions()
+    rnd = random.Random(seed)
+    snapshots = []
+    # Restoring a snapshot skips the bookkeeping of lost crates
+    restored = False
+    assert view(model) == view(flat)
+    for _ in range(STEPS):
+        action = rnd.random()
+        if action < 0.6:
+            direction = rnd.choice('wasd')
+            assert model.attempt_move(direction) == flat.attempt_move(direction)
+        elif action < 0.72:
+            assert model.undo_move() == flat.undo_move()
+        elif action < 0.8:
+            assert model.redo_move() == flat.redo_move()
+        elif action < 0.85:
+            item = rnd.choice('SMF')
+            assert (model.attempt_purchase(item)
+                    == flat.attempt_purchase(item))
+        elif action < 0.88:
+            snapshots.append((model.snapshot(), flat.snapshot()))
+        elif action < 0.9 and snapshots:
+            snapshot, flat_snapshot = rnd.choice(snapshots)
+            model.restore(snapshot)
+            flat.restore(flat_snapshot)
+            restored = True
+        elif action < 0.92:
+            state = model.export_state()
+            model.import_state(state)
+            flat.import_state(state)
+        elif action < 0.93:
+            position = (rnd.randrange(rows), rnd.randrange(cols))
+            assert model.get_path_to(position) == flat.get_path_to(position)
+            assert model.walk_to(position) == flat.walk_to(position)
+        elif action < 0.94:
+            model.reset()
+            flat.reset()
+            restored = False
+        if restored:
+            assert view(model)[:-2] == view(flat)[:-2]
+        else:
+            assert view(model) == view(flat)
+
+
+@pytest.mark.parametrize('seed', range(3))
+@pytest.mark.parametrize('name', MAZES)
+def test_flat_model_matches_model(name, seed):
+    random_walk(os.path.join(MAZE_DIRECTORY, name), seed)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_flat_model_matches_model_with_zero_crate(tmp_path, seed):
+    maze_file = str(tmp_path / 'zero_crate.txt')
+    with open(maze_file, 'w') as file:
+        file.write(ZERO_CRATE)
+    random_walk(maze_file, seed)
+
+
+def test_flat_model_pushes_zero_crate(tmp_path):
+    maze_file = str(tmp_path / 'zero_crate.txt')
+    with open(maze_file, 'w') as file:
+        file.write('1 10\nWWWWWW\nWP0 GW\nWWWWWW\n')
+    flat = FlatSokobanModel(maze_file)
+    assert {position: str(entity) for position, entity
+            in flat.get_entities().items()} == {(1, 2): '0'}
+    assert flat.attempt_move('d') and flat.attempt_move('d')
+    assert flat.has_won()
+
+
+def test_flat_model_plays_a_plan():
+    maze_file = os.path.join(MAZE_DIRECTORY, 'maze1.txt')
+    flat = FlatSokobanModel(maze_file)
+    for move in solve_file(maze_file).get_moves():
+        assert flat.attempt_move(move)
+    assert flat.has_won()
@@ -0,0 +1,54 @@
+import os
+
+from a2_support import GOAL
+from generator import INDEX_FILE, LEVEL_NAME, generate_level, generate_pack
+
+
+def count_crates_and_goals(level: dict) -> tuple[int, int]:
+    """ Returns the numbers of crates and unfilled goals in a level's maze. """
+    cells = ''.join(level['lines'][1:])
+    return sum(cell.isdigit() for cell in cells), cells.count(GOAL)
+
+
+def test_player_never_starts_on_a_goal():
+    # The walk for seed 16 used to end on a goal, which the player then hid
+    level = generate_level(16)
+    assert level is not None
+    assert count_crates_and_goals(level) == (3, 3)
+
+
+def test_generated_levels_have_a_goal_per_crate():
+    levels = [generate_level(seed) for seed in range(40)]
+    levels = [level for level in levels if level is not None]
+    assert levels
+    for level in levels:
+        crates, goals = count_crates_and_goals(level)
+        assert crates == goals == 3, level['seed']
+
+
+def test_generate_level_is_deterministic():
+    assert generate_level(3) == generate_level(3)
+
+
+def test_generate_pack_numbers_after_existing_levels(tmp_path):
+    settings = {'rows': 7, 'cols': 7, 'crates': 1}
+    first = list(generate_pack(str(tmp_path), 2, settings, workers=1))
+    second = list(generate_pack(str(tmp_path), 2, settings, workers=1))
+    names = [entry['maze_file'] for entry in first + second]
+    assert names == [LEVEL_NAME.format(number) for number in range(1, 5)]
+    assert sorted(os.listdir(tmp_path)) == sorted(names + [INDEX_FILE])
+    with open(tmp_path / INDEX_FILE) as file:
+        assert len(file.readlines()) == 4
+
+
+def test_generate_pack_is_reproducible_in_parallel(tmp_path):
+    settings = {'rows': 7, 'cols': 7, 'crates': 1}
+    packs = []
+    for run, workers in enumerate((1, 3, 3)):
+        directory = tmp_path / str(run)
+        entries = list(generate_pack(str(directory), 4, settings,
+                                     workers=workers))
+        mazes = [(directory / entry['maze_file']).read_text()
+                 for entry in entries]
+        packs.append((entries, mazes))
+    assert packs[0] == packs[1] == packs[2]
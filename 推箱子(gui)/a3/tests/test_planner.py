@@ -0,0 +1,50 @@
+import os
+
+import pytest
+
+from model import SokobanModel
+from planner import ShopPlanner, plan_file
+
+MAZE_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'maze_files')
+
+
+def replay(maze_file: str, steps: list[str]) -> SokobanModel:
+    """ Returns a model of maze_file after taking steps, which must all work.
+    """
+    model = SokobanModel(maze_file)
+    for step in steps:
+        if step in SokobanModel.ITEM_COSTS:
+            assert model.attempt_purchase(step)
+        else:
+            assert model.attempt_move(step)
+    return model
+
+
+@pytest.mark.parametrize('name, moves', [
+    ('maze1.txt', 11), ('maze2.txt', 13), ('maze3.txt', 23),
+])
+def test_plans_without_purchases(name, moves):
+    maze_file = os.path.join(MAZE_DIRECTORY, name)
+    plan = plan_file(maze_file)
+    assert len(plan) == moves
+    assert plan.get_purchases() == []
+    assert plan.get_money_spent() == 0
+    assert replay(maze_file, plan.get_steps()).has_won()
+
+
+def test_coin_maze_needs_moves_potion():
+    maze_file = os.path.join(MAZE_DIRECTORY, 'coin_maze.txt')
+    plan = plan_file(maze_file)
+    assert len(plan) == 19
+    assert plan.get_purchases() == [(14, 'M')]
+    assert plan.get_money_spent() == SokobanModel.ITEM_COSTS['M']
+    steps = plan.get_steps()
+    assert steps[14] == 'M'
+    assert replay(maze_file, steps).has_won()
+
+
+def test_unsolvable_maze():
+    planner = ShopPlanner.from_file(os.path.join(MAZE_DIRECTORY, '2.txt'))
+    assert planner.solve() is None
+    assert planner.search_was_complete()
@@ -0,0 +1,73 @@
+import os
+
+import pytest
+
+from model import SokobanModel
+from simulate import (LOST, UNFINISHED, WON, load_script, parse_script,
+                      run_batch, run_script)
+
+MAZE_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'maze_files')
+MAZE1 = os.path.join(MAZE_DIRECTORY, 'maze1.txt')
+TRANSCRIPT = """WWWWWWWW
+WP  W  W
+
+Enter move: D
+Enter move: x
+Invalid move
+
+Enter move: s
+Enter move: q
+"""
+
+
+def test_parse_script():
+    assert parse_script(' dd s\nUr ') == 'ddsur'
+    assert parse_script('dqxs') == 'ds'
+    assert parse_script(TRANSCRIPT) == 'ds'
+
+
+def test_load_script(tmp_path):
+    script = tmp_path / 'win.txt'
+    script.write_text(TRANSCRIPT)
+    assert load_script(str(script)) == 'ds'
+    assert load_script('wasd') == 'wasd'
+    with pytest.raises(FileNotFoundError):
+        load_script(str(tmp_path / 'missing.txt'))
+
+
+def test_a_winning_script_stops_at_the_win():
+    result = run_script(MAZE1, 'sdsasdddsdw' + 'aaaa')
+    assert result['result'] == WON
+    assert result['moves_used'] == 11
+    assert result['script_moves_replayed'] == 11
+
+
+def test_running_out_of_moves_loses():
+    result = run_script(MAZE1, 'da' * 10)
+    assert result['result'] == LOST
+    assert result['moves_remaining'] == 0
+
+
+def test_invalid_moves_and_undo():
+    result = run_script(MAZE1, 'awdu')
+    assert result['result'] == UNFINISHED
+    assert result['invalid_moves'] == 2
+    # The undone move is given back, so none are used
+    assert result['moves_used'] == 0
+    assert result['moves_remaining'] == SokobanModel(
+        MAZE1).get_player_moves_remaining()
+    assert result['player_position'] == [1, 1]
+
+
+def test_moves_used_agrees_with_moves_remaining():
+    start = SokobanModel(MAZE1).get_player_moves_remaining()
+    for script in ('ddu', 'ddur', 'dduusdr', 'sdsauuu'):
+        result = run_script(MAZE1, script)
+        assert (result['moves_used']
+                == start - result['moves_remaining']), script
+
+
+def test_batches_give_the_same_results_in_parallel():
+    jobs = [(MAZE1, script) for script in ('sdsasdddsdw', 'da' * 10, 'd')]
+    assert run_batch(jobs, workers=1) == run_batch(jobs, workers=2)
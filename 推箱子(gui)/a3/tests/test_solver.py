@@ -0,0 +1,52 @@
+import os
+
+import pytest
+
+from model import SokobanModel
+from solver import SokobanSolver
+
+MAZE_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'maze_files')
+
+
+def maze_path(name: str) -> str:
+    return os.path.join(MAZE_DIRECTORY, name)
+
+
+def replay_wins(maze_file: str, moves: str) -> bool:
+    """ Returns True iff moves win the maze, with the last move. """
+    model = SokobanModel(maze_file)
+    for number, move in enumerate(moves, start=1):
+        if not model.attempt_move(move):
+            return False
+        if model.has_won():
+            return number == len(moves)
+        if model.get_player_moves_remaining() <= 0:
+            return False
+    return False
+
+
+@pytest.mark.parametrize('name, moves, pushes', [
+    ('maze1.txt', 11, 5),
+    ('111.txt', 11, 5),
+    ('maze2.txt', 13, 5),
+    ('maze3.txt', 23, 8),
+])
+def test_shortest_plans_of_shipped_mazes(name, moves, pushes):
+    plan = SokobanSolver.from_file(maze_path(name)).solve()
+    assert plan is not None
+    assert (len(plan), plan.get_pushes()) == (moves, pushes)
+    assert replay_wins(maze_path(name), plan.get_moves())
+
+
+def test_mazes_needing_a_purchase_have_no_plan():
+    solver = SokobanSolver.from_file(maze_path('coin_maze.txt'))
+    assert solver.solve() is None
+    assert solver.search_was_complete()
+
+
+def test_giving_up_is_not_a_complete_search():
+    solver = SokobanSolver.from_file(maze_path('maze3.txt'))
+    assert solver.solve(max_states=3) is None
+    assert not solver.search_was_complete()
+    assert solver.get_states_expanded() > 3
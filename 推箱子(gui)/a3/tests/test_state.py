@@ -0,0 +1,76 @@
+import os
+import random
+
+from model import SokobanModel
+from state import ITEM_TYPES, SokobanState
+
+MAZE_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'maze_files')
+MAZE_FILE = os.path.join(MAZE_DIRECTORY, 'maze3.txt')
+MAZE1_FILE = os.path.join(MAZE_DIRECTORY, 'maze1.txt')
+
+
+def rebuilt(state: SokobanState) -> SokobanState:
+    """ Returns state with its hash computed from scratch. """
+    return SokobanState(
+        state.get_dimensions(),
+        state.to_index(state.get_player_position()),
+        state.get_crate_bits(),
+        tuple(strength for _, strength in sorted(state.get_crates().items())),
+        state.get_filled_bits(),
+        tuple(state.get_item_bits(item) for item in ITEM_TYPES),
+        state.get_player_strength(),
+        state.get_player_moves_remaining(),
+        state.get_player_money(),
+    )
+
+
+def test_incremental_hashes_match_fresh_ones():
+    model = SokobanModel(MAZE_FILE)
+    rnd = random.Random(5)
+    for _ in range(300):
+        model.attempt_move(rnd.choice('wasd'))
+        state = model.export_state()
+        assert hash(rebuilt(state)) == hash(state)
+        assert rebuilt(state) == state
+
+
+def test_transitions_hash_like_exported_states():
+    model = SokobanModel(MAZE1_FILE)
+    state = model.export_state()
+    # maze1's player walks from (1, 1) to (2, 2), then pushes the crate at
+    # (3, 2) down
+    for move in 'dss':
+        assert model.attempt_move(move)
+    state = (state.move_player((1, 2)).move_player((2, 2))
+             .move_player((3, 2)).move_crate((3, 2), (4, 2)))
+    exported = model.export_state()
+    state = state.with_stats(exported.get_player_strength(),
+                             exported.get_player_moves_remaining(),
+                             exported.get_player_money())
+    assert state == exported
+    assert hash(state) == hash(exported)
+
+
+def test_equal_states_from_different_histories_are_equal():
+    first, second = SokobanModel(MAZE_FILE), SokobanModel(MAZE_FILE)
+    for move in 'dd':
+        first.attempt_move(move)
+    for move in 'dda':
+        second.attempt_move(move)
+    second.attempt_move('d')
+    a, b = first.export_state(), second.export_state()
+    assert a.get_player_position() == b.get_player_position()
+    # Their moves remaining differ, so only the stats tell them apart
+    assert a != b
+    assert a.with_stats(0, 0, 0) == b.with_stats(0, 0, 0)
+    assert hash(a.with_stats(0, 0, 0)) == hash(b.with_stats(0, 0, 0))
+
+
+def test_import_restores_an_exported_state():
+    model = SokobanModel(MAZE_FILE)
+    start = model.export_state()
+    for move in 'sdsss':
+        model.attempt_move(move)
+    model.import_state(start)
+    assert model.export_state() == start